@@ -0,0 +1,66 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import run_predictions as rp
+from benchmarks.mock_api import MockApiServer, synthetic_matches
+from benchmarks.timing import timed
+from data import feature_store as fs
+from data import fetch_data as fd
+from data.cache import PlayerHeroStatsCache
+
+"""Live feature building: the DataFrame stages of create_training_data (LiveFeatures.build_pipeline) vs gathering
+player rows from a feature store snapshot's in-memory index (LiveFeatures.array), per batch of --batch_matches.
+Both read player hero stats from the local mock API through a warmed sqlite cache. Features are checked to match first.
+Example launch command: python -m benchmarks.bench_feature_store --model_folder 8.26.25_rf_std --batch_matches 1 32 256
+"""
+
+def run(args):
+    with open(os.path.join(args.model_folder, "meta.json")) as f:
+        feature_names = json.load(f)["feature_names"]
+    matches = [rp.parse_players([{k: p[k] for k in ("account_id", "hero_id", "team")} for p in m["players"]])
+               for m in synthetic_matches(1754006400, 1754092799, max(args.batch_matches))]
+    tmp = tempfile.mkdtemp(prefix="bench_feature_store_")
+    try:
+        with MockApiServer(latency_s=args.latency, matches_per_day=len(matches)) as server:
+            fd.set_client(fd.ApiClient(base_url=server.url, rate_per_s=0))
+            hero_stats = rp.load_hero_stats("2025-08-01")
+            cache = PlayerHeroStatsCache(os.path.join(tmp, "player_hero_stats.sqlite"))
+            store = fs.FeatureStore(os.path.join(tmp, "feature_store"))
+            t0 = time.perf_counter()
+            fs.build_snapshot(store, "2025-08-01", {p[0] for m in matches for p in m}, hero_stats, cache)
+            snapshot_s = time.perf_counter() - t0
+
+            features = rp.LiveFeatures(feature_names, hero_stats, "2025-08-01", cache, store=store)
+            t0 = time.perf_counter()
+            index = features.index()
+            load_s = time.perf_counter() - t0
+            reference = features.build_pipeline(matches).to_numpy(dtype=np.float32)
+            assert np.array_equal(features.array(matches).astype(np.float32), reference, equal_nan=True)
+            print(f"\nsnapshot of {len(index)} player hero rows built in {snapshot_s:.2f}s, loaded in {load_s:.3f}s")
+
+            print(f"{'matches':>8} {'pipeline_ms':>12} {'index_ms':>9} {'speedup':>8} {'index_us/match':>15}")
+            for n in args.batch_matches:
+                batch = matches[:n]
+                pipeline, _ = timed(lambda: features.build_pipeline(batch), args.repeat, stat=np.median)
+                indexed, _ = timed(lambda: features.array(batch), args.repeat * 10, stat=np.median)
+                print(f"{n:>8} {pipeline * 1000:>12.2f} {indexed * 1000:>9.3f} {pipeline / indexed:>8.0f} {indexed * 1e6 / n:>15.1f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", default="8.26.25_rf_std", help="Folder with meta.json, its features are built")
+    parser.add_argument("--batch_matches", type=int, nargs="+", default=[1, 32, 256], help="Matches per feature build")
+    parser.add_argument("--repeat", type=int, default=10, help="Pipeline builds per batch size, index builds use 10x")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock API latency per request in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args)
@@ -0,0 +1,116 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.mock_api import MockApiServer
+from data import fetch_data as fd
+from data.cache import PlayerHeroStatsCache
+
+"""End-to-end throughput of every fetch mode against the local mock API.
+Each case gets a fresh ApiClient, so request/retry counts are per case.
+Example launch command: python -m benchmarks.bench_fetch --days 7 --latency 0.1 --error_rate 0.02
+Replay recorded fixtures instead of synthetic payloads with --mode replay --fixtures benchmarks/fixtures
+"""
+
+def run_case(name, fn, count_items, rate):
+    """runs fn with a fresh client, returns a result row dict"""
+    client = fd.set_client(fd.ApiClient(rate_per_s=rate, burst=rate, backoff_base_s=0.05))
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    stats = client.get_stats().values()
+    return {
+        "case": name,
+        "seconds": elapsed,
+        "items": count_items(result),
+        "requests": sum(s["requests"] for s in stats),
+        "retries": sum(s["retries"] for s in stats),
+        "result": result,
+    }
+
+def run(args):
+    start = datetime(2025, 8, 1)
+    start_date = start.strftime("%Y-%m-%d")
+    end_date = (start + timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    rows = []
+
+    server = MockApiServer(
+        latency_s=args.latency,
+        latency_jitter_s=args.jitter,
+        error_rate=args.error_rate,
+        matches_per_day=args.matches_per_day,
+        mode=args.mode,
+        fixtures_dir=args.fixtures,
+        replay_fallback=True
+    )
+    with server:
+        fd.set_api_base(server.url)
+
+        count_matches = lambda frames: len(frames[0])
+        rows.append(run_case("matches / sequential days",
+            lambda: fd.bulk_fetch_match_frames(start_date, end_date, args.limit, max_workers=1), count_matches, args.rate))
+        rows.append(run_case("matches / concurrent days",
+            lambda: fd.bulk_fetch_match_frames(start_date, end_date, args.limit, max_workers=args.workers),
+            count_matches, args.rate))
+
+        raw_players = rows[-1]["result"][1]
+        account_ids = raw_players["account_id"].unique().tolist()[:args.accounts] if len(raw_players) else []
+
+        rows.append(run_case("player hero stats / sequential",
+            lambda: fd.fetch_player_hero_stats_batch(700, account_ids, start_date, max_workers=1),
+            lambda _: len(account_ids), args.rate))
+        rows.append(run_case("player hero stats / parallel",
+            lambda: fd.fetch_player_hero_stats_batch(700, account_ids, start_date, max_workers=args.workers),
+            lambda _: len(account_ids), args.rate))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PlayerHeroStatsCache(os.path.join(tmp, "bench_cache.sqlite"))
+            fd.fetch_player_hero_stats_batch(700, account_ids, start_date, cache=cache, max_workers=args.workers)
+            rows.append(run_case("player hero stats / warm cache",
+                lambda: fd.fetch_player_hero_stats_batch(700, account_ids, start_date, cache=cache, max_workers=args.workers),
+                lambda _: len(account_ids), args.rate))
+            cache.close()
+
+        def staged():
+            raw_matches, raw_players = fd.bulk_fetch_match_frames(start_date, end_date, args.limit, max_workers=args.workers)
+            account_ids = raw_players["account_id"].unique().tolist() if len(raw_players) else []
+            return fd.fetch_player_hero_stats_batch(700, account_ids, start_date, max_workers=args.workers)
+        rows.append(run_case("matches + player stats / staged", staged, len, args.rate))
+        rows.append(run_case("matches + player stats / pipelined",
+            lambda: fd.pipelined_fetch_match_player_frames(
+                start_date, end_date, start_date, limit=args.limit, max_workers=args.workers)[2],
+            len, args.rate))
+
+        rows.append(run_case("hero stats",
+            lambda: fd.fetch_hero_stats(fetch_from_date="2020-01-01", fetch_till_date=end_date),
+            lambda r: 0 if "error" in r else len(r), args.rate))
+
+    print(f"\nmock {args.mode}: latency {args.latency:.3f}s (+{args.jitter:.3f}s jitter), error rate {args.error_rate:.1%}, "
+          f"{args.days} days x {args.matches_per_day} matches, {args.workers} workers, client rate {args.rate}/s")
+    print(f"{'case':<34} {'seconds':>9} {'items':>8} {'items/s':>10} {'requests':>9} {'retries':>8}")
+    for r in rows:
+        per_s = r["items"] / r["seconds"] if r["seconds"] else 0
+        print(f"{r['case']:<34} {r['seconds']:>9.3f} {r['items']:>8} {per_s:>10.0f} {r['requests']:>9} {r['retries']:>8}")
+    print(f"mock api served: {server.counts}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=7, help="Days of matches to fetch")
+    parser.add_argument("--matches_per_day", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=1000, help="Per-request match limit")
+    parser.add_argument("--accounts", type=int, default=5000, help="Max accounts for the player hero stats cases")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=200, help="ApiClient requests per second")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random mock latency in seconds")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Probability of a mock 429/503")
+    parser.add_argument("--mode", choices=["synthetic", "replay"], default="synthetic")
+    parser.add_argument("--fixtures", default="benchmarks//fixtures", help="Fixture folder for replay mode")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    run(args)
@@ -0,0 +1,49 @@
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.mock_api import MockApiServer
+from data import fetch_data as fd
+
+"""Wall-clock benchmark of bulk_fetch_match_frames, sequential vs concurrent day windows.
+Example launch command: python -m benchmarks.bench_fetch_matches --latency 0.2 --workers 8
+"""
+
+def time_bulk_fetch(start_date, end_date, max_workers) -> tuple[float, int]:
+    """returns (seconds, matches returned) for one bulk_fetch_match_frames run"""
+    t0 = time.perf_counter()
+    raw_matches, _ = fd.bulk_fetch_match_frames(start_date, end_date, limit=1000, max_workers=max_workers)
+    return time.perf_counter() - t0, len(raw_matches)
+
+def run(day_counts, workers, latency, matches_per_day):
+    start = datetime(2025, 8, 1)
+    rows = []
+
+    with MockApiServer(latency_s=latency, matches_per_day=matches_per_day) as server:
+        fd.set_api_base(server.url)
+        for n_days in day_counts:
+            start_date = start.strftime("%Y-%m-%d")
+            end_date = (start + timedelta(days=n_days - 1)).strftime("%Y-%m-%d")
+
+            seq_s, seq_matches = time_bulk_fetch(start_date, end_date, max_workers=1)
+            con_s, con_matches = time_bulk_fetch(start_date, end_date, max_workers=workers)
+            assert seq_matches == con_matches and seq_matches > 0, "day windows lost during fetch"
+            rows.append((n_days, seq_s, con_s))
+
+    print(f"\nmock latency {latency:.3f}s/request, {matches_per_day} matches/day, {workers} workers")
+    print(f"{'days':>6} {'sequential_s':>14} {'concurrent_s':>14} {'speedup':>9}")
+    for n_days, seq_s, con_s in rows:
+        print(f"{n_days:>6} {seq_s:>14.3f} {con_s:>14.3f} {seq_s / con_s:>8.1f}x")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 14, 30], help="Day window counts to benchmark")
+    parser.add_argument("--workers", type=int, default=8, help="max_workers for the concurrent run")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock API latency per request in seconds")
+    parser.add_argument("--matches", type=int, default=50, help="Matches returned per day window")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.days, args.workers, args.latency, args.matches)
@@ -0,0 +1,81 @@
+import argparse
+import json
+import logging
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+import create_team_stats as cts
+from benchmarks.bench_team_stats import synthetic_player_stats
+from benchmarks.timing import timed
+from data.forest import CompiledForest
+
+"""RandomForestClassifier.predict_proba vs the compiled flat array forest (data.forest) on synthetic team stats.
+The forest is either a saved --model_folder (scored on its layout's features) or trained like
+cm.train_random_forest with --config on --train_matches synthetic matches (NaN stats included).
+Held out rows are scored for single row latency (median / p99 of --repeat calls) and rows per second
+on --batch_rows. Probabilities are checked to match before timing.
+Example launch command: python -m benchmarks.bench_forest --model_folder 8.26.25_rf_std --batch_rows 1 32 1000 10000
+"""
+
+def features(n_matches, seed, layout="std_diff"):
+    training = cts.create_team_stat_layouts(synthetic_player_stats(n_matches, seed=seed), layouts=(layout,))[layout]
+    return training.drop(columns=["team_0_win", "match_id"]), training["team_0_win"]
+
+def train(config, n_matches):
+    with open(config) as f:
+        params = json.load(f)
+    X, y = features(n_matches, seed=0)
+    return RandomForestClassifier(
+        n_estimators=params.get("n_estimators", 100), max_depth=params.get("max_depth"),
+        min_samples_split=params.get("min_samples_split", 2), min_samples_leaf=params.get("min_samples_leaf", 1),
+        max_features=params.get("max_features", "sqrt"), random_state=params.get("random_state", 42), n_jobs=-1,
+    ).fit(X, y)
+
+def run(args):
+    if args.model_folder:
+        model = joblib.load(os.path.join(args.model_folder, "model.joblib"))
+        layout = "std_diff" if any(n.endswith("_diff") for n in model.feature_names_in_) else "std"
+        X_test = features(max(args.batch_rows), seed=1, layout=layout)[0][list(model.feature_names_in_)]
+    else:
+        model = train(args.config, args.train_matches)
+        X_test = features(max(args.batch_rows), seed=1)[0]
+
+    t0 = time.perf_counter()
+    forest = CompiledForest.compile(model)
+    compile_s = time.perf_counter() - t0
+    error = np.abs(forest.predict_proba(X_test) - model.predict_proba(X_test)).max()
+    assert error < 1e-9, f"compiled forest differs from predict_proba by {error}"
+    print(f"\n{model.n_estimators} trees, {len(forest.feature)} nodes, depth {forest.depth}, "
+          f"compiled in {compile_s:.3f}s, max |diff| {error:.1e}")
+
+    engines = {
+        "sklearn n_jobs=-1": model.predict_proba,
+        "sklearn n_jobs=1": lambda X: model.set_params(n_jobs=1).predict_proba(X),
+        "compiled": forest.predict_proba,
+    }
+    print(f"{'engine':<18} {'rows':>7} {'median_ms':>10} {'p99_ms':>8} {'rows/s':>11}")
+    for rows in args.batch_rows:
+        X = X_test.iloc[:rows]
+        for name, predict in engines.items():
+            model.set_params(n_jobs=-1)
+            times, _ = timed(lambda: predict(X), args.repeat if rows == 1 else max(3, args.repeat // 10), stat=None)
+            median, p99 = np.median(times) * 1000, np.percentile(times, 99) * 1000
+            print(f"{name:<18} {rows:>7} {median:>10.3f} {p99:>8.3f} {rows / np.median(times):>11.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", default=None, help="Saved model to score, trains one from --config when unset")
+    parser.add_argument("--config", default="models/configs/rf_v1.json", help="Random forest params, as for --mode ml_model")
+    parser.add_argument("--train_matches", type=int, default=20000, help="Synthetic matches the forest is trained on")
+    parser.add_argument("--batch_rows", type=int, nargs="+", default=[1, 100, 10000], help="Rows per predict call")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per single row case, batches use a tenth")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore", category=UserWarning)
+    run(args)
@@ -0,0 +1,106 @@
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+import create_team_stats as cts
+from benchmarks.timing import timed
+from data import fetch_data as fd
+from data import process_data as dp
+from data.schema import apply_schema
+
+"""Hash merge chain vs indexed gathers for the player / hero stat joins.
+Players, matches and hero stats come from a v2_data checkpoint folder, player hero stats are
+generated for every (account_id, hero_id) pair played plus a few extra heroes per account.
+--scale repeats the players under new account ids to look at larger windows.
+Example launch command: python -m benchmarks.bench_joins --folder v2_data/pred_data/test_pred_v2_2025-08-19_2025-08-21 --scale 1 10
+"""
+
+def load_folder(folder, scale, seed=0):
+    raw_players = pd.read_csv(f"{folder}/raw_players.csv")
+    raw_matches = pd.read_csv(f"{folder}/raw_matches.csv")
+    hero_stats = pd.read_csv(f"{folder}/hero_stats.csv")
+
+    if scale > 1:
+        # each copy gets its own accounts and match ids so the joins stay one-to-one
+        acc_step = int(raw_players["account_id"].max()) + 1
+        match_step = int(raw_matches["match_id"].max()) + 1
+        players, matches = [], []
+        for i in range(scale):
+            players.append(raw_players.assign(account_id=raw_players["account_id"] + i * acc_step,
+                                              match_id=raw_players["match_id"] + i * match_step))
+            matches.append(raw_matches.assign(match_id=raw_matches["match_id"] + i * match_step))
+        raw_players, raw_matches = pd.concat(players, ignore_index=True), pd.concat(matches, ignore_index=True)
+
+    rng = np.random.default_rng(seed)
+    heroes = hero_stats["hero_id"].to_numpy()
+    pairs = raw_players[["account_id", "hero_id"]]
+    accounts = pairs["account_id"].unique()
+    extra = pd.DataFrame({
+        "account_id": np.repeat(accounts, 3),
+        "hero_id": rng.choice(heroes, 3 * len(accounts)),
+    })
+    pairs = pd.concat([pairs, extra]).drop_duplicates(ignore_index=True)
+
+    n = len(pairs)
+    matches_played = rng.integers(0, 300, n)
+    time_played = matches_played * rng.integers(1200, 2400, n)
+    player_hero_stats = pairs.assign(
+        matches_played=matches_played,
+        wins=(matches_played * rng.random(n)).astype(np.int64),
+        kills=rng.integers(0, 12, n) * matches_played,
+        deaths=rng.integers(0, 10, n) * matches_played,
+        assists=rng.integers(0, 15, n) * matches_played,
+        damage_per_min=rng.uniform(500, 2500, n),
+        time_played=time_played,
+        kills_per_min=rng.random(n),
+        deaths_per_min=rng.random(n),
+        accuracy=rng.uniform(0.2, 0.7, n),
+    )
+
+    for df in (raw_players, raw_matches, hero_stats, player_hero_stats):
+        apply_schema(df, report=False)
+    player_stats = apply_schema(fd.process_player_stats(player_hero_stats), report=False)
+    match_players = apply_schema(dp.prepare_match_stats(raw_players, raw_matches), report=False)
+    player_hero_stats, player_stats, hero_stats = dp.check_unique_naming(player_hero_stats, player_stats, hero_stats)
+    return match_players, player_hero_stats, player_stats, hero_stats
+
+def merge_player_hero_reference(player_hero_stats, player_stats, hero_stats):
+    """reference: the two DataFrame.merge calls merge_player_hero_stats used before"""
+    p_ph_h_stats = player_hero_stats.merge(player_stats, on="account_id").merge(hero_stats, on="hero_id")
+    p_ph_h_stats.insert(1, "hero_id", p_ph_h_stats.pop("hero_id"))
+    return p_ph_h_stats
+
+def merge_match_player_reference(match_players, all_stats):
+    """reference: the DataFrame.merge merge_match_player_stats used before"""
+    cols = ["account_id", "match_id", "team", "winning_team", "win", "hero_id"]
+    return match_players[cols].merge(all_stats, on=["account_id", "hero_id"], how="left")
+
+def run(folder, scales, repeat):
+    print(f"\n{'scale':>6} {'join':<22} {'rows':>9} {'merge_s':>9} {'indexed_s':>10} {'speedup':>8}")
+    for scale in scales:
+        match_players, player_hero_stats, player_stats, hero_stats = load_folder(folder, scale)
+        stat_tables = (player_hero_stats, player_stats, hero_stats)
+
+        merge_s, expected = timed(lambda: merge_player_hero_reference(*stat_tables), repeat)
+        index_s, result = timed(lambda: dp.merge_player_hero_stats(*stat_tables), repeat)
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{scale:>6} {'player + hero stats':<22} {len(result):>9} {merge_s:>9.4f} {index_s:>10.4f} {merge_s / index_s:>7.1f}x")
+
+        all_stats = dp.calculate_ph_stats(expected, cts.TEAM_STATS)
+        merge_s, expected = timed(lambda: merge_match_player_reference(match_players, all_stats), repeat)
+        index_s, result = timed(lambda: cts.merge_match_player_stats(match_players, all_stats), repeat)
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{scale:>6} {'match players + stats':<22} {len(result):>9} {merge_s:>9.4f} {index_s:>10.4f} {merge_s / index_s:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="v2_data/pred_data/test_pred_v2_2025-08-19_2025-08-21",
+                        help="Checkpoint folder with raw_players.csv, raw_matches.csv and hero_stats.csv")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 50], help="Copies of the folder's players")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case, the fastest is reported")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.folder, args.scale, args.repeat)
@@ -0,0 +1,65 @@
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from benchmarks.mock_api import synthetic_matches
+from data import fetch_data as fd
+from data import process_data as dp
+
+"""Parse time and peak memory of match ingestion: json.loads + separate_match_players
+vs streaming iter_json_array + MatchFrameBuilder, on a synthetic metadata response body.
+Example launch command: python -m benchmarks.bench_match_ingest --matches 5000 --days 7
+"""
+
+def measure(fn):
+    """returns (seconds, peak traced MB, result), timing is taken from an untraced run"""
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+def run(matches_per_day, n_days, chunk_size):
+    bodies = [
+        json.dumps(synthetic_matches(day * 86400, day * 86400 + 86399, matches_per_day)).encode()
+        for day in range(n_days)
+    ]
+    body_mb = sum(len(b) for b in bodies) / 1e6
+
+    def dict_path():
+        days = [json.loads(body) for body in bodies]
+        return dp.separate_match_players(days)
+
+    def streaming_path():
+        builders = []
+        for body in bodies:
+            chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+            builder = dp.MatchFrameBuilder(capacity=matches_per_day)
+            builder.extend(fd.iter_json_array(chunks))
+            builders.append(builder)
+        return dp.MatchFrameBuilder.concat(builders, dedupe=False).to_frames()
+
+    dict_s, dict_mb, (m0, p0) = measure(dict_path)
+    stream_s, stream_mb, (m1, p1) = measure(streaming_path)
+    assert m0.equals(m1) and p0.equals(p1), "streaming path does not match separate_match_players"
+
+    print(f"\n{n_days} days x {matches_per_day} matches, {body_mb:.1f} MB of json (bodies themselves excluded from peak)")
+    print(f"{'path':<28} {'seconds':>9} {'peak_MB':>9}")
+    print(f"{'json.loads + separate':<28} {dict_s:>9.3f} {dict_mb:>9.1f}")
+    print(f"{'streaming + columnar':<28} {stream_s:>9.3f} {stream_mb:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=5000, help="Matches per day")
+    parser.add_argument("--days", type=int, default=3, help="Number of day responses")
+    parser.add_argument("--chunk_size", type=int, default=1 << 16, help="Bytes per streamed chunk")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.matches, args.days, args.chunk_size)
@@ -0,0 +1,86 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import warnings
+
+"""Startup of a scoring process serving several model variants: joblib.load of every model.joblib vs the
+ModelRegistry (data.model_registry) cold (empty compiled cache, each model unpickled and compiled) and warm
+(compiled arrays memory mapped from the cache), with --max_resident models kept loaded.
+Every case runs in a fresh process and reports the time to its first prediction (imports included),
+the time until every model was loaded and scored once over --rounds passes, and peak RSS.
+Example launch command: python -m benchmarks.bench_model_registry --rounds 3 --max_resident 2
+"""
+
+def startup(mode, folders, cache_root, max_resident, rounds, results):
+    t0 = time.perf_counter()
+    import numpy as np
+    warnings.filterwarnings("ignore")
+    if mode == "joblib":
+        import json
+        import joblib
+        models = {}
+
+        def score(folder):
+            if folder not in models:
+                with open(os.path.join(folder, "meta.json")) as f:
+                    n_features = len(json.load(f)["feature_names"])
+                models[folder] = (joblib.load(os.path.join(folder, "model.joblib")), n_features)
+            model, n_features = models[folder]
+            model.n_jobs = 1
+            return model.predict_proba(np.zeros((1, n_features)))
+    else:
+        from data.model_registry import ModelRegistry
+        registry = ModelRegistry(cache_root=cache_root, max_resident=max_resident)
+
+        def score(folder):
+            loaded = registry.load(folder)
+            return loaded.forest.predict_proba(np.zeros((1, len(loaded.feature_names))))
+
+    # the pipeline modules configure INFO logging on import
+    logging.getLogger().setLevel(logging.WARNING)
+    first_s = None
+    for _ in range(rounds):
+        for folder in folders:
+            score(folder)
+            first_s = first_s or time.perf_counter() - t0
+    # ru_maxrss is in KB on linux
+    results.put((first_s, time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def run_case(*args):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=startup, args=(*args, results))
+    process.start()
+    first_s, all_s, peak_mb = results.get()
+    process.join()
+    return first_s, all_s, peak_mb
+
+def run(args):
+    from data.model_registry import ModelRegistry
+    folders = args.model_folders or [e.folder for e in ModelRegistry(cache_root=None).scan()]
+    tmp = tempfile.mkdtemp(prefix="bench_model_registry_")
+    cache_root = os.path.join(tmp, "models")
+    print(f"\n{len(folders)} models, {args.rounds} rounds, {args.max_resident} resident at most (registry)")
+    print(f"{'mode':<16} {'first_score_s':>13} {'all_scored_s':>13} {'peak_rss_mb':>12}")
+    try:
+        # cold compiles and fills the cache, warm reads it back
+        for mode in ("joblib", "registry cold", "registry warm"):
+            first_s, all_s, peak_mb = run_case(mode.split()[0], folders, cache_root, args.max_resident, args.rounds)
+            print(f"{mode:<16} {first_s:>13.3f} {all_s:>13.3f} {peak_mb:>12.0f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folders", nargs="*", default=[], help="Model folders to serve, defaults to every indexed model")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes scoring one row with every model")
+    parser.add_argument("--max_resident", type=int, default=2, help="Models the registry keeps loaded")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args)
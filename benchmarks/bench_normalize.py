@@ -0,0 +1,99 @@
+import argparse
+import logging
+
+import pandas as pd
+
+from benchmarks.mock_api import synthetic_matches
+from benchmarks.timing import timed
+from data import process_data as dp
+
+"""Micro-benchmark of match/player normalization and win labelling.
+Compares the vectorized dp.separate_match_players / dp.prepare_match_stats against the
+previous row-wise implementations (kept below as references) and checks the outputs are identical.
+Example launch command: python -m benchmarks.bench_normalize --matches 60000
+"""
+
+def separate_match_players_rowwise(matches_grouped_by_day) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """reference: nested python loops, one dict per row"""
+    matches = []
+    players = []
+    if not matches_grouped_by_day:
+        return pd.DataFrame(), pd.DataFrame()
+    for day_matches in matches_grouped_by_day:
+        for match in day_matches:
+            try:
+                row = {c: match[c] for c in dp.MATCH_COLUMNS}
+            except KeyError:
+                continue
+            matches.append(row)
+            if "players" not in match or len(match["players"]) != 12:
+                continue
+            for player in match["players"]:
+                try:
+                    players.append({
+                        "account_id": player["account_id"],
+                        "match_id": row["match_id"],
+                        "team": player["team"],
+                        "hero_id": player["hero_id"],
+                        "kills": player["kills"],
+                        "deaths": player["deaths"],
+                        "assists": player["assists"],
+                        "denies": player["denies"],
+                        "net_worth": player["net_worth"],
+                    })
+                except KeyError:
+                    continue
+    return pd.DataFrame(matches), pd.DataFrame(players)
+
+def prepare_match_stats_rowwise(raw_players, raw_matches) -> pd.DataFrame:
+    """reference: DataFrame.apply(axis=1) win label"""
+    match_players = pd.merge(raw_players[['account_id','match_id','team','hero_id']], raw_matches, on='match_id', how='left')
+    match_players['win'] = match_players.apply(
+        lambda row: 'Y' if row['team'] == row['winning_team'] else 'N',
+        axis=1
+    )
+    return match_players
+
+def synthetic_days(n_matches, n_days, broken=False):
+    per_day = max(1, n_matches // n_days)
+    days = [synthetic_matches(d * 86400, d * 86400 + 86399, per_day) for d in range(n_days)]
+    if broken:
+        # a few broken payloads so the validation fallbacks are exercised
+        days[0][0]["players"] = days[0][0]["players"][:11]
+        del days[0][1]["winning_team"]
+        del days[0][2]["players"][3]["net_worth"]
+    return days
+
+def check_broken_payloads():
+    """outputs must also match when matches/players are missing keys or have the wrong player count"""
+    days = synthetic_days(2000, 2, broken=True)
+    for old, new in zip(separate_match_players_rowwise(days), dp.separate_match_players(days)):
+        pd.testing.assert_frame_equal(old, new)
+
+def run(n_matches, n_days, repeat):
+    check_broken_payloads()
+    days = synthetic_days(n_matches, n_days)
+
+    old_s, (m0, p0) = timed(lambda: separate_match_players_rowwise(days), repeat)
+    new_s, (m1, p1) = timed(lambda: dp.separate_match_players(days), repeat)
+    pd.testing.assert_frame_equal(m0, m1)
+    pd.testing.assert_frame_equal(p0, p1)
+
+    old_win_s, mp0 = timed(lambda: prepare_match_stats_rowwise(p1, m1), repeat)
+    new_win_s, mp1 = timed(lambda: dp.prepare_match_stats(p1, m1), repeat)
+    pd.testing.assert_frame_equal(mp0, mp1)
+
+    print(f"\n{len(m1)} matches, {len(p1)} player rows, best of {repeat}")
+    print(f"{'stage':<26} {'row-wise_s':>11} {'vectorized_s':>13} {'speedup':>8}")
+    print(f"{'separate_match_players':<26} {old_s:>11.3f} {new_s:>13.3f} {old_s / new_s:>7.1f}x")
+    print(f"{'prepare_match_stats':<26} {old_win_s:>11.3f} {new_win_s:>13.3f} {old_win_s / new_win_s:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=60000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    run(args.matches, args.days, args.repeat)
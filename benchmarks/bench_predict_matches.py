@@ -0,0 +1,85 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+"""Batch scoring of a training layout file: pd.read_csv + one predict_proba call vs orchestrators --mode predict
+(predict_matches, streamed in --chunk_rows chunks), for inputs of --rows matches.
+Every case runs in a fresh process, peak RSS is that process' high water mark. Inputs repeat the rows of the
+model folder's training data csv. Chunked probabilities are checked against the whole file ones.
+Example launch command: python -m benchmarks.bench_predict_matches --model_folder 8.26.25_rf_std --rows 50000 200000 800000
+"""
+
+def training_csv(model_folder):
+    return next(os.path.join(model_folder, f) for f in sorted(os.listdir(model_folder)) if f.endswith("_training_data.csv"))
+
+def whole_file(input_path, model_folder, output_path, chunk_rows, processes):
+    import run_predictions as rp
+    model, meta = rp.load_model(model_folder)
+    data = pd.read_csv(input_path)
+    proba = model.predict_proba(data[meta['feature_names']])[:, list(model.classes_).index('Y')]
+    pd.DataFrame({'match_id': data['match_id'], 'team_0_win_proba': proba}).to_csv(output_path, index=False)
+
+def chunked(input_path, model_folder, output_path, chunk_rows, processes):
+    import orchestrators as o
+    o.predict_matches(input_path, model_folder, output_path, chunk_rows, processes, trace_path=output_path + ".trace.json")
+
+def measured(fn, args, results):
+    # the pipeline modules configure INFO logging on import
+    import orchestrators
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    t0 = time.perf_counter()
+    fn(*args)
+    # ru_maxrss is in KB on linux
+    results.put((time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def run_case(fn, *args):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measured, args=(fn, args, results))
+    process.start()
+    wall_s, peak_mb = results.get()
+    process.join()
+    return wall_s, peak_mb
+
+def run(args):
+    source = pd.read_csv(training_csv(args.model_folder))
+    tmp = tempfile.mkdtemp(prefix="bench_predict_matches_")
+    print(f"\n{'rows':>8} {'input_MB':>9} {'mode':<14} {'wall_s':>7} {'rows/s':>8} {'peak_rss_mb':>12}")
+    try:
+        for rows in args.rows:
+            input_path = os.path.join(tmp, "input.csv")
+            repeats = -(-rows // len(source))
+            pd.concat([source] * repeats, ignore_index=True).iloc[:rows].to_csv(input_path, index=False)
+            size_mb = os.path.getsize(input_path) / 1e6
+            outputs = {}
+            for name, fn in (("whole file", whole_file), ("chunked", chunked)):
+                outputs[name] = os.path.join(tmp, f"{name.replace(' ', '_')}.csv")
+                wall_s, peak_mb = run_case(fn, input_path, args.model_folder, outputs[name], args.chunk_rows, args.processes)
+                print(f"{rows:>8} {size_mb:>9.0f} {name:<14} {wall_s:>7.1f} {rows / wall_s:>8.0f} {peak_mb:>12.0f}")
+            whole = pd.read_csv(outputs["whole file"])['team_0_win_proba'].to_numpy()
+            streamed = pd.read_csv(outputs["chunked"])['team_0_win_proba'].to_numpy()
+            assert np.abs(whole - streamed).max() < 1e-12, "chunked probabilities differ from the whole file ones"
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", default="8.26.25_rf_std", help="Folder with model.joblib, meta.json and a *_training_data.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000], help="Input sizes in matches")
+    parser.add_argument("--chunk_rows", type=int, default=50_000, help="Rows per chunk of the chunked run")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes of the chunked run")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args)
@@ -0,0 +1,84 @@
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+import run_predictions as rp
+from benchmarks.mock_api import MockApiServer, synthetic_matches
+from data import fetch_data as fd
+
+"""Client side latency and throughput of the run_predictions HTTP service, one request per match,
+--concurrency clients sending at once, for each --max_batch (1 = no micro batching).
+Player hero stats come from the local mock API through a warmed sqlite cache, as in steady state serving.
+Example launch command: python -m benchmarks.bench_predict_service --model_folder 8.26.25_rf_std --max_batch 1 32 --concurrency 1 16
+"""
+
+def client_run(url, matches, concurrency):
+    """posts every match once from concurrency threads, returns (latencies_s, elapsed_s)"""
+    local = threading.local()
+
+    def post(players):
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        t0 = time.perf_counter()
+        response = session.post(url + "/predict", json={"players": players})
+        response.raise_for_status()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(post, matches))
+    return np.array(latencies), time.perf_counter() - t0
+
+def run(args):
+    matches = [[{k: p[k] for k in ("account_id", "hero_id", "team")} for p in m["players"]]
+               for m in synthetic_matches(1754006400, 1754092799, args.matches)]
+    tmp = tempfile.mkdtemp(prefix="bench_predict_")
+    cache_path = os.path.join(tmp, "player_hero_stats.sqlite")
+
+    print(f"\n{'max_batch':>9} {'clients':>8} {'requests':>9} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8} {'avg_batch':>9}")
+    try:
+        with MockApiServer(latency_s=args.latency, matches_per_day=args.matches) as server:
+            fd.set_client(fd.ApiClient(base_url=server.url, rate_per_s=0))
+            for max_batch in args.max_batch:
+                service = rp.PredictionService(args.model_folder, max_batch, args.max_wait_ms, as_of_date="2025-08-01",
+                                               cache_path=cache_path, engine=args.engine,
+                                               model_cache=os.path.join(tmp, "models"))
+                # fills the player hero stats cache, so the runs below measure the service rather than the mock api
+                service.features.build([rp.parse_players(m) for m in matches])
+                httpd = rp.make_server(service, port=0)
+                threading.Thread(target=httpd.serve_forever, daemon=True).start()
+                url = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+                for concurrency in args.concurrency:
+                    batches_before = len(service.batcher.batch_sizes)
+                    latencies, elapsed = client_run(url, matches, concurrency)
+                    sizes = list(service.batcher.batch_sizes)[batches_before:]
+                    p50, p99 = np.percentile(latencies * 1000, [50, 99])
+                    print(f"{max_batch:>9} {concurrency:>8} {len(matches):>9} {len(matches) / elapsed:>8.1f} "
+                          f"{p50:>8.1f} {p99:>8.1f} {np.mean(sizes):>9.1f}")
+                httpd.shutdown()
+                httpd.server_close()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", default="8.26.25_rf_std", help="Folder with model.joblib and meta.json")
+    parser.add_argument("--matches", type=int, default=200, help="Requests per run, one match each")
+    parser.add_argument("--max_batch", type=int, nargs="+", default=[1, 32], help="Micro batch sizes to compare")
+    parser.add_argument("--max_wait_ms", type=float, default=2.0, help="Micro batch wait")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16], help="Concurrent clients")
+    parser.add_argument("--engine", choices=rp.ENGINES, default="compiled", help="Model scoring engine of the service")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock API latency per request in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args)
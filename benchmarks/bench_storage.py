@@ -0,0 +1,64 @@
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import create_team_stats as cts
+from benchmarks.bench_team_stats import synthetic_player_stats
+from benchmarks.timing import timed
+from data import columnar as col
+
+"""CSV checkpoints (to_csv / read_csv) vs zstd Parquet partitioned by match date (data.columnar)
+on the wide training frames. Matches are synthetic 6v6 player rows spread over --days days,
+aggregated into the std_diff and quantiles layouts. Reports size on disk, write time, full read time
+and a projected read of --columns feature columns.
+Example launch command: python -m benchmarks.bench_storage --matches 10000 100000
+"""
+
+def run(match_counts, days, n_columns, repeat):
+    print(f"\n{'matches':>8} {'layout':<15} {'format':<8} {'MB':>8} {'write_s':>8} {'read_s':>8} {'proj_s':>8}")
+    tmp = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        for n_matches in match_counts:
+            players = synthetic_player_stats(n_matches)
+            match_ids = players["match_id"].unique()
+            day = pd.Timestamp("2025-08-01") + pd.to_timedelta(np.arange(len(match_ids)) % days, unit="D")
+            dates = pd.Series(day.strftime("%Y-%m-%d"), index=match_ids)
+            layouts = cts.create_team_stat_layouts(players, layouts=("std_diff", "quantiles"))
+
+            for layout, frame in layouts.items():
+                projected = ["match_id"] + list(frame.columns[2:2 + n_columns])
+
+                csv_path = os.path.join(tmp, f"{layout}.csv")
+                write_s, _ = timed(lambda: frame.to_csv(csv_path, index=False), repeat)
+                read_s, _ = timed(lambda: pd.read_csv(csv_path), repeat)
+                proj_s, _ = timed(lambda: pd.read_csv(csv_path, usecols=projected), repeat)
+                print(f"{n_matches:>8} {layout:<15} {'csv':<8} {os.path.getsize(csv_path) / 1e6:>8.2f} "
+                      f"{write_s:>8.3f} {read_s:>8.3f} {proj_s:>8.3f}")
+
+                pq_path = col.table_path(tmp, layout)
+                write_s, _ = timed(lambda: col.write_table(pq_path, frame, dates), repeat)
+                read_s, loaded = timed(lambda: col.read_table(pq_path), repeat)
+                proj_s, _ = timed(lambda: col.read_table(pq_path, columns=projected), repeat)
+                # partitions come back grouped by date, the rows and dtypes themselves are unchanged
+                expected = frame.assign(_day=frame["match_id"].map(dates)).sort_values("_day", kind="stable")
+                pd.testing.assert_frame_equal(loaded, expected.drop(columns="_day").reset_index(drop=True))
+                print(f"{n_matches:>8} {layout:<15} {'parquet':<8} {col.table_bytes(pq_path) / 1e6:>8.2f} "
+                      f"{write_s:>8.3f} {read_s:>8.3f} {proj_s:>8.3f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, nargs="+", default=[10000, 100000], help="Match counts to benchmark")
+    parser.add_argument("--days", type=int, default=7, help="Match dates the rows are spread over (partitions)")
+    parser.add_argument("--columns", type=int, default=10, help="Feature columns in the projected read")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the fastest is reported")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.matches, args.days, args.columns, args.repeat)
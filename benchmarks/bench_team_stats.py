@@ -0,0 +1,62 @@
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+import create_team_stats as cts
+from benchmarks.timing import timed
+
+"""create_std_team_stats: groupby(['match_id','team']).agg vs the (matches, 2, 6, features) tensor path.
+Player rows are synthetic 6v6 matches with every TEAM_STATS column and a share of missing player stats.
+Rows are grouped by match with teams interleaved, like raw_players, --shuffle randomizes the row order.
+--ragged drops a player from some matches to time the groupby fallback.
+Example launch command: python -m benchmarks.bench_team_stats --matches 1000 10000 100000
+"""
+
+def synthetic_player_stats(n_matches, nan_share=0.05, ragged=0, shuffle=False, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_matches * 2 * cts.TEAM_SIZE
+    match_ids = np.repeat(np.arange(n_matches, dtype=np.int64) + 38_000_000, 2 * cts.TEAM_SIZE)
+    team = np.tile([0, 1], n_matches * cts.TEAM_SIZE)
+    winner = rng.integers(0, 2, n_matches).repeat(2 * cts.TEAM_SIZE)
+
+    stats = {
+        "account_id": rng.integers(1, 2 ** 31, n).astype(np.uint32),
+        "match_id": match_ids,
+        "team": pd.Categorical.from_codes(team, categories=["Team0", "Team1"]),
+        "win": team == winner,
+        "hero_id": rng.integers(1, 70, n).astype(np.int16),
+    }
+    for col in cts.TEAM_STATS:
+        values = rng.gamma(2.0, 50.0, n).astype(np.float32)
+        # players without hero stats come out of the left merge as NaN
+        values[rng.random(n) < nan_share] = np.nan
+        stats[col] = values
+
+    df = pd.DataFrame(stats)
+    if shuffle:
+        df = df.sample(frac=1.0, random_state=seed, ignore_index=True)
+    if ragged:
+        df = df.drop(index=df.drop_duplicates("match_id").index[:ragged]).reset_index(drop=True)
+    return df
+
+def run(match_counts, ragged, shuffle, repeat):
+    print(f"\n{'matches':>8} {'groupby_s':>10} {'tensor_s':>9} {'speedup':>8}")
+    for n_matches in match_counts:
+        df = synthetic_player_stats(n_matches, ragged=ragged, shuffle=shuffle)
+        groupby_s, expected = timed(lambda: cts.create_std_team_stats(df, use_tensor=False), repeat)
+        tensor_s, result = timed(lambda: cts.create_std_team_stats(df), repeat)
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-6)
+        print(f"{n_matches:>8} {groupby_s:>10.4f} {tensor_s:>9.4f} {groupby_s / tensor_s:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, nargs="+", default=[1000, 10000, 100000], help="Match counts to benchmark")
+    parser.add_argument("--ragged", type=int, default=0, help="Matches that lose a player (forces the groupby fallback)")
+    parser.add_argument("--shuffle", action="store_true", help="Randomize player row order")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the fastest is reported")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.matches, args.ragged, args.shuffle, args.repeat)
@@ -0,0 +1,129 @@
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import orchestrators as o
+from data.schema import apply_schema
+from data.warehouse import Warehouse
+
+"""In memory pandas stages (merge -> derive -> team_stats) vs the DuckDB warehouse build of the same layout.
+Raw matches, players, player hero and hero stats are synthetic: --matches 6v6 matches over --days days
+drawn from a pool of accounts, so accounts repeat across matches like in a long window.
+Example launch command: python -m benchmarks.bench_warehouse --matches 10000 100000 --memory_limit 1GB
+"""
+
+def synthetic_raw(n_matches, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    match_ids = np.arange(n_matches, dtype=np.int64) + 38_000_000
+    start = 1754006400 + np.sort(rng.integers(0, days * 86400, n_matches))
+    raw_matches = pd.DataFrame({
+        "match_id": match_ids,
+        "start_time": start,
+        "winning_team": np.where(rng.random(n_matches) < 0.5, "Team0", "Team1"),
+    })
+
+    n_players = n_matches * 12
+    accounts = rng.integers(1, max(n_matches * 3, 100), n_players)
+    raw_players = pd.DataFrame({
+        "account_id": accounts,
+        "match_id": np.repeat(match_ids, 12),
+        "team": np.tile(np.repeat(["Team0", "Team1"], 6), n_matches),
+        "hero_id": rng.integers(1, 70, n_players),
+    })
+
+    pairs = raw_players[["account_id", "hero_id"]].drop_duplicates(ignore_index=True)
+    # a few players without hero stats, they come out of the left merge as NaN
+    pairs = pairs[rng.random(len(pairs)) > 0.02].reset_index(drop=True)
+    n = len(pairs)
+    matches_played = rng.integers(0, 300, n)
+    player_hero_stats = pairs.assign(
+        matches_played=matches_played,
+        wins=(matches_played * rng.random(n)).astype(np.int64),
+        kills=rng.integers(0, 12, n) * matches_played,
+        deaths=rng.integers(0, 10, n) * matches_played,
+        assists=rng.integers(0, 15, n) * matches_played,
+        damage_per_min=rng.uniform(500, 2500, n),
+        time_played=matches_played * rng.integers(1200, 2400, n),
+        kills_per_min=rng.random(n),
+        deaths_per_min=rng.random(n),
+        accuracy=rng.uniform(0.2, 0.7, n),
+    )
+
+    heroes = np.arange(1, 70)
+    h_matches = rng.integers(10_000, 100_000, len(heroes))
+    hero_stats = pd.DataFrame({
+        "hero_id": heroes,
+        "h_wins": (h_matches * rng.uniform(0.4, 0.6, len(heroes))).astype(np.int64),
+        "h_matches": h_matches,
+        "h_total_kills": h_matches * rng.integers(4, 8, len(heroes)),
+        "h_total_deaths": h_matches * rng.integers(4, 8, len(heroes)),
+        "h_total_assists": h_matches * rng.integers(6, 12, len(heroes)),
+        "h_total_player_damage": h_matches * rng.integers(20_000, 40_000, len(heroes)),
+    })
+    tables = {"raw_matches": raw_matches, "raw_players": raw_players,
+              "player_hero_stats": player_hero_stats, "hero_stats": hero_stats}
+    for table, df in tables.items():
+        apply_schema(df, report=False)
+    return tables
+
+def window_dates(raw_matches):
+    days = pd.to_datetime(raw_matches["start_time"], unit="s", utc=True).dt.strftime("%Y-%m-%d")
+    return days.min(), days.max()
+
+def pandas_build(tables, layout):
+    normalized = o.stage_normalize(tables["raw_matches"], tables["raw_players"])
+    merged = o.stage_merge(tables["player_hero_stats"].copy(), tables["hero_stats"])
+    derived = o.stage_derive(merged["p_ph_h_stats"], o.cts.TEAM_STATS)
+    team = o.stage_team_stats(normalized["match_players"], derived["all_stats"], basic=False)
+    return team[f"training_data_{layout}"]
+
+def run(match_counts, layout, days, threads, memory_limit):
+    print(f"\n{'matches':>8} {'layout':<15} {'pandas_s':>9} {'ingest_s':>9} {'build_s':>9} {'fetch_s':>8}")
+    tmp = tempfile.mkdtemp(prefix="bench_warehouse_")
+    try:
+        for n_matches in match_counts:
+            tables = synthetic_raw(n_matches, days)
+
+            t0 = time.perf_counter()
+            expected = pandas_build(tables, layout)
+            pandas_s = time.perf_counter() - t0
+
+            path = os.path.join(tmp, f"wh_{n_matches}.duckdb")
+            with Warehouse(path, threads, memory_limit) as wh:
+                t0 = time.perf_counter()
+                # one window covering every match, its stats snapshots are the synthetic ones
+                wh.ingest_window(tables, *window_dates(tables["raw_matches"]))
+                ingest_s = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                table = wh.build(layout)
+                build_s = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                result = wh.fetch(table)
+                fetch_s = time.perf_counter() - t0
+
+            assert list(result.columns) == list(expected.columns) and len(result) == len(expected)
+            numeric = expected.columns[2:] if layout.endswith("_diff") else expected.columns[1:-1]
+            # SQL and numpy sum in a different order, the float32 results differ in the last bit
+            assert np.allclose(result[numeric].to_numpy(float), expected[numeric].to_numpy(float),
+                               rtol=1e-4, atol=1.01e-3, equal_nan=True)
+            print(f"{n_matches:>8} {layout:<15} {pandas_s:>9.3f} {ingest_s:>9.3f} {build_s:>9.3f} {fetch_s:>8.3f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, nargs="+", default=[10000, 100000], help="Match counts to benchmark")
+    parser.add_argument("--layout", default="std_diff", choices=list(o.TEAM_STAT_LAYOUTS.values()), help="Team stat layout")
+    parser.add_argument("--days", type=int, default=30, help="Days the matches are spread over")
+    parser.add_argument("--threads", type=int, help="DuckDB threads, defaults to all cores")
+    parser.add_argument("--memory_limit", help="DuckDB memory limit, e.g. 1GB")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.matches, args.layout, args.days, args.threads, args.memory_limit)
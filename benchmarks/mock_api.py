@@ -0,0 +1,316 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Local stand-in for the Deadlock API, used to benchmark and test the fetch layer offline.
+
+Serves /v1/matches/metadata, /v1/matches/{id}/metadata, /v1/players/hero-stats and /v1/analytics/hero-stats in 3 modes:
+    synthetic - generates deterministic fake payloads
+    record    - forwards to the real API (upstream) and saves each 200 response as a fixture
+    replay    - serves saved fixtures, falls back to synthetic payloads if replay_fallback is set
+Latency (with jitter) and an error rate (503s and 429s) can be injected in every mode.
+
+Example launch command: python -m benchmarks.mock_api --mode replay --fixtures benchmarks/fixtures --port 8765
+then point the pipeline at it with DEADLOCK_API_BASE=http://127.0.0.1:8765 or --api_base.
+"""
+
+DEFAULT_UPSTREAM = "https://api.deadlock-api.com"
+N_HEROES = 60
+
+def synthetic_matches(min_ts: int, max_ts: int, count: int, seed: int = 0) -> list[dict]:
+    """builds count fake matches with 12 players each, start_time spread over [min_ts, max_ts]"""
+    rng = random.Random(seed ^ min_ts)
+    matches = []
+    for i in range(count):
+        match_id = min_ts * 1000 + i
+        winning_team = rng.choice(["Team0", "Team1"])
+        players = []
+        for p in range(12):
+            players.append({
+                "account_id": rng.randint(1, 500_000),
+                "team": "Team0" if p < 6 else "Team1",
+                "hero_id": rng.randint(1, N_HEROES),
+                "kills": rng.randint(0, 20),
+                "deaths": rng.randint(0, 20),
+                "assists": rng.randint(0, 30),
+                "denies": rng.randint(0, 40),
+                "net_worth": rng.randint(10_000, 60_000),
+            })
+        matches.append({
+            "match_id": match_id,
+            "start_time": rng.randint(min_ts, max_ts),
+            "game_mode": "Normal",
+            "match_mode": "Ranked",
+            "duration_s": rng.randint(900, 3000),
+            "winning_team": winning_team,
+            "players": players,
+        })
+    return matches
+
+def synthetic_player_hero_stats(account_ids: list[int], max_ts: int = 0, seed: int = 0) -> list[dict]:
+    """builds 1-8 hero stat rows per account, deterministic per (account_id, max_ts)"""
+    rows = []
+    for account_id in account_ids:
+        rng = random.Random(seed ^ (account_id * 7919 + max_ts))
+        for hero_id in rng.sample(range(1, N_HEROES + 1), rng.randint(1, 8)):
+            matches_played = rng.randint(1, 300)
+            time_played = matches_played * rng.randint(1200, 2400)
+            kills = rng.randint(0, 12 * matches_played)
+            deaths = rng.randint(0, 10 * matches_played)
+            minutes = time_played / 60
+            rows.append({
+                "account_id": account_id,
+                "hero_id": hero_id,
+                "matches_played": matches_played,
+                "wins": rng.randint(0, matches_played),
+                "kills": kills,
+                "deaths": deaths,
+                "assists": rng.randint(0, 15 * matches_played),
+                "damage_per_min": rng.uniform(500, 2500),
+                "time_played": time_played,
+                "kills_per_min": kills / minutes,
+                "deaths_per_min": deaths / minutes,
+                "accuracy": rng.uniform(0.2, 0.7),
+                "matches": [],
+            })
+    return rows
+
+def synthetic_hero_stats(seed: int = 0) -> list[dict]:
+    """one analytics row per hero id, the columns create_training_data reads from /v1/analytics/hero-stats"""
+    rng = random.Random(seed)
+    rows = []
+    for hero_id in range(1, N_HEROES + 1):
+        matches = rng.randint(20_000, 60_000)
+        wins = rng.randint(int(matches * 0.4), int(matches * 0.6))
+        rows.append({
+            "hero_id": hero_id,
+            "bucket": None,
+            "wins": wins,
+            "losses": matches - wins,
+            "matches": matches,
+            "matches_per_bucket": matches * 20,
+            "players": rng.randint(2_000, 9_000),
+            "total_kills": matches * rng.randint(4, 8),
+            "total_deaths": matches * rng.randint(4, 8),
+            "total_assists": matches * rng.randint(6, 12),
+            "total_net_worth": matches * rng.randint(25_000, 40_000),
+            "total_last_hits": matches * rng.randint(100, 200),
+            "total_denies": matches * rng.randint(3, 8),
+            "total_player_damage": matches * rng.randint(15_000, 35_000),
+            "total_player_damage_taken": matches * rng.randint(15_000, 35_000),
+            "total_boss_damage": matches * rng.randint(3_000, 8_000),
+            "total_creep_damage": matches * rng.randint(20_000, 40_000),
+            "total_neutral_damage": matches * rng.randint(20_000, 40_000),
+            "total_max_health": matches * rng.randint(2_000, 4_000),
+            "total_shots_hit": matches * rng.randint(1_000, 3_000),
+            "total_shots_missed": matches * rng.randint(1_000, 3_000),
+        })
+    return rows
+
+def fixture_name(path: str, params: dict) -> str:
+    """file name of the fixture for a request, stable regardless of query parameter order"""
+    query = urlencode(sorted(params.items()))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f"{path.strip('/').replace('/', '_')}__{digest}.json"
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    """serves the Deadlock API endpoints the fetch layer uses, see module docstring for modes.
+    The number of matches returned scales with the requested window (matches_per_day per 24h)
+    and is capped at the request limit, like the real endpoint.
+    """
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server.count(url.path)
+
+        latency = server.latency_s + (random.uniform(0, server.latency_jitter_s) if server.latency_jitter_s else 0)
+        if latency:
+            time.sleep(latency)
+
+        if server.error_rate and random.random() < server.error_rate:
+            server.count("injected_errors")
+            if random.random() < 0.5:
+                self._send_json({"error": "injected rate limit"}, status=429, headers={"Retry-After": "0"})
+            else:
+                self._send_json({"error": "injected server error"}, status=503)
+            return
+
+        if server.mode == "record":
+            self._record(url.path, params)
+            return
+
+        if server.mode == "replay":
+            fixture = os.path.join(server.fixtures_dir, fixture_name(url.path, params))
+            if os.path.exists(fixture):
+                with open(fixture, "rb") as f:
+                    self._send_body(f.read())
+                return
+            if not server.replay_fallback:
+                self._send_json({"error": f"no fixture for {self.path}"}, status=404)
+                return
+
+        payload = self._synthetic(url.path, params)
+        if payload is None:
+            self._send_json({"error": f"unknown path {url.path}"}, status=404)
+        else:
+            self._send_json(payload)
+
+    def _synthetic(self, path: str, params: dict):
+        server = self.server
+        if path == "/v1/matches/metadata":
+            min_ts = int(params.get("min_unix_timestamp", 0))
+            max_ts = int(params.get("max_unix_timestamp", min_ts + 86399))
+            limit = int(params.get("limit", 1000))
+            count = min(limit, round(server.matches_per_day * (max_ts - min_ts + 1) / 86400))
+            return synthetic_matches(min_ts, max_ts, count, server.seed)
+        if path.startswith("/v1/matches/") and path.endswith("/metadata"):
+            match_id = int(path.split("/")[3])
+            match = synthetic_matches(match_id // 1000, match_id // 1000 + 86399, match_id % 1000 + 1, server.seed)[-1]
+            return match
+        if path == "/v1/players/hero-stats":
+            account_ids = [int(a) for a in params.get("account_ids", "").split(",") if a]
+            return synthetic_player_hero_stats(account_ids, int(params.get("max_unix_timestamp", 0)), server.seed)
+        if path == "/v1/analytics/hero-stats":
+            return synthetic_hero_stats(server.seed)
+        return None
+
+    def _record(self, path: str, params: dict):
+        server = self.server
+        upstream_url = f"{server.upstream}{self.path}"
+        try:
+            with urllib.request.urlopen(upstream_url, timeout=120) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            self._send_body(e.read(), status=e.code)
+            return
+        except urllib.error.URLError as e:
+            self._send_json({"error": f"upstream unreachable: {e.reason}"}, status=502)
+            return
+
+        os.makedirs(server.fixtures_dir, exist_ok=True)
+        with open(os.path.join(server.fixtures_dir, fixture_name(path, params)), "wb") as f:
+            f.write(body)
+        server.count("recorded")
+        self._send_body(body)
+
+    def _send_json(self, payload, status=200, headers=None):
+        self._send_body(json.dumps(payload).encode(), status, headers)
+
+    def _send_body(self, body: bytes, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # keep benchmark output readable
+        pass
+
+class MockApiServer:
+    """runs MockApiHandler on a background thread, use as a context manager.
+    - latency_s / latency_jitter_s: fixed + uniform random delay per request
+    - error_rate: probability of answering 429/503 instead of the payload
+    - mode: 'synthetic', 'record' or 'replay' (see module docstring)
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.2,
+        matches_per_day: int = 50,
+        port: int = 0,
+        latency_jitter_s: float = 0.0,
+        error_rate: float = 0.0,
+        mode: str = "synthetic",
+        fixtures_dir: str = "benchmarks//fixtures",
+        upstream: str = DEFAULT_UPSTREAM,
+        replay_fallback: bool = False,
+        seed: int = 0
+        ):
+        if mode not in ("synthetic", "record", "replay"):
+            raise ValueError(f"unknown mock api mode {mode}")
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MockApiHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency_s = latency_s
+        self.httpd.latency_jitter_s = latency_jitter_s
+        self.httpd.error_rate = error_rate
+        self.httpd.matches_per_day = matches_per_day
+        self.httpd.mode = mode
+        self.httpd.fixtures_dir = fixtures_dir
+        self.httpd.upstream = upstream.rstrip("/")
+        self.httpd.replay_fallback = replay_fallback
+        self.httpd.seed = seed
+
+        self.httpd.counts = {}
+        counts_lock = threading.Lock()
+        def count(key):
+            with counts_lock:
+                self.httpd.counts[key] = self.httpd.counts.get(key, 0) + 1
+        self.httpd.count = count
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def counts(self) -> dict:
+        """requests served per path, plus injected_errors / recorded"""
+        return dict(self.httpd.counts)
+
+    def __enter__(self):
+        self.thread.start()
+        logging.info(f"mock api ({self.httpd.mode}) listening on {self.url}")
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default="benchmarks//fixtures", help="Fixture folder for record/replay")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="Real API base url (record mode)")
+    parser.add_argument("--replay_fallback", action="store_true", help="Serve synthetic payloads for missing fixtures")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency in seconds")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Probability of a 429/503 response")
+    parser.add_argument("--matches_per_day", type=int, default=2000)
+    args = parser.parse_args()
+
+    server = MockApiServer(
+        latency_s=args.latency,
+        matches_per_day=args.matches_per_day,
+        port=args.port,
+        latency_jitter_s=args.jitter,
+        error_rate=args.error_rate,
+        mode=args.mode,
+        fixtures_dir=args.fixtures,
+        upstream=args.upstream,
+        replay_fallback=args.replay_fallback
+    )
+    with server:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info(f"served: {server.counts}")
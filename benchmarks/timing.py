@@ -0,0 +1,19 @@
+import time
+
+import numpy as np
+
+"""Wall clock timing shared by the benchmarks.
+Example: best_s, result = timed(lambda: fn(df), repeat=5)
+"""
+
+def timed(fn, repeat: int, stat=np.min):
+    """calls fn() repeat times, returns (stat of the wall seconds of each call, the last call's result).
+    The default is the best of repeat, stat=None returns every call's seconds as an array."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    times = np.array(times)
+    return (times if stat is None else float(stat(times))), result
@@ -2,34 +2,251 @@ import logging
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
+from data.schema import win_label
+from data import lookup as lk
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# player stats aggregated into team stats, calculate_ph_stats(features=TEAM_STATS) computes just these
+TEAM_STATS = [
+    'p_total_matches_played', 'p_total_time_played',
+    'p_win_rate', 'ph_matches_played', 'ph_time_played',
+    'ph_kills_per_min', 'ph_deaths_per_min', 'ph_accuracy',
+    'ph_total_kd', 'h_total_kd', 'ph_kd_ratio', 
+    'ph_hero_xp_ratio', 'ph_avg_match_length',
+    'ph_avg_damage_per_match', 'h_damage_per_match', 'ph_damage_ratio',
+    'ph_assists_ratio', 'ph_win_rate', 'h_total_win_rate',
+    'ph_win_rate_ratio'
+]
+
+# players per team in every valid match
+TEAM_SIZE = 6
+
+def team_tensor(stats_df: pd.DataFrame, columns: list[str]):
+    """Sorts player rows by (match_id, team) into an (n_matches, 2, TEAM_SIZE, n_features) float64 array.
+    Returns (order, match_ids, tensor), order being the row positions in sorted order,
+    or None when the frame can't be laid out that way (ragged teams, more than two teams, non numeric columns).
+    """
+    if stats_df.empty or not all(pd.api.types.is_numeric_dtype(stats_df[c].dtype) for c in columns):
+        return None
+    if len(stats_df) % (2 * TEAM_SIZE):
+        return None
+
+    team = stats_df['team']
+    if isinstance(team.dtype, pd.CategoricalDtype):
+        team_codes = team.cat.codes.to_numpy()
+        n_teams = len(team.cat.categories)
+    else:
+        team_codes, labels = pd.factorize(team, sort=True)
+        n_teams = len(labels)
+    if n_teams != 2 or (team_codes < 0).any():
+        return None
+
+    match_ids = stats_df['match_id'].to_numpy()
+    # stable sort keeps players in their original order inside a team (matters for 'first'),
+    # rows coming from raw_players are already grouped by match so this is close to a linear pass
+    order = np.argsort(match_ids.astype(np.int64) * 2 + team_codes, kind='stable')
+    sorted_matches = match_ids[order].reshape(-1, 2 * TEAM_SIZE)
+    sorted_teams = team_codes[order].reshape(-1, 2, TEAM_SIZE)
+    if not ((sorted_matches == sorted_matches[:, :1]).all()
+            and (sorted_matches[1:, 0] != sorted_matches[:-1, 0]).all()
+            and (sorted_teams[:, 0] == 0).all() and (sorted_teams[:, 1] == 1).all()):
+        return None
+
+    # stored player-major (TEAM_SIZE, n_matches, 2, n_features) and returned as a transposed view,
+    # so reductions over the player axis combine contiguous slices
+    n_matches = len(sorted_matches)
+    player_major = order.reshape(n_matches, 2, TEAM_SIZE).transpose(2, 0, 1).ravel()
+    # gather in the frame's own dtype, then widen to float64 so reductions match pandas precision
+    tensor = stats_df[columns].to_numpy().take(player_major, axis=0).astype(np.float64, copy=False)
+    tensor = tensor.reshape(TEAM_SIZE, n_matches, 2, len(columns)).transpose(1, 2, 0, 3)
+    return order, sorted_matches[:, 0], tensor
+
+# stats per layout family, quantiles as used by the models/8.14.25_rf_1_quantiles* runs
+LAYOUT_STATS = {
+    'std': ('min', 'max', 'mean', 'std'),
+    'quantiles': ('min', 'max', 'q25', 'median', 'q75'),
+}
+QUANTILES = {'q25': 0.25, 'median': 0.5, 'q75': 0.75}
+# 'team' = one row per (match, team) like create_std_team_stats, '<stats>' = Team0/Team1 columns
+# like create_training_data, '<stats>_diff' = Team0 - Team1 like create_differential_training_data
+LAYOUTS = ('team', 'std', 'std_diff', 'quantiles', 'quantiles_diff')
+
+def _stat_dtype(dtype, stat: str):
+    """result dtype of a team stat, as groupby gives it: min/max keep the column dtype, the rest are float"""
+    if stat in ('min', 'max'):
+        return dtype
+    return dtype if dtype == np.float32 else np.float64
+
+def _team_reductions(tensor: np.ndarray, stats: tuple[str, ...]) -> dict[str, np.ndarray]:
+    """reduces the player axis of an (n_matches, 2, TEAM_SIZE, n_features) tensor to (n_matches, 2, n_features)
+    per stat, skipping NaN like pandas. NaN where a team has no values (std: fewer than two).
+    quantiles interpolate linearly between the sorted non NaN values, like groupby().quantile()
+    """
+    missing = np.isnan(tensor)
+    has_nan = missing.any()
+    count = TEAM_SIZE - missing.sum(axis=2) if has_nan else None
+    reduced = {}
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if 'min' in stats:
+            # fmin / fmax ignore NaN unless the whole team is NaN
+            reduced['min'] = np.fmin.reduce(tensor, axis=2)
+        if 'max' in stats:
+            reduced['max'] = np.fmax.reduce(tensor, axis=2)
+
+        if 'mean' in stats or 'std' in stats:
+            if not has_nan:
+                reduced['mean'] = tensor.mean(axis=2)
+                if 'std' in stats:
+                    reduced['std'] = tensor.std(axis=2, ddof=1)
+            else:
+                values = np.where(missing, 0.0, tensor)
+                reduced['mean'] = values.sum(axis=2) / count
+                if 'std' in stats:
+                    np.subtract(values, reduced['mean'][:, :, None], out=values)
+                    np.copyto(values, 0.0, where=missing)
+                    np.square(values, out=values)
+                    reduced['std'] = np.sqrt(values.sum(axis=2) / (count - 1))
+                    reduced['std'][count < 2] = np.nan
+
+        wanted = [stat for stat in stats if stat in QUANTILES]
+        if wanted:
+            # NaN sort last, so the first count values of each team are its sorted non NaN values
+            ordered = np.sort(tensor, axis=2)
+            valid = np.full(tensor.shape[:2] + tensor.shape[3:], TEAM_SIZE) if count is None else count
+            for stat in wanted:
+                position = QUANTILES[stat] * (valid - 1)
+                low = np.clip(np.floor(position).astype(np.intp), 0, TEAM_SIZE - 1)
+                high = np.clip(low + 1, 0, TEAM_SIZE - 1)
+                frac = position - low
+                low_v = np.take_along_axis(ordered, low[:, :, None], axis=2)[:, :, 0]
+                high_v = np.take_along_axis(ordered, high[:, :, None], axis=2)[:, :, 0]
+                # frac is 0 on exact positions, so the (possibly NaN) next value is skipped there
+                result = np.where(frac > 0, low_v + (high_v - low_v) * frac, low_v)
+                result[valid == 0] = np.nan
+                reduced[stat] = result
+
+    return {stat: reduced[stat] for stat in stats}
+
+def _team_labels(stats_df: pd.DataFrame) -> list:
+    team = stats_df['team']
+    if isinstance(team.dtype, pd.CategoricalDtype):
+        return list(team.cat.categories)
+    return list(pd.factorize(team, sort=True)[1])
+
+def _team_keys(stats_df: pd.DataFrame, match_ids: np.ndarray) -> dict:
+    """match_id / team columns laid out like groupby(['match_id','team']).reset_index()"""
+    team_codes = np.tile(np.array([0, 1], dtype=np.int8), len(match_ids))
+    team = stats_df['team']
+    if isinstance(team.dtype, pd.CategoricalDtype):
+        team_col = pd.Categorical.from_codes(team_codes, dtype=team.dtype)
+    else:
+        team_col = np.array(_team_labels(stats_df), dtype=object)[team_codes]
+    return {'match_id': np.repeat(match_ids, 2), 'team': team_col}
+
+def _tensor_stat_arrays(stats_df: pd.DataFrame, columns: list[str], stats: tuple[str, ...]):
+    """_team_stat_arrays on the team tensor, None (logging why) when the frame can't be laid out as one"""
+    if stats_df['win'].hasnans:
+        logging.info("Missing win values in player stats, aggregating team stats with groupby")
+        return None
+    laid_out = team_tensor(stats_df, columns)
+    if laid_out is None:
+        logging.info("Ragged teams in player stats, aggregating team stats with groupby")
+        return None
+    order, match_ids, tensor = laid_out
+    win = stats_df['win'].to_numpy()[order].reshape(len(match_ids), 2, TEAM_SIZE)[:, :, 0]
+    return match_ids, win, _team_reductions(tensor, stats)
+
+def _team_stat_arrays(stats_df: pd.DataFrame, columns: list[str], stats: tuple[str, ...], use_tensor: bool = True):
+    """Aggregates player rows once into per team arrays.
+    Returns (match_ids, win (n_matches, 2), {stat: (n_matches, 2, n_features) float64}), matches in match_id order.
+    6v6 frames go through the team tensor, anything else through groupby (a missing team is left NaN).
+    """
+    if use_tensor:
+        laid_out = _tensor_stat_arrays(stats_df, columns, stats)
+        if laid_out is not None:
+            return laid_out
+
+    grouped = stats_df.groupby(['match_id', 'team'], observed=True)
+    match_ids = np.sort(stats_df['match_id'].unique())
+    full = pd.MultiIndex.from_product([match_ids, _team_labels(stats_df)], names=['match_id', 'team'])
+
+    def to_array(frame):
+        return frame.reindex(full).to_numpy(dtype=np.float64).reshape(len(match_ids), 2, -1)
+
+    arrays = {}
+    for stat in stats:
+        if stat in QUANTILES:
+            arrays[stat] = to_array(grouped[columns].quantile(QUANTILES[stat]))
+        else:
+            arrays[stat] = to_array(grouped[columns].agg(stat))
+    win = grouped['win'].first().reindex(full).to_numpy().reshape(len(match_ids), 2)
+    return match_ids, win, arrays
+
+def _std_team_stats_tensor(stats_df: pd.DataFrame, columns: list[str]) -> pd.DataFrame | None:
+    """create_std_team_stats on the team tensor, None when the frame isn't 6v6 or a win is missing"""
+    laid_out = _tensor_stat_arrays(stats_df, columns, LAYOUT_STATS['std'])
+    return None if laid_out is None else _team_layout(stats_df, columns, *laid_out)
+
+def _team_layout(stats_df, columns, match_ids, win, arrays) -> pd.DataFrame:
+    """one row per (match, team): match_id, team, {col}_{stat}..., win_first"""
+    n_rows = len(match_ids) * 2
+    # feature-major copies, so each output column below is a contiguous row
+    flat = {stat: np.ascontiguousarray(values.reshape(n_rows, len(columns)).T) for stat, values in arrays.items()}
+    team_stats = _team_keys(stats_df, match_ids)
+    for j, col in enumerate(columns):
+        for stat, values in flat.items():
+            team_stats[f'{col}_{stat}'] = values[j].astype(_stat_dtype(stats_df[col].dtype, stat))
+    team_stats['win_first'] = win.reshape(n_rows)
+    return pd.DataFrame(team_stats)
+
+def _team_win_label(win: np.ndarray) -> pd.Series:
+    """team_0_win from the Team0 win_first values"""
+    team_0 = pd.Series(win[:, 0])
+    if team_0.dtype == object:
+        # groupby fallback, matches without a Team0 row stay NaN
+        return team_0.map({True: 'Y', False: 'N', 'Y': 'Y', 'N': 'N'})
+    return win_label(team_0)
+
+def _team_columns_layout(stats_df, columns, match_ids, win, arrays) -> pd.DataFrame:
+    """one row per match: match_id, {col}_{stat}_Team0, {col}_{stat}_Team1..., team_0_win"""
+    labels = _team_labels(stats_df)
+    t_stats = {'match_id': match_ids}
+    for j, col in enumerate(columns):
+        for stat, values in arrays.items():
+            dtype = _stat_dtype(stats_df[col].dtype, stat)
+            for t, label in enumerate(labels):
+                t_stats[f'{col}_{stat}_{label}'] = values[:, t, j].astype(dtype)
+    t_stats['team_0_win'] = _team_win_label(win).to_numpy()
+    return pd.DataFrame(t_stats)
+
+def _diff_layout(stats_df, columns, match_ids, win, arrays) -> pd.DataFrame:
+    """one row per match: match_id, team_0_win, {col}_{stat}_diff (Team0 - Team1, rounded to 3 decimals)"""
+    t_stats = {'match_id': match_ids, 'team_0_win': _team_win_label(win).to_numpy()}
+    for j, col in enumerate(columns):
+        for stat, values in arrays.items():
+            dtype = _stat_dtype(stats_df[col].dtype, stat)
+            diff = values[:, 0, j].astype(dtype) - values[:, 1, j].astype(dtype)
+            t_stats[f'{col}_{stat}_diff'] = np.round(diff, 3)
+    return pd.DataFrame(t_stats)
+
 def merge_match_player_stats(p_m_stats,p_stats)-> pd.DataFrame:
     p_m_stats = p_m_stats[['account_id','match_id','team','winning_team','win','hero_id']]
-    p_m_stats = p_m_stats.merge(p_stats, on=['account_id', 'hero_id'], how='left')
+    p_m_stats = lk.indexed_merge(p_m_stats, p_stats, on=['account_id', 'hero_id'], how='left')
     return p_m_stats
 
-def create_std_team_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
+def create_std_team_stats(stats_df: pd.DataFrame, use_tensor: bool = True) -> pd.DataFrame:
     """
     Create team-level stats based on player&player_hero stats in min, max, mean, and std.
+    use_tensor = aggregate 6v6 matches on a stacked array, ragged teams always go through groupby
     """
 
-    phm_stats = pd.DataFrame()
-    phm_stats = stats_df.copy()
-
-    # set the team stats to be set for training
-    team_stats = [
-        'p_total_matches_played', 'p_total_time_played',
-        'p_win_rate', 'ph_matches_played', 'ph_time_played',
-        'ph_kills_per_min', 'ph_deaths_per_min', 'ph_accuracy',
-        'ph_total_kd', 'h_total_kd', 'ph_kd_ratio', 
-        'ph_hero_xp_ratio', 'ph_avg_match_length',
-        'ph_avg_damage_per_match', 'h_damage_per_match', 'ph_damage_ratio',
-        'ph_assists_ratio', 'ph_win_rate', 'h_total_win_rate',
-        'ph_win_rate_ratio'
-    ]
+    # groupby below never mutates stats_df, so no copy of the wide frame is needed
+    phm_stats = stats_df
+
+    team_stats = TEAM_STATS
 
     # check for missing columns
     missing_cols = [col for col in team_stats if col not in phm_stats.columns]
@@ -37,6 +254,12 @@ def create_std_team_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
         print(f"*CRITICAL* Missing columns in team stats: {missing_cols}")
         return pd.DataFrame()  # Return an empty DataFrame if missing columns are found
 
+    # fast path: every match is 6v6, aggregate on a (matches, team, player, feature) array
+    if use_tensor:
+        tensor_stats = _std_team_stats_tensor(phm_stats, team_stats)
+        if tensor_stats is not None:
+            return tensor_stats
+
     # for each columm, set min, max, and quantiles
     agg_function = {
         col: ["min", "max",
@@ -49,7 +272,7 @@ def create_std_team_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
     
     # group by columns, using agg_function as the aggregation function
     phm_stats = (phm_stats.groupby(
-        ['match_id','team']).agg(
+        ['match_id','team'], observed=True).agg(
             agg_function))    
     
     # converts lambda tuples into col:val pairs
@@ -77,20 +300,10 @@ def create_basic_team_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
     Create team-level stats based on player&player_hero stats in min, max, mean, and std.
     """
 
-    phm_stats = pd.DataFrame()
-    phm_stats = stats_df.copy()
-
-    # set the team stats to be set for training
-    team_stats = [
-        'p_total_matches_played', 'p_total_time_played',
-        'p_win_rate', 'ph_matches_played', 'ph_time_played',
-        'ph_kills_per_min', 'ph_deaths_per_min', 'ph_accuracy',
-        'ph_total_kd', 'h_total_kd', 'ph_kd_ratio', 
-        'ph_hero_xp_ratio', 'ph_avg_match_length',
-        'ph_avg_damage_per_match', 'h_damage_per_match', 'ph_damage_ratio',
-        'ph_assists_ratio', 'ph_win_rate', 'h_total_win_rate',
-        'ph_win_rate_ratio'
-    ]
+    # groupby below never mutates stats_df, so no copy of the wide frame is needed
+    phm_stats = stats_df
+
+    team_stats = TEAM_STATS
 
     # check for missing columns
     missing_cols = [col for col in team_stats if col not in phm_stats.columns]
@@ -110,7 +323,7 @@ def create_basic_team_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
     
     # group by columns, using agg_function as the aggregation function
     phm_stats = (phm_stats.groupby(
-        ['match_id','team']).agg(
+        ['match_id','team'], observed=True).agg(
             agg_function))    
 
 
@@ -124,7 +337,8 @@ def create_training_data(team_stat_base:pd.DataFrame) -> pd.DataFrame:
     t_stats = t_stats.pivot(index='match_id', columns='team')
 
     t_stats.columns = [f'{col[0]}_{col[1]}' for col in t_stats.columns]
-    t_stats['team_0_win'] = t_stats['win_first_Team0']
+    # label stays 'Y'/'N' even though the schema keeps win as bool upstream
+    t_stats['team_0_win'] = win_label(t_stats['win_first_Team0'])
     t_stats.drop('win_first_Team0', axis=1, inplace=True)
     t_stats.drop('win_first_Team1', axis=1, inplace=True)
     t_stats = t_stats.reset_index()
@@ -156,6 +370,39 @@ def create_differential_training_data(team_stat_base:pd.DataFrame) -> pd.DataFra
     return result
 
 
+def create_team_stat_layouts(stats_df: pd.DataFrame, layouts: tuple[str, ...] = LAYOUTS,
+                             columns: list[str] = TEAM_STATS, use_tensor: bool = True) -> dict[str, pd.DataFrame]:
+    """
+    Aggregates player stats per team once and emits every requested layout from the same arrays:
+        team = create_std_team_stats output (one row per match & team)
+        std / quantiles = Team0 / Team1 columns per stat, like create_training_data
+        std_diff / quantiles_diff = Team0 - Team1 per stat, like create_differential_training_data
+    std stats are min, max, mean, std, quantile stats are min, max, q25, median, q75.
+    Returns {layout: DataFrame}.
+    """
+    unknown = [layout for layout in layouts if layout not in LAYOUTS]
+    if unknown:
+        raise ValueError(f"Unknown team stat layouts: {unknown}, expected some of {LAYOUTS}")
+    missing_cols = [col for col in columns if col not in stats_df.columns]
+    if missing_cols:
+        print(f"*CRITICAL* Missing columns in team stats: {missing_cols}")
+        return {layout: pd.DataFrame() for layout in layouts}
+
+    families = {layout: 'std' if layout == 'team' else layout.removesuffix('_diff') for layout in layouts}
+    stats = tuple(dict.fromkeys(stat for family in families.values() for stat in LAYOUT_STATS[family]))
+    match_ids, win, arrays = _team_stat_arrays(stats_df, columns, stats, use_tensor)
+
+    emitted = {}
+    for layout, family in families.items():
+        family_arrays = {stat: arrays[stat] for stat in LAYOUT_STATS[family]}
+        if layout == 'team':
+            emitted[layout] = _team_layout(stats_df, columns, match_ids, win, family_arrays)
+        elif layout.endswith('_diff'):
+            emitted[layout] = _diff_layout(stats_df, columns, match_ids, win, family_arrays)
+        else:
+            emitted[layout] = _team_columns_layout(stats_df, columns, match_ids, win, family_arrays)
+    return emitted
+
 if __name__ == "__main__":
     start_date = "2025-08-19"
     end_date = "2025-08-21"
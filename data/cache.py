@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Persistent on-disk caches for player hero stats responses and fetched match days"""
+
+DEFAULT_CACHE_PATH = "v2_data//cache//player_hero_stats.sqlite"
+DEFAULT_MATCH_DAY_CACHE = "v2_data//cache//match_days"
+
+# sqlite caps the number of bound variables per statement, IN (...) lookups are chunked below it
+_SQL_CHUNK = 500
+# entries written between exact size / ttl checks of the whole table, in between the size is a running estimate
+EVICT_CHECK_WRITES = 20_000
+# eviction frees down to this fraction of max_bytes, so a full cache isn't recounted on every put
+EVICT_LOW_WATER = 0.9
+
+class PlayerHeroStatsCache:
+    """SQLite cache of /v1/players/hero-stats rows, one entry per (source, account_id, min_unix, max_unix),
+    source = the api base url the rows came from, so mock and real api rows never mix.
+
+    - path: sqlite file, created if missing
+    - ttl_s: entries older than this are treated as misses (None = never expire)
+    - max_bytes: once stored payloads exceed this, least recently used entries are evicted down to
+      EVICT_LOW_WATER * max_bytes. The stored size is
+      summed at open and every EVICT_CHECK_WRITES writes (which also catches other processes' writes), writes in
+      between add to a running total, so a put doesn't scan the table
+
+    An account with no hero stats is stored as an empty list, so it is a hit next time too.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_s: float | None = 7 * 24 * 3600, max_bytes: int = 1024 ** 3):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(player_hero_stats)")]
+        if columns and "source" not in columns:
+            # entries written before they were keyed by api can't be told apart, start over
+            self.conn.execute("DROP TABLE player_hero_stats")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS player_hero_stats (
+                source TEXT NOT NULL,
+                account_id INTEGER NOT NULL,
+                min_unix INTEGER NOT NULL,
+                max_unix INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (source, account_id, min_unix, max_unix)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_phs_accessed ON player_hero_stats (accessed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_phs_created ON player_hero_stats (created_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM player_hero_stats").fetchone()[0]
+        self.writes_since_check = 0
+
+    @staticmethod
+    def key_range(min_unix: int | None, max_unix: int | None) -> tuple[int, int]:
+        # sqlite primary keys treat NULLs as distinct, so an open bound is stored as -1
+        return (-1 if min_unix is None else int(min_unix), -1 if max_unix is None else int(max_unix))
+
+    def get_many(self, account_ids: list[int], min_unix: int | None, max_unix: int | None,
+                 source: str = "") -> tuple[dict[int, list[dict]], list[int]]:
+        """returns ({account_id: hero stat rows} for cached accounts, [account_ids not cached])"""
+        min_key, max_key = self.key_range(min_unix, max_unix)
+        now = time.time()
+        found: dict[int, list[dict]] = {}
+        expired = 0
+
+        with self.lock:
+            for i in range(0, len(account_ids), _SQL_CHUNK):
+                chunk = [int(a) for a in account_ids[i:i + _SQL_CHUNK]]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT account_id, payload, created_at FROM player_hero_stats "
+                    f"WHERE source = ? AND min_unix = ? AND max_unix = ? AND account_id IN ({marks})",
+                    [source, min_key, max_key, *chunk]).fetchall()
+                for account_id, payload, created_at in rows:
+                    if self.ttl_s is not None and now - created_at > self.ttl_s:
+                        expired += 1
+                        continue
+                    found[account_id] = json.loads(payload)
+
+            if found:
+                self.conn.executemany(
+                    "UPDATE player_hero_stats SET accessed_at = ? WHERE source = ? AND account_id = ? AND min_unix = ? AND max_unix = ?",
+                    [(now, source, a, min_key, max_key) for a in found])
+                self.conn.commit()
+
+            missing = [a for a in account_ids if int(a) not in found]
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(missing)
+            self.stats["expired"] += expired
+
+        return found, missing
+
+    def put_many(self, rows_by_account: dict[int, list[dict]], min_unix: int | None, max_unix: int | None, source: str = ""):
+        """stores hero stat rows per account, replacing any existing entry, then evicts if over max_bytes"""
+        if not rows_by_account:
+            return
+        min_key, max_key = self.key_range(min_unix, max_unix)
+        now = time.time()
+        records = []
+        for account_id, rows in rows_by_account.items():
+            payload = json.dumps(rows, separators=(",", ":"))
+            records.append((source, int(account_id), min_key, max_key, payload, len(payload), now, now))
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO player_hero_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self.conn.commit()
+            self.stats["writes"] += len(records)
+            # replaced entries are counted again, the estimate only errs towards checking early
+            self.total_bytes += sum(r[5] for r in records)
+            self.writes_since_check += len(records)
+            if self.total_bytes > self.max_bytes or self.writes_since_check >= EVICT_CHECK_WRITES:
+                self._evict()
+
+    def _evict(self):
+        # caller holds self.lock, recounts the stored size exactly
+        self.writes_since_check = 0
+        if self.ttl_s is not None:
+            cur = self.conn.execute("DELETE FROM player_hero_stats WHERE created_at < ?", (time.time() - self.ttl_s,))
+            self.stats["evictions"] += cur.rowcount
+
+        total = self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM player_hero_stats").fetchone()[0]
+        if total > self.max_bytes:
+            # walk entries oldest access first until enough bytes are freed
+            to_free = total - int(self.max_bytes * EVICT_LOW_WATER)
+            freed, victims = 0, []
+            for source, account_id, min_key, max_key, size in self.conn.execute(
+                    "SELECT source, account_id, min_unix, max_unix, size FROM player_hero_stats ORDER BY accessed_at"):
+                victims.append((source, account_id, min_key, max_key))
+                freed += size
+                if freed >= to_free:
+                    break
+            self.conn.executemany(
+                "DELETE FROM player_hero_stats WHERE source = ? AND account_id = ? AND min_unix = ? AND max_unix = ?", victims)
+            self.stats["evictions"] += len(victims)
+            self.total_bytes = total - freed
+        self.conn.commit()
+
+    def size_bytes(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM player_hero_stats").fetchone()[0]
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def log_stats(self):
+        s = self.stats
+        logging.info(
+            f"player hero stats cache: {s['hits']} hits, {s['misses']} misses ({self.hit_rate():.1%} hit rate), "
+            f"{s['expired']} expired, {s['writes']} writes, {s['evictions']} evictions, {self.size_bytes() / 1e6:.1f} MB")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class MatchDayCache:
+    """One pickled MatchFrameBuilder per fetched day and api (root/<hash of the api base url>/<YYYY-MM-DD>.pkl),
+    shared by every run / process fetching overlapping windows.
+
+    - root: cache folder, created if missing
+    - settle_s: a day is only stored once its end is this long ago, the API still ingests recent matches
+
+    Files are written to a temp name and renamed, so a reader in another process never sees half a day.
+    """
+
+    def __init__(self, root: str = DEFAULT_MATCH_DAY_CACHE, settle_s: float = 24 * 3600):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.settle_s = settle_s
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def path(self, day: str, source: str = "") -> str:
+        return os.path.join(self.root, hashlib.sha1(source.encode()).hexdigest()[:12], f"{day}.pkl")
+
+    def settled(self, day_end_unix: int) -> bool:
+        return day_end_unix < time.time() - self.settle_s
+
+    def get(self, day: str, source: str = ""):
+        """the cached builder of day fetched from source, or None"""
+        try:
+            with open(self.path(day, source), "rb") as f:
+                builder = pickle.load(f)
+        except FileNotFoundError:
+            builder = None
+        with self.lock:
+            self.stats["hits" if builder is not None else "misses"] += 1
+        return builder
+
+    def put(self, day: str, day_end_unix: int, builder, source: str = "") -> bool:
+        """stores builder for day fetched from source if the day has settled, returns whether it was stored"""
+        if not self.settled(day_end_unix):
+            return False
+        path = self.path(day, source)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(builder, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        with self.lock:
+            self.stats["writes"] += 1
+        return True
+
+    def log_stats(self):
+        s = self.stats
+        logging.info(f"match day cache: {s['hits']} hits, {s['misses']} misses, {s['writes']} writes ({self.root})")
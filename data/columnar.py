@@ -0,0 +1,89 @@
+import logging
+import os
+import shutil
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Compressed Parquet tables partitioned by match date, replacing the pipeline's CSV checkpoints"""
+
+PARTITION_COLUMN = "match_date"
+COMPRESSION = "zstd"
+
+def match_dates(raw_matches: pd.DataFrame) -> pd.Series:
+    """match_id -> 'YYYY-MM-DD' (UTC) of the match start, used to partition tables without a start_time"""
+    dates = pd.to_datetime(raw_matches["start_time"], unit="s", utc=True).dt.strftime("%Y-%m-%d")
+    return pd.Series(dates.to_numpy(), index=raw_matches["match_id"].to_numpy())
+
+def _partition_values(df: pd.DataFrame, dates: pd.Series | None):
+    if "start_time" in df.columns and pd.api.types.is_integer_dtype(df["start_time"].dtype):
+        return pd.to_datetime(df["start_time"], unit="s", utc=True).dt.strftime("%Y-%m-%d").to_numpy()
+    if dates is not None and "match_id" in df.columns:
+        return df["match_id"].map(dates).fillna("unknown").to_numpy()
+    return None
+
+def write_table(path: str, df: pd.DataFrame, dates: pd.Series | None = None, append: bool = False) -> int:
+    """Writes df as Parquet under path, returns bytes written.
+    Rows are partitioned into path/match_date=YYYY-MM-DD/ when df has start_time, or match_id and dates
+    (from match_dates) are given, otherwise path is a single file. append adds files next to the existing ones.
+    dtypes (categoricals, int16/uint32 ids, float32) round trip through the pandas metadata.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    partitions = _partition_values(df, dates)
+
+    if not append and os.path.exists(path):
+        shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+    if partitions is None:
+        if append and os.path.exists(path):
+            raise ValueError(f"{path} is not partitioned, it can only be rewritten")
+        pq.write_table(table, path, compression=COMPRESSION)
+        return os.path.getsize(path)
+
+    table = table.append_column(PARTITION_COLUMN, pa.array(partitions, type=pa.string()))
+    written = []
+    ds.write_dataset(
+        table, path, format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        # appends get new, time ordered names so they never overwrite earlier parts of the same day
+        # and read back in the order they were written
+        basename_template=f"part-{time.time_ns():020d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION),
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return sum(os.path.getsize(f) for f in written)
+
+def read_table(path: str, columns: list[str] | None = None, dates: list[str] | None = None,
+               memory_map: bool = True) -> pd.DataFrame:
+    """Reads a table written by write_table.
+    - columns: only these columns are read from disk (projection)
+    - dates: only these match_date partitions are read
+    - memory_map: files are memory mapped instead of read into buffers
+    """
+    if os.path.isdir(path):
+        filters = [(PARTITION_COLUMN, "in", list(dates))] if dates is not None else None
+        table = pq.read_table(path, columns=columns, filters=filters, memory_map=memory_map, partitioning="hive")
+        if PARTITION_COLUMN in table.column_names and (columns is None or PARTITION_COLUMN not in columns):
+            table = table.drop_columns([PARTITION_COLUMN])
+    else:
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+    return table.to_pandas()
+
+def table_exists(path: str) -> bool:
+    return os.path.exists(path)
+
+def table_bytes(path: str) -> int:
+    """size on disk of a table (file or partition folder)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def table_path(folder: str, table: str) -> str:
+    """where a pipeline table lives inside an output folder"""
+    return os.path.join(folder, f"{table}.parquet")
@@ -157,10 +157,19 @@ def save_model(model, params, folder, model_id, feature_names):
     "random_state": params.get("random_state", 42),
     }, open(f"{folder}/meta.json","w"))
 
-def save_report(training_data, model_id, model_folder, results):
+def save_report(training_data, model_id, model_folder, results, training_source=None):
+    """writes results.txt and a small training_data.json pointing at the training data
+    (source folder, shape, columns, content hash) instead of a full copy of it per model"""
     import json
+    from data.stages import frame_digest
 
-    training_data.to_csv(f"{model_folder}/{model_id}_training_data.csv")
+    with open(f"{model_folder}/{model_id}_training_data.json", "w") as f:
+        json.dump({
+            "source": training_source,
+            "rows": len(training_data),
+            "columns": list(training_data.columns),
+            "digest": frame_digest(training_data),
+        }, f, indent=4)
 
     with open(f"{model_folder}/{model_id}_results.txt", "w") as f:
         f.write(f"Accuracy: {results['accuracy']}\n\n")
@@ -217,7 +226,7 @@ if __name__ == "__main__":
     features = X.tolist()
 
     save_model(model, params, model_folder, model_id, features)
-    save_report(training_data, model_id, model_folder, report)
+    save_report(training_data, model_id, model_folder, report, training_source=training_path)
 
     train = X_train.copy()
     train["target"] = y_train
@@ -0,0 +1,256 @@
+import argparse
+import logging
+import os
+import re
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+import create_team_stats as cts
+from data import columnar as col
+from data import fetch_data as fd
+from data import process_data as dp
+from data.schema import apply_schema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Point in time store of per (account_id, hero_id) player features (the all_stats columns the team stats use),
+one snapshot per as-of date, served from an in-memory hash index.
+A match's 12 player rows are gathered from the index and reduced to its team stats layout with the reductions of
+create_team_stat_layouts, without building a DataFrame. Training lookups only use snapshots taken before the match.
+Example launch command: python -m data.feature_store --as_of_date 2025-08-01 --start_date 2025-08-02 --end_date 2025-08-03
+"""
+
+DEFAULT_FEATURE_STORE = "v2_data//feature_store"
+KEYS = ['account_id', 'hero_id']
+# snapshot folder names, put's <date>.<pid>.tmp folders don't match
+SNAPSHOT_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def player_features(player_hero_stats: pd.DataFrame, hero_stats: pd.DataFrame) -> pd.DataFrame:
+    """all_stats (KEYS + cts.TEAM_STATS, one row per key) of fetched players, the merge and derive stages of create_training_data.
+    Every feature of a row depends on its own account and hero only, so players can be derived in any grouping."""
+    if player_hero_stats is None or player_hero_stats.empty:
+        return pd.DataFrame({c: pd.Series(dtype=np.float32 if c in cts.TEAM_STATS else np.int64) for c in KEYS + cts.TEAM_STATS})
+    player_stats = apply_schema(fd.process_player_stats(player_hero_stats), report=False)
+    player_hero_stats, player_stats, hero_stats = dp.check_unique_naming(player_hero_stats, player_stats, hero_stats)
+    p_ph_h_stats = apply_schema(dp.merge_player_hero_stats(player_hero_stats, player_stats, hero_stats), report=False)
+    all_stats = apply_schema(dp.calculate_ph_stats(p_ph_h_stats, features=cts.TEAM_STATS), report=False)
+    return all_stats[KEYS + cts.TEAM_STATS]
+
+def fetch_player_features(account_ids, as_of_date: str, hero_stats: pd.DataFrame, cache=None,
+                          fetch_workers: int = 4) -> tuple[pd.DataFrame, list[int]]:
+    """(player_features, covered accounts) of account_ids with player stats up to the end of as_of_date.
+    Accounts whose fetch still failed after retries aren't covered, so they are looked up again next time."""
+    rows_by_account = fd.fetch_player_hero_stats_by_account(
+        account_ids=list(account_ids), fetch_till_date=as_of_date, fetch_from_date=None, batch_size=700,
+        cache=cache, max_workers=fetch_workers)
+    player_hero_stats = apply_schema(fd._player_hero_frame(account_ids, rows_by_account), report=False)
+    covered = [int(a) for a in account_ids if int(a) in rows_by_account]
+    return player_features(player_hero_stats, hero_stats), covered
+
+class PlayerFeatureIndex:
+    """(account_id, hero_id) -> row of a float64 feature matrix, for one as-of date.
+    Row 0 is all NaN and stands for every key without stats, like the left merge of merge_match_player_stats.
+    accounts holds every account whose stats were looked up, with or without rows, so misses are only fetched once.
+    """
+
+    def __init__(self, as_of_date: str, columns: list[str] = cts.TEAM_STATS):
+        self.as_of_date = as_of_date
+        self.columns = list(columns)
+        self.values = np.full((1024, len(self.columns)), np.nan)
+        self.n_rows = 1
+        self.rows: dict[int, int] = {}
+        self.accounts: set[int] = set()
+
+    def __len__(self):
+        return self.n_rows - 1
+
+    @staticmethod
+    def key(account_id: int, hero_id: int) -> int:
+        # hero_id fits the schema's int16
+        return (int(account_id) << 16) | int(hero_id)
+
+    def add(self, all_stats: pd.DataFrame, account_ids=None):
+        """indexes all_stats rows (a later row of a key replaces the earlier one), account_ids = accounts they cover"""
+        self.accounts.update(int(a) for a in (all_stats['account_id'] if account_ids is None else account_ids))
+        if all_stats.empty:
+            return
+
+        needed = self.n_rows + len(all_stats)
+        if needed > len(self.values):
+            grown = np.full((max(needed, 2 * len(self.values)), len(self.columns)), np.nan)
+            grown[:self.n_rows] = self.values[:self.n_rows]
+            self.values = grown
+        keys = [self.key(a, h) for a, h in zip(all_stats['account_id'].tolist(), all_stats['hero_id'].tolist())]
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.n_rows
+                self.n_rows += 1
+            rows[i] = row
+        self.values[rows] = all_stats[self.columns].to_numpy(dtype=np.float64)
+
+    def missing_accounts(self, matches) -> list[int]:
+        """accounts of matches' players never looked up"""
+        return sorted({p[0] for match in matches for p in match} - self.accounts)
+
+    def lookup(self, matches) -> np.ndarray:
+        """(n_matches, 2, TEAM_SIZE) row of each player, players in their given order within a team, 0 = no stats"""
+        rows = np.empty((len(matches), 2, cts.TEAM_SIZE), dtype=np.int64)
+        get = self.rows.get
+        for m, match in enumerate(matches):
+            filled = [0, 0]
+            for account_id, hero_id, team in match:
+                t = 0 if team == 'Team0' else 1
+                rows[m, t, filled[t]] = get((int(account_id) << 16) | int(hero_id), 0)
+                filled[t] += 1
+        return rows
+
+    @classmethod
+    def from_frames(cls, as_of_date: str, all_stats: pd.DataFrame, account_ids) -> "PlayerFeatureIndex":
+        index = cls(as_of_date)
+        index.add(all_stats, account_ids)
+        return index
+
+class TeamFeatures:
+    """A model's team stats features (meta.json feature_names of a std / quantiles layout, per team or _diff)
+    computed from gathered player rows, equal to create_team_stat_layouts on the merged player frame."""
+
+    def __init__(self, feature_names: list[str], columns: list[str] = cts.TEAM_STATS):
+        self.feature_names = list(feature_names)
+        self.diff = all(name.endswith('_diff') for name in self.feature_names)
+        family = 'quantiles' if any(f"_{q}_" in name for name in self.feature_names for q in cts.QUANTILES) else 'std'
+        self.stats = cts.LAYOUT_STATS[family]
+        sides = ('diff',) if self.diff else ('Team0', 'Team1')
+        # positions[stat][side][j] = output column of feature {columns[j]}_{stat}_{side}, -1 when the model doesn't use it
+        self.positions = {stat: {side: np.full(len(columns), -1) for side in sides} for stat in self.stats}
+        where = {f"{c}_{stat}_{side}": (stat, side, j) for j, c in enumerate(columns) for stat in self.stats for side in sides}
+        unknown = [name for name in self.feature_names if name not in where]
+        if unknown:
+            raise ValueError(f"features can't be built from player features ({family}{'_diff' if self.diff else ''} layout): {unknown}")
+        for i, name in enumerate(self.feature_names):
+            stat, side, j = where[name]
+            self.positions[stat][side][j] = i
+
+    def build(self, index: PlayerFeatureIndex, matches) -> np.ndarray:
+        """(n_matches, n_features) float64, columns in feature_names order"""
+        rows = index.lookup(matches)
+        # stored player-major like cts.team_tensor, so the reductions add players in the same order
+        tensor = index.values[rows.transpose(2, 0, 1)].transpose(1, 2, 0, 3)
+        # training windows always hold players without stats, so their left merge makes every column float32.
+        # Every match gets those casts, a match's features never depend on the rest of its batch
+        out = np.empty((len(matches), len(self.feature_names)))
+        for stat, values in cts._team_reductions(tensor, self.stats).items():
+            cast = values.astype(np.float32)
+            sides = {'diff': np.round(cast[:, 0] - cast[:, 1], 3)} if self.diff else {'Team0': cast[:, 0], 'Team1': cast[:, 1]}
+            for side, block in sides.items():
+                positions = self.positions[stat][side]
+                used = positions >= 0
+                out[:, positions[used]] = block[:, used]
+        return out
+
+class FeatureStore:
+    """Folder of player feature snapshots, root/<as_of_date>/ holding
+    - all_stats.parquet: player_features of every covered account, player stats up to the end of as_of_date
+    - accounts.parquet: every covered account, those without any hero stats included
+
+    Snapshots are written to a temp folder and renamed, and loaded into a PlayerFeatureIndex once per process.
+    """
+
+    def __init__(self, root: str = DEFAULT_FEATURE_STORE):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.loaded: dict[str, PlayerFeatureIndex] = {}
+
+    def path(self, as_of_date: str) -> str:
+        return os.path.join(self.root, as_of_date)
+
+    def dates(self) -> list[str]:
+        """as-of dates with a snapshot, oldest first"""
+        return sorted(d for d in os.listdir(self.root)
+                      if SNAPSHOT_DATE.fullmatch(d) and os.path.exists(os.path.join(self.root, d, "accounts.parquet")))
+
+    def put(self, as_of_date: str, all_stats: pd.DataFrame, account_ids) -> str:
+        tmp = f"{self.path(as_of_date)}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        col.write_table(os.path.join(tmp, "all_stats.parquet"), all_stats.reset_index(drop=True))
+        col.write_table(os.path.join(tmp, "accounts.parquet"), pd.DataFrame({'account_id': np.asarray(sorted(account_ids), dtype=np.int64)}))
+        if os.path.exists(self.path(as_of_date)):
+            shutil.rmtree(self.path(as_of_date))
+        os.replace(tmp, self.path(as_of_date))
+        self.loaded.pop(as_of_date, None)
+        logging.info(f"feature store snapshot {as_of_date}: {len(all_stats)} player hero rows of {len(account_ids)} accounts")
+        return self.path(as_of_date)
+
+    def load(self, as_of_date: str) -> PlayerFeatureIndex:
+        if as_of_date not in self.loaded:
+            t0 = time.perf_counter()
+            folder = self.path(as_of_date)
+            all_stats = col.read_table(os.path.join(folder, "all_stats.parquet"))
+            accounts = col.read_table(os.path.join(folder, "accounts.parquet"))['account_id'].tolist()
+            self.loaded[as_of_date] = PlayerFeatureIndex.from_frames(as_of_date, all_stats, accounts)
+            logging.info(f"Loaded feature store snapshot {as_of_date} ({len(all_stats)} rows) in {time.perf_counter() - t0:.2f}s")
+        return self.loaded[as_of_date]
+
+    def latest(self, on_or_before: str) -> str | None:
+        """newest snapshot date <= on_or_before, for live scoring"""
+        dates = [d for d in self.dates() if d <= on_or_before]
+        return dates[-1] if dates else None
+
+    def as_of_for(self, start_time: int) -> str | None:
+        """newest snapshot whose stats all end before start_time (unix seconds), so a match never sees its own outcome"""
+        dates = [d for d in self.dates() if fd.unix_utc_eod(d) < start_time]
+        return dates[-1] if dates else None
+
+    def point_in_time_features(self, matches, start_times, feature_names: list[str]) -> np.ndarray:
+        """(n_matches, n_features) for training: each match from the newest snapshot before its start_time.
+        Raises ValueError for matches older than every snapshot, players outside their snapshot's accounts count as without stats."""
+        team = TeamFeatures(feature_names)
+        as_of = [self.as_of_for(int(t)) for t in start_times]
+        if None in as_of:
+            raise ValueError(f"{as_of.count(None)} matches start before the end of the oldest snapshot {self.dates()[:1]}")
+        out = np.empty((len(matches), len(team.feature_names)))
+        for date in sorted(set(as_of)):
+            positions = [i for i, d in enumerate(as_of) if d == date]
+            index = self.load(date)
+            group = [matches[i] for i in positions]
+            uncovered = index.missing_accounts(group)
+            if uncovered:
+                logging.warning(f"{len(uncovered)} accounts of {len(group)} matches aren't in snapshot {date}, they count as without stats")
+            out[positions] = team.build(index, group)
+        return out
+
+def build_snapshot(store: FeatureStore, as_of_date: str, account_ids, hero_stats: pd.DataFrame, cache=None,
+                   fetch_workers: int = 4) -> str:
+    """fetches and derives player features of account_ids as of as_of_date into a store snapshot"""
+    account_ids = sorted(set(int(a) for a in account_ids))
+    all_stats, covered = fetch_player_features(account_ids, as_of_date, hero_stats, cache, fetch_workers)
+    if len(covered) < len(account_ids):
+        logging.warning(f"{len(account_ids) - len(covered)} accounts failed to fetch, left out of snapshot {as_of_date}")
+    return store.put(as_of_date, all_stats, covered)
+
+if __name__ == "__main__":
+    from data.cache import PlayerHeroStatsCache, DEFAULT_CACHE_PATH, MatchDayCache, DEFAULT_MATCH_DAY_CACHE
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--as_of_date", required=True, help="Player and hero stats up to the end of this date (YYYY-MM-DD)")
+    parser.add_argument("--start_date", required=True, help="Players of matches from this date on are covered")
+    parser.add_argument("--end_date", required=True, help="Players of matches up to this date are covered")
+    parser.add_argument("--root", default=DEFAULT_FEATURE_STORE, help="Feature store folder")
+    parser.add_argument("--cache_path", default=DEFAULT_CACHE_PATH, help="Player hero stats cache file, pass '' to disable")
+    parser.add_argument("--day_cache_path", default=DEFAULT_MATCH_DAY_CACHE, help="Match day cache folder, pass '' to disable")
+    parser.add_argument("--fetch_workers", type=int, default=4, help="Concurrent fetches")
+    parser.add_argument("--api_base", help="Deadlock API base url, e.g. a local benchmarks.mock_api server")
+    args = parser.parse_args()
+
+    if args.api_base:
+        fd.set_api_base(args.api_base)
+    _, raw_players = fd.bulk_fetch_match_frames(args.start_date, args.end_date, limit=1000, max_workers=args.fetch_workers,
+                                                day_cache=MatchDayCache(args.day_cache_path) if args.day_cache_path else None)
+    hero_stats = pd.json_normalize(fd.fetch_hero_stats(fetch_from_date='2020-01-01', fetch_till_date=args.as_of_date))
+    hero_stats = apply_schema(hero_stats.add_prefix('h_').rename(columns={'h_hero_id': 'hero_id'}), report=False)
+    cache = PlayerHeroStatsCache(args.cache_path) if args.cache_path else None
+    build_snapshot(FeatureStore(args.root), args.as_of_date, raw_players['account_id'].unique(), hero_stats, cache, args.fetch_workers)
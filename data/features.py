@@ -0,0 +1,113 @@
+import logging
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Registry of derived player / hero features computed by calculate_ph_stats"""
+
+class Feature(NamedTuple):
+    """a derived column: a (op) b, then / divisor, set to 0 wherever guard == 0
+    - op: 'div' or 'mul'
+    - guard: column checked for zero, not always the denominator
+    """
+    name: str
+    op: str
+    a: str
+    b: str
+    guard: str
+    divisor: float | None = None
+
+    @property
+    def inputs(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys((self.a, self.b, self.guard)))
+
+# declared in evaluation order, a feature may use any feature declared above it
+FEATURES: dict[str, Feature] = {f.name: f for f in [
+    # player_hero kd for the player<>hero combo
+    Feature('ph_total_kd', 'div', 'ph_kills', 'ph_deaths', guard='ph_deaths'),
+    # all 100 badge hero stats, total kd- used to compare player performance with hero
+    Feature('h_total_kd', 'div', 'h_total_kills', 'h_total_deaths', guard='h_total_deaths'),
+    # compares player_hero kd to average hero_kd - player skill with hero.
+    Feature('ph_kd_ratio', 'div', 'ph_total_kd', 'h_total_kd', guard='ph_total_kd'),
+    # What % of matches the player played with hero, compared to all matches played with hero.
+    Feature('ph_hero_xp_ratio', 'div', 'ph_matches_played', 'h_matches', guard='ph_matches_played'),
+    # Create damage per match ratio, player_hero to hero
+    Feature('ph_avg_match_length', 'div', 'ph_time_played', 'ph_matches_played', guard='ph_time_played', divisor=60),
+    Feature('ph_avg_damage_per_match', 'mul', 'ph_damage_per_min', 'ph_avg_match_length', guard='ph_avg_match_length'),
+    Feature('h_damage_per_match', 'div', 'h_total_player_damage', 'h_matches', guard='h_matches'),
+    Feature('ph_damage_ratio', 'div', 'ph_avg_damage_per_match', 'h_damage_per_match', guard='ph_avg_damage_per_match'),
+    # player_hero ratios
+    Feature('ph_assists_ratio', 'div', 'ph_assists', 'h_total_assists', guard='h_total_assists'),
+    Feature('ph_win_rate', 'div', 'ph_wins', 'ph_matches_played', guard='ph_matches_played'),
+    Feature('h_total_win_rate', 'div', 'h_wins', 'h_matches', guard='h_matches'),
+    Feature('ph_win_rate_ratio', 'div', 'ph_win_rate', 'h_total_win_rate', guard='ph_win_rate'),
+]}
+
+def dependency_graph() -> dict[str, tuple[str, ...]]:
+    """{feature: inputs}, inputs are either source columns or other features"""
+    return {name: f.inputs for name, f in FEATURES.items()}
+
+def resolve(columns: list[str] | None = None) -> list[str]:
+    """returns the features needed to produce columns, dependencies first.
+    Columns that aren't features are ignored, None resolves every feature.
+    """
+    if columns is None:
+        return list(FEATURES)
+
+    needed = set()
+    stack = [c for c in columns if c in FEATURES]
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        stack.extend(i for i in FEATURES[name].inputs if i in FEATURES)
+
+    # FEATURES is declared in dependency order
+    return [name for name in FEATURES if name in needed]
+
+def source_columns(columns: list[str] | None = None) -> list[str]:
+    """returns the source columns that must be present to compute columns"""
+    features = resolve(columns)
+    sources = [i for name in features for i in FEATURES[name].inputs if i not in FEATURES]
+    if columns is not None:
+        sources += [c for c in columns if c not in FEATURES]
+    return list(dict.fromkeys(sources))
+
+def _evaluate(feature: Feature, cols: dict[str, np.ndarray], mask: np.ndarray) -> np.ndarray:
+    a, b = cols[feature.a], cols[feature.b]
+    out = np.zeros(len(a), dtype=np.result_type(a.dtype, b.dtype, np.float32))
+    np.not_equal(cols[feature.guard], 0, out=mask)
+
+    # the division / product only runs on rows where the guard is set, other rows keep the 0
+    op = np.divide if feature.op == 'div' else np.multiply
+    with np.errstate(divide='ignore', invalid='ignore'):
+        op(a, b, out=out, where=mask)
+        if feature.divisor is not None:
+            np.divide(out, feature.divisor, out=out, where=mask)
+    return out
+
+def compute_features(df: pd.DataFrame, columns: list[str] | None = None) -> pd.DataFrame:
+    """Adds the features needed for columns (all features if None) to df in place and returns df.
+    Features already present in df are recomputed.
+    """
+    features = resolve(columns)
+    missing = [c for c in source_columns(features) if c not in df.columns]
+    if missing:
+        raise KeyError(f"Missing source columns for features: {missing}")
+
+    cols: dict[str, np.ndarray] = {}
+    # one guard mask buffer shared by every feature
+    mask = np.empty(len(df), dtype=bool)
+    for name in features:
+        feature = FEATURES[name]
+        for i in feature.inputs:
+            if i not in cols:
+                cols[i] = df[i].to_numpy()
+        cols[name] = _evaluate(feature, cols, mask)
+        df[name] = cols[name]
+
+    return df
@@ -2,15 +2,22 @@
 # imports
 from pyparsing import Dict
 import requests
+from requests.adapters import HTTPAdapter
+import codecs
 import json
 import os
 import sys
 import pandas as pd
 import logging
+import random
+import threading
+import queue
 from urllib.parse import urlencode
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import timedelta, datetime, timezone
-#from data.process_data import separate_match_players
+from data import process_data as dp
 
 
 """ About this script
@@ -21,6 +28,263 @@ This script fetches data from various sources and prepares it for analysis.
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# base url for every endpoint, override with DEADLOCK_API_BASE to point at a mock/local server
+API_BASE = os.environ.get("DEADLOCK_API_BASE", "https://api.deadlock-api.com")
+
+class TokenBucket:
+    """Thread safe token bucket rate limiter.
+    - rate: tokens added per second (sustained requests per second)
+    - capacity: max tokens held, i.e. how many requests can burst at once
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """blocks until a token is available, then takes it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ApiClient:
+    """Shared HTTP client for every Deadlock API call.
+
+    - keep-alive connection pooling through one requests.Session
+    - token bucket rate limiting across all threads using the client
+    - jittered exponential backoff on 429/5xx and connection errors, honours Retry-After
+    - per-endpoint request, retry, error and latency counters (see get_stats / log_stats),
+      attempts counts every GET sent once, whether it got a response, was retried or failed to connect
+    - optional slots: a semaphore shared with other clients, e.g. a multiprocessing.BoundedSemaphore
+      handed to every worker process, so at most its value requests are in flight across all of them
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        rate_per_s: float = 10,
+        burst: float = 20,
+        max_retries: int = 5,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30,
+        timeout_s: float = 60,
+        pool_size: int = 32,
+        slots=None
+        ):
+        # base_url None follows the module level API_BASE at request time
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.timeout_s = timeout_s
+        self.limiter = TokenBucket(rate_per_s, burst) if rate_per_s else None
+        self.slots = slots
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.stats: dict[str, dict] = {}
+        self.stats_lock = threading.Lock()
+
+    def base(self) -> str:
+        """the base url requests go to, also what cached responses are keyed by"""
+        return self.base_url or API_BASE
+
+    def url(self, path: str, params: dict | None = None) -> str:
+        base = self.base()
+        query = urlencode(params) if params else ""
+        return f"{base}{path}?{query}" if query else f"{base}{path}"
+
+    def backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """seconds to wait before retry number attempt (0 based), full jitter"""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max_s)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+
+    def record(self, endpoint: str, latency_s: float = 0.0, retry: bool = False, error: bool = False,
+               attempt: bool = False):
+        """attempt = a GET that got no response (connection error), responses count as attempts themselves"""
+        with self.stats_lock:
+            s = self.stats.setdefault(endpoint, {
+                "attempts": 0, "requests": 0, "retries": 0, "errors": 0, "latency_s": 0.0, "max_latency_s": 0.0})
+            if attempt:
+                s["attempts"] += 1
+            if retry:
+                s["retries"] += 1
+            elif error:
+                s["errors"] += 1
+            else:
+                s["attempts"] += 1
+                s["requests"] += 1
+                s["latency_s"] += latency_s
+                s["max_latency_s"] = max(s["max_latency_s"], latency_s)
+
+    def send(self, full_url: str, **kwargs) -> requests.Response:
+        """one GET attempt, holding a slot while it is in flight (not while backing off)"""
+        if self.slots is None:
+            return self.session.get(full_url, timeout=self.timeout_s, **kwargs)
+        with self.slots:
+            return self.session.get(full_url, timeout=self.timeout_s, **kwargs)
+
+    def get(self, path: str, params: dict | None = None, endpoint: str | None = None, **kwargs) -> requests.Response:
+        """GET base_url + path with rate limiting and retries.
+        Returns the last response (which may still be non-200 once retries are exhausted),
+        raises the last requests exception if every attempt failed to connect.
+        """
+        endpoint = endpoint or path
+        full_url = self.url(path, params)
+
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+
+            t0 = time.perf_counter()
+            try:
+                response = self.send(full_url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self.record(endpoint, error=True, attempt=True)
+                    raise
+                wait = self.backoff(attempt)
+                logging.warning(f"{endpoint}: {type(e).__name__}, retry {attempt + 1}/{self.max_retries} in {wait:.2f}s")
+                self.record(endpoint, retry=True, attempt=True)
+                time.sleep(wait)
+                continue
+
+            self.record(endpoint, time.perf_counter() - t0)
+            if response.status_code not in self.RETRY_STATUS or attempt == self.max_retries:
+                if response.status_code != 200:
+                    self.record(endpoint, error=True)
+                return response
+
+            wait = self.backoff(attempt, response.headers.get("Retry-After"))
+            logging.warning(f"{endpoint}: status {response.status_code}, retry {attempt + 1}/{self.max_retries} in {wait:.2f}s")
+            self.record(endpoint, retry=True)
+            response.close()
+            time.sleep(wait)
+
+    def get_json(self, path: str, params: dict | None = None, endpoint: str | None = None):
+        """GET and decode json, returns {"error": ...} instead of raising, matching the fetch_* contract"""
+        try:
+            response = self.get(path, params, endpoint)
+        except requests.RequestException as e:
+            logging.error(f"Exception fetching {self.url(path, params)}: {e}")
+            return {"error": str(e)}
+
+        if response.status_code != 200:
+            logging.error(f"API request failed with status code {response.status_code}")
+            logging.error(f"URL: {response.url[:300]}")
+            return {"error": f"API request failed with status code {response.status_code}"}
+        return response.json()
+
+    def stream_json_array(self, path: str, params: dict | None = None, endpoint: str | None = None, chunk_size: int = 1 << 16):
+        """GET a json array response and yield its elements one at a time as the body downloads.
+        Raises requests.HTTPError on a non-200 (after retries) and ValueError on a malformed/truncated body.
+        """
+        response = self.get(path, params, endpoint, stream=True)
+        with response:
+            if response.status_code != 200:
+                logging.error(f"API request failed with status code {response.status_code}")
+                logging.error(f"URL: {response.url[:300]}")
+                response.raise_for_status()
+            yield from iter_json_array(response.iter_content(chunk_size=chunk_size))
+
+    def get_stats(self) -> dict[str, dict]:
+        """copy of the per-endpoint counters with avg latency added"""
+        with self.stats_lock:
+            stats = {k: dict(v) for k, v in self.stats.items()}
+        for s in stats.values():
+            s["avg_latency_s"] = s["latency_s"] / s["requests"] if s["requests"] else 0.0
+        return stats
+
+    def log_stats(self):
+        for endpoint, s in self.get_stats().items():
+            logging.info(
+                f"{endpoint}: {s['requests']} requests, {s['retries']} retries, {s['errors']} errors, "
+                f"avg {s['avg_latency_s']:.3f}s, max {s['max_latency_s']:.3f}s")
+
+_json_decoder = json.JSONDecoder()
+
+def iter_json_array(chunks):
+    """Incrementally parses a top level json array from an iterable of byte chunks, yielding each element.
+    Only the current element is buffered, so memory stays bounded by the largest element
+    rather than the whole response body.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf, pos = "", 0
+    started = finished = False
+
+    for chunk in chunks:
+        buf = buf[pos:] + decoder.decode(chunk)
+        pos = 0
+        while True:
+            # skip whitespace and separators between elements
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"expected a json array, got {buf[pos:pos + 50]!r}")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                finished = True
+                break
+            try:
+                element, end = _json_decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element is incomplete, wait for the next chunk
+            if end >= len(buf):
+                break  # a number/literal at the end of a chunk may continue in the next one
+            yield element
+            pos = end
+        if finished:
+            return
+
+    raise ValueError("json array was truncated before its closing ']'")
+
+_client: ApiClient | None = None
+_client_lock = threading.Lock()
+
+def set_api_base(url: str):
+    """points every fetch_* call (through clients without their own base_url) at url, e.g. a local mock"""
+    global API_BASE
+    API_BASE = url.rstrip("/")
+
+def get_client() -> ApiClient:
+    """returns the shared ApiClient, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
+
+def set_client(client: ApiClient) -> ApiClient:
+    """replaces the shared ApiClient, e.g. to change rate limits or retry policy"""
+    global _client
+    with _client_lock:
+        _client = client
+    return client
+
 def unix_utc_start(date_str: str) -> int:
     # YYYY-MM-DD at 00:00:00 UTC
     dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
@@ -60,7 +324,7 @@ def fetch_match_data(
     """
 
     logging.debug(f"Fetching match data..")
-    base = "https://api.deadlock-api.com/v1/matches"
+    base = "/v1/matches"
 
     # if a specific match ID is given, check player_data and hit that endpoint
     if m_id:
@@ -69,89 +333,239 @@ def fetch_match_data(
         if include_player_info:
             params["include_player_info"] = "true"
 
-        query = urlencode(params)
-        full_url = f"{path}?{query}" if query else path
+        return get_client().get_json(path, params, endpoint="/v1/matches/{match_id}/metadata")
+
+    # Bulk-metadata endpoint
+    print(f"Time range: {fetch_from_date} to {fetch_till_date}")
 
-        response = requests.get(full_url)
+    fetch_from_date = unix_utc_start(fetch_from_date) if fetch_from_date else None
+    fetch_till_date = unix_utc_eod(fetch_till_date) if fetch_till_date else None
 
-        if response.status_code != 200:
-            print(f"Error: API request failed with status code {response.status_code}")
-            print(f"URL: {full_url}")
-            return {"error": f"API request failed with status code {response.status_code}"}
-        return response.json()
+    return fetch_match_window(
+        min_unix=fetch_from_date,
+        max_unix=fetch_till_date,
+        min_average_badge=min_average_badge,
+        include_player_info=include_player_info,
+        limit=limit
+    )
 
-    # Bulk-metadata endpoint
-    path = f"{base}/metadata"
+def fetch_match_window(
+    min_unix: int | None,
+    max_unix: int | None,
+    min_average_badge: int = 100,
+    include_player_info: bool = True,
+    limit: int = 1000
+    ) -> json:
+    """Fetches match metadata for matches started within [min_unix, max_unix] (unix seconds, inclusive)."""
+
+    path = "/v1/matches/metadata"
     params: dict[str, str] = {}
 
     if include_player_info:
         params["include_player_info"] = "true"
-    
-    print(f"Time range: {fetch_from_date} to {fetch_till_date}")
+    if min_unix is not None:
+        params["min_unix_timestamp"] = (min_unix)
+    if max_unix is not None:
+        params["max_unix_timestamp"] = (max_unix)
+    if min_average_badge is not None:
+        params["min_average_badge"] = str(min_average_badge)
+    if limit is not None:
+        params["limit"] = str(limit)
 
-    fetch_from_date = unix_utc_start(fetch_from_date) if fetch_from_date else None
-    fetch_till_date = unix_utc_eod(fetch_till_date) if fetch_till_date else None
+    return get_client().get_json(path, params)
 
-    if fetch_from_date is not None:
-        params["min_unix_timestamp"] = (fetch_from_date)
-    if fetch_till_date is not None:
-        params["max_unix_timestamp"] = (fetch_till_date)
+# a full window is split into hours, then a full hour into minutes
+SPLIT_STEPS_S = (3600, 60)
+
+def iter_match_window(
+    min_unix: int | None,
+    max_unix: int | None,
+    min_average_badge: int = 100,
+    include_player_info: bool = True,
+    limit: int = 1000
+    ):
+    """Streaming version of fetch_match_window, yields one match dict at a time while the body downloads."""
+
+    params: dict[str, str] = {}
+    if include_player_info:
+        params["include_player_info"] = "true"
+    if min_unix is not None:
+        params["min_unix_timestamp"] = (min_unix)
+    if max_unix is not None:
+        params["max_unix_timestamp"] = (max_unix)
     if min_average_badge is not None:
         params["min_average_badge"] = str(min_average_badge)
     if limit is not None:
         params["limit"] = str(limit)
 
-    query = urlencode(params)
-    full_url = f"{path}?{query}" if query else path
-
-    response = requests.get(full_url)
+    yield from get_client().stream_json_array("/v1/matches/metadata", params)
+
+def fetch_match_window_columns(
+    min_unix: int,
+    max_unix: int,
+    limit: int = 1000,
+    max_workers: int = 4,
+    steps: tuple[int, ...] = SPLIT_STEPS_S,
+    executor: ThreadPoolExecutor | None = None,
+    **kwargs
+    ):
+    """Streams matches in [min_unix, max_unix] straight into a dp.MatchFrameBuilder.
+
+    If a window comes back with `limit` matches it was (probably) truncated, so it is split into sub windows
+    of steps[0] seconds, and a still full sub window again with steps[1:]. Every level of splitting fetches
+    on executor (one pool of max_workers threads when not given), the calling thread only hands windows out
+    and must not be one of executor's threads. A full window's own rows are kept and merged after its
+    sub windows', deduped by match_id. Returns the builder, or an error dict if any window failed.
+    """
 
-    if response.status_code != 200:
-        print(f"Error: API request failed with status code {response.status_code}")
-        print(f"URL: {full_url}")
-        return {"error": f"API request failed with status code {response.status_code}"}
-    
-    return response.json()
+    def fetch_window(window):
+        builder = dp.MatchFrameBuilder(capacity=limit)
+        try:
+            received = builder.extend(iter_match_window(window[0], window[1], limit=limit, **kwargs))
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"window {window[0]}-{window[1]} failed: {e}")
+            return {"error": str(e)}
+        return builder, received
+
+    pool = executor
+
+    def resolve(result, window, steps):
+        nonlocal pool
+        if isinstance(result, dict):
+            return result
+        builder, received = result
+        if received < limit:
+            return builder
+
+        # skip steps that would not make the window any smaller
+        steps = tuple(step for step in steps if step < window[1] - window[0] + 1)
+        if not steps:
+            logging.warning(f"window {window[0]}-{window[1]} still returned {limit} matches at the smallest split, results may be truncated")
+            return builder
+
+        step, steps = steps[0], steps[1:]
+        windows = [(start, min(start + step - 1, window[1])) for start in range(window[0], window[1] + 1, step)]
+        logging.info(f"window {window[0]}-{window[1]} hit the limit of {limit}, splitting into {len(windows)} windows of {step}s")
+        pool = pool or ThreadPoolExecutor(max_workers=max(1, max_workers))
+        # every sub window is queued before any is waited on, full ones queue their own behind them
+        futures = [pool.submit(fetch_window, w) for w in windows]
+        sub_builders = [resolve(future.result(), w, steps) for future, w in zip(futures, windows)]
+        for sub in sub_builders:
+            if isinstance(sub, dict):
+                return sub
+        # last, so dedupe keeps the sub windows' rows (and their order) and only adds what they missed
+        return dp.MatchFrameBuilder.concat([*sub_builders, builder], dedupe=True)
 
-def bulk_fetch_matches(start_date, end_date, limit=1000)->list:
-    """fetches a batch of matches, 1 day per pull, list of jsons, 1 element per batch.
-    batch return is unnormalized, 'players' contains a df of each matches 'players'
-    min_days = Oldest time barrier (more days ago)
-    max_days = Newest time barrier (fewer days ago)
+    try:
+        return resolve(fetch_window((min_unix, max_unix)), (min_unix, max_unix), steps)
+    finally:
+        if pool is not None and pool is not executor:
+            pool.shutdown()
+
+def bulk_fetch_match_frames(start_date, end_date, limit=1000, max_workers=1, on_day=None, day_cache=None,
+                            raise_on_failure=False) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Streaming equivalent of dp.separate_match_players(bulk_fetch_matches(...)), with busy days split.
+    Each day is parsed incrementally into columnar buffers, so no list of match dicts is ever built.
+    max_workers = days fetched concurrently, full days are split (see fetch_match_window_columns) on one
+        shared pool of as many threads
+    on_day = optional callback(day, builder) run as soon as each day is fetched (in completion order),
+        e.g. to start work on that day's players while later days are still downloading
+    day_cache = optional data.cache.MatchDayCache, cached days aren't fetched and settled fetched days are stored
+    raise_on_failure = raise a RuntimeError if any day failed after retries instead of returning the other days,
+        for callers that store the result (a stage artifact must never hold an incomplete window)
+    Returns (raw_matches, raw_players), ordered by day.
     """
-    batch_matches = []
-    
-    # Calculate the starting day (defaults to today)
+    days = day_windows(start_date, end_date)
+    source = get_client().base()
+
+    def fetch_day(day):
+        builder = day_cache.get(day, source) if day_cache is not None else None
+        if builder is None:
+            builder = fetch_match_window_columns(unix_utc_start(day), unix_utc_eod(day), limit=limit, executor=window_executor)
+            if day_cache is not None and not isinstance(builder, dict):
+                day_cache.put(day, unix_utc_eod(day), builder, source)
+        if on_day is not None and not isinstance(builder, dict):
+            on_day(day, builder)
+        return builder
+
+    # sub windows of every busy day share one pool, so splitting never adds threads per day or per level
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as window_executor:
+        if max_workers > 1 and len(days) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(days))) as executor:
+                fetched_days = list(executor.map(fetch_day, days))
+        else:
+            fetched_days = [fetch_day(day) for day in days]
+
+    builders = []
+    failed_days = []
+    for batch_num, (day, builder) in enumerate(zip(days, fetched_days), start=1):
+        if isinstance(builder, dict):
+            logging.error(f"Batch {batch_num} of {len(days)} ({day}) failed after retries: {builder['error']}")
+            failed_days.append(day)
+        else:
+            logging.info(f"Batch {batch_num} of {len(days)}: fetch matches for day {day}. total matches found: {len(builder)}")
+            builders.append(builder)
+
+    if failed_days:
+        logging.error(f"{len(failed_days)} of {len(days)} days missing from batch matches: {failed_days}")
+        if raise_on_failure:
+            raise RuntimeError(f"{len(failed_days)} of {len(days)} days failed to fetch: {failed_days}")
+
+    return dp.MatchFrameBuilder.concat(builders, dedupe=False).to_frames()
+
+def day_windows(start_date: str, end_date: str) -> list[str]:
+    """returns each day from start_date to end_date (inclusive) as YYYY-MM-DD strings"""
     current_start = datetime.strptime(start_date, "%Y-%m-%d")
     current_end = datetime.strptime(end_date, "%Y-%m-%d")
 
-    total_batches = (current_end - current_start).days + 1
-    batch_num = 1
-
+    days = []
     while current_start <= current_end:
-        fetch_from = current_start.strftime("%Y-%m-%d")
-        fetch_till = current_start.strftime("%Y-%m-%d")
+        days.append(current_start.strftime("%Y-%m-%d"))
+        current_start += timedelta(days=1)
+    return days
 
-        logging.debug(f"\nBatch {batch_num} of {total_batches}: fetching day from {fetch_from} to {fetch_till}")
+def bulk_fetch_matches(start_date, end_date, limit=1000, max_workers=1)->list:
+    """fetches a batch of matches, 1 day per pull, list of jsons, 1 element per batch.
+    batch return is unnormalized, 'players' contains a df of each matches 'players'
+    min_days = Oldest time barrier (more days ago)
+    max_days = Newest time barrier (fewer days ago)
+    max_workers = number of days fetched concurrently, 1 fetches days one after another.
+        Output is always ordered by day regardless of max_workers.
+    Raw match dicts for notebooks, a day holding more than `limit` matches is truncated.
+    The pipeline uses bulk_fetch_match_frames, which splits busy days and never builds the dicts.
+    """
+    days = day_windows(start_date, end_date)
+    total_batches = len(days)
 
+    def fetch_day(day):
+        logging.debug(f"fetching day {day}")
         # Note: API expects min_unix_timestamp to be OLDER than max_unix_timestamp
-        fetched_matches = fetch_match_data(
-            fetch_till_date=fetch_from,  # Older timestamp (more days ago)
-            fetch_from_date=fetch_till,  # Newer timestamp (fewer days ago)
+        return fetch_match_data(
+            fetch_till_date=day,
+            fetch_from_date=day,
             limit=limit
         )
-        
-        logging.info(f"fetch matches for day {fetch_from}. total matches found: {len(fetched_matches)}")
 
-        # Check if there was an error in the API response
+    # executor.map returns results in submission order, so days stay in order
+    if max_workers > 1 and total_batches > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, total_batches)) as executor:
+            fetched_days = list(executor.map(fetch_day, days))
+    else:
+        fetched_days = [fetch_day(day) for day in days]
+
+    batch_matches = []
+    failed_days = []
+    for batch_num, (day, fetched_matches) in enumerate(zip(days, fetched_days), start=1):
+        # Check if there was an error in the API response, the client has already retried it
         if "error" in fetched_matches:
-            print(f"Error encountered during batch {batch_num+1}. Skipping this batch.")
+            logging.error(f"Batch {batch_num} of {total_batches} ({day}) failed after retries: {fetched_matches['error']}")
+            failed_days.append(day)
         else:
+            logging.info(f"Batch {batch_num} of {total_batches}: fetch matches for day {day}. total matches found: {len(fetched_matches)}")
             batch_matches.append(fetched_matches)
-            
-        # Move backward in time by one day
-        current_start += timedelta(days=1)
-        batch_num += 1
+
+    if failed_days:
+        logging.error(f"{len(failed_days)} of {total_batches} days missing from batch matches: {failed_days}")
 
     return batch_matches
 
@@ -168,8 +582,7 @@ def fetch_player_hero_stats(account_ids: list[int], fetch_till_date, fetch_from_
     - Dict response containing player's hero stats or error dict
     """
     
-    base = "https://api.deadlock-api.com/v1/players/hero-stats"
-    path = f"{base}"
+    path = "/v1/players/hero-stats"
     params: dict[str, str] = {}
 
     params["account_ids"] = ",".join(str(i) for i in account_ids)
@@ -182,41 +595,271 @@ def fetch_player_hero_stats(account_ids: list[int], fetch_till_date, fetch_from_
     if fetch_till_date is not None:
         params["max_unix_timestamp"] = (fetch_till_date)
 
-    query = urlencode(params)
-    full_url = f"{path}?{query}" if query else path
+    return get_client().get_json(path, params)
 
-    try:
-        response = requests.get(full_url)
-        if response.status_code != 200:
-            logging.error(f"API request failed for list of players with status code {response.status_code}")
-            logging.error(f"Response: {response.text}")
-            return {"error": f"API request failed with status code {response.status_code}"}
-        
-        
-        return response.json()
-    except Exception as e:
-        logging.error(f"Exception fetching hero stats for players list: {e}")
-        return {"error": str(e)}
+class BatchSizer:
+    """Adapts the player hero stats batch size from observed latency and failures (AIMD).
+    - grows additively while batches come back faster than target_latency_s
+    - shrinks by a quarter when a batch is slow, halves when a batch fails
+    - a failed batch size also lowers the ceiling, so growth stops short of sizes the API rejects
+    """
+
+    def __init__(self, initial: int, min_size: int = 25, max_size: int = 1000, target_latency_s: float = 5.0):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.size = min(max(initial, min_size), self.max_size)
+        self.step = max(1, initial // 10)
+        self.target_latency_s = target_latency_s
+
+    def on_success(self, latency_s: float):
+        if latency_s > self.target_latency_s:
+            self.size = max(self.min_size, int(self.size * 0.75))
+        else:
+            self.size = min(self.max_size, self.size + self.step)
+
+    def on_failure(self, failed_size: int):
+        self.max_size = max(self.min_size, min(self.max_size, int(failed_size * 0.9)))
+        self.size = max(self.min_size, min(self.size, failed_size) // 2)
+
+# failed player hero stats batches of at most BatchSizer.min_size ids in a row after which failures are taken for
+# an outage and no longer split. Larger batches are always split, the API may only reject their size.
+# Each failed request already went through the client's retries
+SPLIT_FAILURE_LIMIT = 4
+
+def take_batch(pending: deque, size: int, max_url_chars: int) -> list:
+    """pops up to size account ids off pending, stopping early so the joined ids fit in max_url_chars"""
+    batch, chars = [], 0
+    while pending and len(batch) < size:
+        id_chars = len(str(pending[0])) + 3  # "," is url encoded as %2C
+        if batch and chars + id_chars > max_url_chars:
+            break
+        batch.append(pending.popleft())
+        chars += id_chars
+    return batch
+
+def _player_hero_stats_loop(
+    account_id_queue: queue.Queue,
+    batch_size,
+    fetch_till_date,
+    fetch_from_date=None,
+    cache=None,
+    max_workers: int = 4,
+    max_url_chars: int = 6000,
+    raise_on_failure=False
+    ) -> dict[int, list[dict]]:
+    """Fetches player hero stats for account ids arriving on account_id_queue (lists of ids, None closes it)
+    until the queue is closed and every batch is done. Returns {account_id: hero stat rows}.
+    New ids are picked up while batches are in flight, see fetch_player_hero_stats_batch for the batching rules.
+    raise_on_failure = raise a RuntimeError once every batch is done if any account still failed after retries
+    """
+
+    min_unix = unix_utc_start(fetch_from_date) if fetch_from_date else None
+    max_unix = unix_utc_eod(fetch_till_date) if fetch_till_date else None
+    source = get_client().base()
 
-# send players in batches of 1,000
-def fetch_player_hero_stats_batch(batch_size, account_ids: list[int], fetch_till_date, fetch_from_date=None) -> pd.DataFrame:
+    def timed_fetch(batch):
+        t0 = time.perf_counter()
+        response = fetch_player_hero_stats(batch, fetch_till_date=fetch_till_date, fetch_from_date=fetch_from_date)
+        return response, time.perf_counter() - t0
+
+    rows_by_account: dict[int, list[dict]] = {}
+    pending = deque()
+    retry_batches: deque = deque()
+    sizer = BatchSizer(batch_size)
+    in_flight = {}
+    failed_ids = []
+    consecutive_failures = 0
+    queue_open = True
+    cached_count, to_fetch_count, fetched_count, batch_count = 0, 0, 0, 0
+    t_start = last_report = time.perf_counter()
+
+    def drain_queue(block: bool):
+        """moves queued account ids to pending (cached ones straight to the results), blocks for the first list if asked"""
+        nonlocal queue_open, cached_count, to_fetch_count
+        while queue_open:
+            try:
+                account_ids = account_id_queue.get(block=block)
+            except queue.Empty:
+                return
+            block = False
+            if account_ids is None:
+                queue_open = False
+                return
+            to_fetch = account_ids
+            if cache is not None:
+                cached, to_fetch = cache.get_many(account_ids, min_unix, max_unix, source)
+                rows_by_account.update(cached)
+                cached_count += len(cached)
+            pending.extend(to_fetch)
+            to_fetch_count += len(to_fetch)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while queue_open or pending or retry_batches or in_flight:
+            # only wait on the queue when there is nothing in flight to wait on instead
+            drain_queue(block=not (pending or retry_batches or in_flight))
+
+            # keep every worker busy, split retries go first
+            while len(in_flight) < max_workers and (pending or retry_batches):
+                batch = retry_batches.popleft() if retry_batches else take_batch(pending, sizer.size, max_url_chars)
+                in_flight[executor.submit(timed_fetch, batch)] = batch
+            if not in_flight:
+                continue
+
+            # while ids can still arrive, wake up regularly to hand them to idle workers
+            done, _ = wait(in_flight, timeout=0.05 if queue_open else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                response, latency_s = future.result()
+                batch_count += 1
+
+                if "error" in response:
+                    sizer.on_failure(len(batch))
+                    small = len(batch) <= sizer.min_size
+                    consecutive_failures += small
+                    if len(batch) > 1 and (not small or consecutive_failures < SPLIT_FAILURE_LIMIT):
+                        half = len(batch) // 2
+                        retry_batches.extend([batch[:half], batch[half:]])
+                        logging.warning(f"player hero stats batch of {len(batch)} failed, retrying as 2 batches of ~{half}")
+                    else:
+                        failed_ids.extend(batch)
+                        logging.error(f"player hero stats failed for {len(batch)} accounts from {batch[0]} "
+                                      f"({consecutive_failures} small batches failed in a row): {response['error']}")
+                    continue
+
+                consecutive_failures = 0
+                sizer.on_success(latency_s)
+                fetched = {int(a): [] for a in batch}
+                for entry in format_player_hero_response(response):
+                    fetched.setdefault(int(entry["account_id"]), []).append(entry)
+                if cache is not None:
+                    cache.put_many(fetched, min_unix, max_unix, source)
+                rows_by_account.update(fetched)
+                fetched_count += len(batch)
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                logging.info(
+                    f"player hero stats: {fetched_count}/{to_fetch_count} accounts, "
+                    f"{fetched_count / (now - t_start):.0f} accounts/s, batch size {sizer.size}")
+
+    elapsed = time.perf_counter() - t_start
+    if cache is not None:
+        logging.info(f"player hero stats cache: {cached_count} cached, {to_fetch_count} to fetch")
+    if to_fetch_count:
+        logging.info(
+            f"player hero stats: fetched {fetched_count} accounts in {batch_count} batches, {elapsed:.1f}s "
+            f"({fetched_count / elapsed if elapsed else 0:.0f} accounts/s), final batch size {sizer.size}")
+    if failed_ids:
+        logging.error(f"player hero stats missing for {len(failed_ids)} accounts after retries: {failed_ids[:20]}")
+        if raise_on_failure:
+            raise RuntimeError(f"player hero stats failed for {len(failed_ids)} accounts after retries: {failed_ids[:20]}")
+    return rows_by_account
+
+def _player_hero_frame(account_ids, rows_by_account: dict[int, list[dict]]) -> pd.DataFrame:
+    results = []
+    for account_id in account_ids:
+        results.extend(rows_by_account.get(int(account_id), []))
+    return pd.DataFrame(results)
+
+def fetch_player_hero_stats_batch(
+    batch_size,
+    account_ids: list[int],
+    fetch_till_date,
+    fetch_from_date=None,
+    cache=None,
+    max_workers: int = 4,
+    max_url_chars: int = 6000,
+    raise_on_failure=False
+    ) -> pd.DataFrame:
     """Fetches hero stats for a batch of players from the Deadlock API.
     Generally used in conjunction with run_player_batches and
     process_player_stats_parallel
 
+    - batch_size: starting batch size, adjusted by BatchSizer from batch latency and failures
     - account_ids: list of Player's account IDs to fetch stats for (can be string or numeric)
+    - cache: optional data.cache.PlayerHeroStatsCache, keyed by (account_id, min/max unix timestamp).
+        Only accounts missing from the cache are sent to the API, fetched accounts are written back.
+    - max_workers: batches in flight at once
+    - max_url_chars: caps the account_ids query string so long ids don't push the url over server limits
+
+    Failed batches are split in half and retried, a single account that still fails is logged and skipped
+    (raise_on_failure = raise a RuntimeError instead, fetched accounts are cached either way).
+    Once SPLIT_FAILURE_LIMIT batches of the minimum batch size failed in a row (an outage rather than a batch
+    the API finds too large) small failed batches are no longer split, their accounts are skipped whole.
 
     Returns:
-    - Dict response containing player's hero stats or error dict
+    - DataFrame of player<>hero stat rows, in account_ids order
     """
 
-    results = []
-    for i in range(0, len(account_ids), batch_size):
-        print(len(account_ids))
-        batch = account_ids[i:i + batch_size]
-        response = fetch_player_hero_stats(batch, fetch_till_date=fetch_till_date, fetch_from_date=fetch_from_date)
-        results.extend(format_player_hero_response(response))
-    return pd.DataFrame(results)
+    rows_by_account = fetch_player_hero_stats_by_account(
+        batch_size, account_ids, fetch_till_date, fetch_from_date, cache, max_workers, max_url_chars, raise_on_failure)
+    return _player_hero_frame(account_ids, rows_by_account)
+
+def fetch_player_hero_stats_by_account(
+    batch_size,
+    account_ids: list[int],
+    fetch_till_date,
+    fetch_from_date=None,
+    cache=None,
+    max_workers: int = 4,
+    max_url_chars: int = 6000,
+    raise_on_failure=False
+    ) -> dict[int, list[dict]]:
+    """fetch_player_hero_stats_batch as {account_id: hero stat rows}.
+    Accounts without stats map to [], accounts that still failed after retries are left out.
+    """
+    account_id_queue = queue.Queue()
+    account_id_queue.put(list(account_ids))
+    account_id_queue.put(None)
+    return _player_hero_stats_loop(
+        account_id_queue, batch_size, fetch_till_date, fetch_from_date, cache, max_workers, max_url_chars, raise_on_failure)
+
+def pipelined_fetch_match_player_frames(
+    start_date,
+    end_date,
+    fetch_till_date,
+    fetch_from_date=None,
+    limit=1000,
+    batch_size=700,
+    cache=None,
+    max_workers: int = 4,
+    raise_on_failure=False
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """bulk_fetch_match_frames and fetch_player_hero_stats_batch run as a producer / consumer pipeline.
+    As each day of matches is parsed, its accounts not seen yet are queued for the player hero stats
+    workers, so player stats download while later days are still being fetched and normalized.
+    Wall time approaches the slower of the two fetches instead of their sum.
+    Returns (raw_matches, raw_players, player_hero_stats), the same frames as running the two in sequence.
+    raise_on_failure = raise a RuntimeError if any day or any account failed after retries, see bulk_fetch_match_frames
+    """
+
+    account_id_queue = queue.Queue()
+    seen = set()
+    seen_lock = threading.Lock()
+
+    def queue_day_accounts(day, builder):
+        account_ids = builder.players["account_id"][:builder.n_players]
+        with seen_lock:
+            new_ids = [a for a in dict.fromkeys(account_ids.tolist()) if a not in seen]
+            seen.update(new_ids)
+        account_id_queue.put(new_ids)
+        logging.info(f"pipelined fetch: {day} queued {len(new_ids)} new accounts for player hero stats")
+
+    with ThreadPoolExecutor(max_workers=1) as stats_executor:
+        stats = stats_executor.submit(_player_hero_stats_loop, account_id_queue, batch_size, fetch_till_date,
+                                      fetch_from_date, cache, max_workers, raise_on_failure=raise_on_failure)
+        try:
+            raw_matches, raw_players = bulk_fetch_match_frames(
+                start_date, end_date, limit=limit, max_workers=max_workers, on_day=queue_day_accounts,
+                raise_on_failure=raise_on_failure)
+        finally:
+            # closes the queue, the stats loop finishes the batches it has and returns
+            account_id_queue.put(None)
+        rows_by_account = stats.result()
+
+    account_ids = raw_players["account_id"].unique().tolist() if len(raw_players) else []
+    return raw_matches, raw_players, _player_hero_frame(account_ids, rows_by_account)
 
 def format_player_hero_response(players_hero_data: list[Dict]):
     """removes matches nested list, normalizes to player<>hero stat row"""
@@ -267,7 +910,7 @@ def fetch_hero_stats(
     """
 
     logging.debug(f"Fetching match data..")
-    base = 'https://api.deadlock-api.com/v1/analytics'
+    base = "/v1/analytics"
 
     path = f"{base}/hero-stats"
     params: dict[str, str] = {}
@@ -285,15 +928,7 @@ def fetch_hero_stats(
     if min_average_badge is not None:
         params["min_average_badge"] = str(min_average_badge)
 
-    query = urlencode(params)
-    full_url = f"{path}?{query}" if query else path
-    
-    response = requests.get(full_url)
-    if response.status_code != 200:
-        print(f"Error: API request failed with status code {response.status_code}")
-        print(f"URL: {full_url}")
-        return {"error": f"API request failed with status code {response.status_code}"}
-    return response.json()
+    return get_client().get_json(path, params)
 
 if __name__ == "__main__":
     # Example usage
@@ -301,13 +936,11 @@ if __name__ == "__main__":
     end_date = "2025-08-21"
     folder_name = f"v2_data//pred_data//test_pred_v2_{start_date}_{end_date}"
 
-    batch_matches = bulk_fetch_matches(
+    raw_matches, raw_players = bulk_fetch_match_frames(
         start_date=start_date,
-        end_date=end_date, 
+        end_date=end_date,
         limit=1000
     )
-
-    raw_matches, raw_players = separate_match_players(batch_matches)
     player_matches = raw_players[['account_id', 'match_id']]
 
     bulk_player_hero_stats= fetch_player_hero_stats_batch(
@@ -0,0 +1,207 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Random forests compiled into flat NumPy node arrays, scored by a vectorized traversal of every tree at once.
+Probabilities match RandomForestClassifier.predict_proba (same float32 inputs, same NaN routing) without its
+per call validation, joblib dispatch and per tree Python loop, which dominate single match scoring.
+Example launch command: python -m data.forest --model_folder 8.26.25_rf_std
+"""
+
+# folder of one .npy per array, so a saved forest can be memory mapped
+FOREST_DIR = "forest"
+ARRAYS = ("feature", "threshold", "missing_left", "left", "right", "value", "roots", "children", "is_leaf")
+
+# rows scored per traversal pass, bounds the (tree, row) work arrays on large batches
+CHUNK_ROWS = 4096
+
+# traversal steps between dropping (tree, row) pairs that reached a leaf
+PRUNE_EVERY = 4
+
+class CompiledForest:
+    """Every tree's nodes in one set of arrays, children as global node indices.
+    - feature / threshold / missing_left: split of each node, NaN goes left where missing_left is set
+    - left / right: children, a leaf points at itself so a finished row stays put
+    - value: class probabilities of each node (normalized like DecisionTreeClassifier.predict_proba)
+    - roots: first node of each tree, depth: deepest tree, so depth steps reach every leaf
+
+    Fastest on the small batches of online scoring, where predict_proba's fixed per call cost dominates;
+    on batches of thousands of rows sklearn's compiled per row loop wins again (see benchmarks.bench_forest).
+    """
+
+    def __init__(self, feature, threshold, missing_left, left, right, value, roots, depth, classes, feature_names=None,
+                 children=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_) if self.feature_names_in_ is not None else int(feature.max()) + 1
+        # children[2 * node + went_left], one gather per step instead of two
+        self._children = np.stack([right, left], axis=1).ravel() if children is None else children
+        self._is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+
+    @classmethod
+    def compile(cls, model) -> "CompiledForest":
+        """flattens a fitted RandomForestClassifier (single output)"""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("only single output forests can be compiled")
+        features, thresholds, missing, lefts, rights, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int32)
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n)), dtype=bool))
+            lefts.append(np.where(leaf, own, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, own, tree.children_right + offset).astype(np.int32))
+            value = tree.value[:, 0, :].astype(np.float64)
+            total = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, total, out=np.zeros_like(value), where=total > 0))
+            roots.append(offset)
+            offset += n
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds), np.concatenate(missing),
+            np.concatenate(lefts), np.concatenate(rights), np.concatenate(values),
+            np.array(roots, dtype=np.int32), max(e.tree_.max_depth for e in model.estimators_),
+            model.classes_, getattr(model, "feature_names_in_", None))
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _as_array(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names_in_ is not None and list(X.columns) != list(self.feature_names_in_):
+                X = X[list(self.feature_names_in_)]
+            X = X.to_numpy(dtype=np.float32)
+        # the trees were fit on float32, thresholds sit between float32 values
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, the forest expects {self.n_features_in_}")
+        return X
+
+    def apply(self, X) -> np.ndarray:
+        """(n_rows, n_trees) global leaf node index of every row in every tree"""
+        X = self._as_array(X)
+        leaves = np.empty((self.n_trees, len(X)), dtype=np.int32)
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            n = len(chunk)
+            flat = chunk.ravel()
+            out = np.repeat(self.roots, n)
+            # one entry per (tree, row) pair still moving: its current node and the row's offset in flat
+            pair = np.arange(self.n_trees * n)
+            node = np.repeat(self.roots.astype(np.int64), n)
+            row = np.tile(np.arange(n, dtype=np.int64) * chunk.shape[1], self.n_trees)
+            for step in range(1, self.depth + 1):
+                x = flat[row + self.feature[node]]
+                go_left = x <= self.threshold[node]
+                nan = np.isnan(x)
+                if nan.any():
+                    go_left[nan] = self.missing_left[node[nan]]
+                node = self._children[2 * node + go_left]
+                if step % PRUNE_EVERY == 0 or step == self.depth:
+                    done = self._is_leaf[node]
+                    out[pair[done]] = node[done]
+                    pair, node, row = pair[~done], node[~done], row[~done]
+                    if not len(pair):
+                        break
+            leaves[:, start:start + n] = out.reshape(self.n_trees, n)
+        return leaves.T
+
+    def predict_proba(self, X) -> np.ndarray:
+        """(n_rows, n_classes), the mean of the trees' leaf probabilities"""
+        leaves = self.apply(X)
+        return self.value[leaves].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, path: str, replace: bool = True) -> str:
+        """writes the arrays to the folder path, readable with load.
+        replace=False keeps a folder already at path (another process' copy of the same forest) and drops this one"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        arrays = {"feature": self.feature, "threshold": self.threshold, "missing_left": self.missing_left,
+                  "left": self.left, "right": self.right, "value": self.value, "roots": self.roots,
+                  "children": self._children, "is_leaf": self._is_leaf}
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(tmp, "forest.json"), "w") as f:
+            json.dump({"depth": self.depth, "classes": self.classes_.tolist(),
+                       "feature_names": None if self.feature_names_in_ is None else self.feature_names_in_.tolist()}, f)
+        if replace and os.path.exists(path):
+            shutil.rmtree(path)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # path is a non empty folder, another process renamed its copy in first
+            if replace or not os.path.exists(os.path.join(path, "forest.json")):
+                raise
+            shutil.rmtree(tmp)
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "CompiledForest":
+        """mmap = the node arrays are memory mapped read only, pages are read on first use and shared between processes"""
+        with open(os.path.join(path, "forest.json")) as f:
+            info = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+                  for name in ARRAYS}
+        return cls(arrays["feature"], arrays["threshold"], arrays["missing_left"], arrays["left"], arrays["right"],
+                   arrays["value"], arrays["roots"], info["depth"], np.array(info["classes"], dtype=object),
+                   info["feature_names"], arrays["children"], arrays["is_leaf"])
+
+def export_forest(model, folder: str) -> str:
+    """compiles model and saves it to forest/ in folder"""
+    t0 = time.perf_counter()
+    forest = CompiledForest.compile(model)
+    path = forest.save(os.path.join(folder, FOREST_DIR))
+    logging.info(f"Compiled {forest.n_trees} trees ({len(forest.feature)} nodes, depth {forest.depth}) "
+                 f"to {path} in {time.perf_counter() - t0:.2f}s")
+    return path
+
+def load_forest(folder: str, model=None, mmap: bool = False) -> CompiledForest:
+    """forest/ of folder, compiled from model (and saved) when the folder has none yet"""
+    path = os.path.join(folder, FOREST_DIR)
+    if not os.path.exists(path):
+        if model is None:
+            raise FileNotFoundError(f"{path} doesn't exist, export the model first")
+        export_forest(model, folder)
+    return CompiledForest.load(path, mmap)
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", required=True, help="Folder with model.joblib, forest/ is written next to it")
+    parser.add_argument("--check_rows", type=int, default=1000, help="Random rows compared against predict_proba after export")
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(args.model_folder, "model.joblib"))
+    forest = CompiledForest.load(export_forest(model, args.model_folder))
+    X = np.random.default_rng(0).normal(size=(args.check_rows, model.n_features_in_)).astype(np.float32)
+    with open(os.path.join(args.model_folder, "meta.json")) as f:
+        X = pd.DataFrame(X, columns=json.load(f)["feature_names"])
+    # random rows mostly take one side of each split, real rows are checked by benchmarks.bench_forest
+    error = np.abs(forest.predict_proba(X) - model.predict_proba(X)).max()
+    logging.info(f"max |compiled - predict_proba| on {args.check_rows} random rows: {error:.2e}")
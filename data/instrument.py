@@ -0,0 +1,216 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+import psutil
+
+from data import fetch_data as fd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Per-stage metrics for a pipeline run (wall / cpu time, peak RSS, rows in / out, bytes written,
+http requests), written as a Chrome trace (chrome://tracing, ui.perfetto.dev) with a stage summary,
+plus an optional cProfile or stack sampling profile of chosen stages"""
+
+# rss and stack samples per second while a stage runs
+SAMPLE_HZ = 20
+PROFILERS = ("cprofile", "sample")
+
+def _http_requests() -> int:
+    # each GET sent once, a retried 429 / 5xx is both a request and a retry
+    return sum(s["attempts"] for s in fd.get_client().get_stats().values())
+
+class StageMetrics:
+    """counters of one stage, rows_in / rows_out / bytes_written are filled in by the caller"""
+
+    def __init__(self, name: str, category: str):
+        self.name = name
+        self.category = category
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_written = 0
+        self.skipped = False
+        self.args = {}
+        self.start_s = self.wall_s = self.cpu_s = 0.0
+        self.rss_start_mb = self.peak_rss_mb = 0.0
+        self.http_requests = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name, "category": self.category, "skipped": self.skipped,
+            "wall_s": round(self.wall_s, 4), "cpu_s": round(self.cpu_s, 4),
+            "rss_start_mb": round(self.rss_start_mb, 1), "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rows_in": self.rows_in, "rows_out": self.rows_out, "bytes_written": self.bytes_written,
+            "http_requests": self.http_requests, **self.args,
+        }
+
+class _Sampler(threading.Thread):
+    """samples process RSS (and the stage thread's stack when profiling by sampling) until stopped"""
+
+    def __init__(self, thread_id: int, stacks: bool):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter() if stacks else None
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(1 / SAMPLE_HZ):
+            rss = self.process.memory_info().rss
+            self.peak = max(self.peak, rss)
+            self.samples.append((time.perf_counter(), rss))
+            if self.stacks is not None:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is not None:
+                    stack = traceback.extract_stack(frame)
+                    self.stacks[";".join(f"{os.path.basename(f.filename)}:{f.name}" for f in stack)] += 1
+
+    def stop(self) -> int:
+        self.stopped.set()
+        self.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return self.peak
+
+class RunTrace:
+    """Collects StageMetrics for one run and writes them as a Chrome trace.
+
+    - profile_stages: stage names profiled with profiler, 'cprofile' writes <stage>.prof (pstats)
+      and logs the top functions, 'sample' writes <stage>.folded stacks (flamegraph.pl / speedscope)
+    - profile_dir: where profiles go, defaults to the folder of the trace file
+
+    Stages may nest (a checkpoint write inside a stage), every stage is its own trace event.
+    """
+
+    def __init__(self, name: str, profile_stages: tuple[str, ...] = (), profiler: str = "cprofile",
+                 profile_dir: str | None = None):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler}, expected one of {PROFILERS}")
+        self.name = name
+        self.profile_stages = set(profile_stages)
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.stages: list[StageMetrics] = []
+        self.rss_samples = []
+        self.t0 = time.perf_counter()
+        self.started_at = time.time()
+
+    @contextmanager
+    def stage(self, name: str, category: str = "stage", rows_in: int = 0):
+        """times the block as stage name, yields its StageMetrics for rows / bytes / args"""
+        metrics = StageMetrics(name, category)
+        metrics.rows_in = rows_in
+        profiled = name in self.profile_stages
+        sampler = _Sampler(threading.get_ident(), stacks=profiled and self.profiler == "sample")
+        profile = cProfile.Profile() if profiled and self.profiler == "cprofile" else None
+
+        metrics.rss_start_mb = sampler.peak / 1e6
+        http_start = _http_requests()
+        cpu_start = time.process_time()
+        metrics.start_s = time.perf_counter()
+        sampler.start()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield metrics
+        finally:
+            if profile is not None:
+                profile.disable()
+            metrics.wall_s = time.perf_counter() - metrics.start_s
+            metrics.cpu_s = time.process_time() - cpu_start
+            metrics.peak_rss_mb = sampler.stop() / 1e6
+            metrics.http_requests = _http_requests() - http_start
+            self.rss_samples.extend(sampler.samples)
+            self.stages.append(metrics)
+            if profiled:
+                self._write_profile(name, profile, sampler.stacks)
+
+    def skipped(self, name: str, category: str = "stage", **args):
+        """records a stage that didn't run (e.g. its stored artifact was reused)"""
+        metrics = StageMetrics(name, category)
+        metrics.skipped = True
+        metrics.start_s = time.perf_counter()
+        metrics.args.update(args)
+        self.stages.append(metrics)
+
+    def _profile_path(self, name: str, suffix: str) -> str:
+        folder = self.profile_dir or "."
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{self.name}_{name}{suffix}")
+
+    def _write_profile(self, name: str, profile: cProfile.Profile | None, stacks: Counter | None):
+        if profile is not None:
+            path = self._profile_path(name, ".prof")
+            profile.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(15)
+            logging.info(f"cProfile of stage {name} written to {path}\n{out.getvalue()}")
+        elif stacks:
+            path = self._profile_path(name, ".folded")
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            logging.info(f"{sum(stacks.values())} stack samples of stage {name} written to {path}")
+
+    def chrome_trace(self) -> dict:
+        """Chrome trace event format: one complete event per stage, an RSS counter track,
+        and the stage summary under 'stages' (ignored by trace viewers)"""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}]
+        for m in self.stages:
+            events.append({
+                "name": m.name, "cat": m.category, "ph": "X", "pid": pid, "tid": 0,
+                "ts": round((m.start_s - self.t0) * 1e6), "dur": round(m.wall_s * 1e6),
+                "args": m.to_dict(),
+            })
+        for t, rss in sorted(self.rss_samples):
+            events.append({"name": "rss_mb", "ph": "C", "pid": pid, "ts": round((t - self.t0) * 1e6),
+                           "args": {"rss_mb": round(rss / 1e6, 1)}})
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "run": self.name,
+            "started_at": self.started_at,
+            "stages": [m.to_dict() for m in self.stages],
+        }
+
+    def write(self, path: str) -> str:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        logging.info(f"run trace written to {path}")
+        return path
+
+    def log_summary(self):
+        lines = [f"{'stage':<40} {'wall_s':>8} {'cpu_s':>8} {'peak_mb':>8} {'rows_in':>9} {'rows_out':>9} {'MB_out':>7} {'http':>6}"]
+        for m in self.stages:
+            if m.skipped:
+                lines.append(f"{m.name:<40} {'skipped':>8}")
+                continue
+            lines.append(
+                f"{m.name:<40} {m.wall_s:>8.2f} {m.cpu_s:>8.2f} {m.peak_rss_mb:>8.0f} {m.rows_in:>9} "
+                f"{m.rows_out:>9} {m.bytes_written / 1e6:>7.1f} {m.http_requests:>6}")
+        logging.info("run trace " + self.name + "\n" + "\n".join(lines))
+
+def compare(before: str, after: str, threshold: float = 1.5) -> list[dict]:
+    """stages whose wall time grew by more than threshold x between two trace files"""
+    def wall(path):
+        with open(path) as f:
+            return {s["stage"]: s["wall_s"] for s in json.load(f)["stages"] if not s["skipped"]}
+    old, new = wall(before), wall(after)
+    slower = [{"stage": s, "before_s": old[s], "after_s": new[s], "ratio": new[s] / old[s]}
+              for s in new if s in old and old[s] > 0 and new[s] / old[s] > threshold]
+    for s in slower:
+        logging.warning(f"stage {s['stage']}: {s['before_s']:.2f}s -> {s['after_s']:.2f}s ({s['ratio']:.1f}x)")
+    return slower
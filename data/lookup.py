@@ -0,0 +1,94 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Index based joins against stat tables that have one row per key (hero, player, player<>hero)"""
+
+# integer keys below this are looked up through a direct-indexed array instead of a hash index
+DENSE_KEY_LIMIT = 1 << 16
+
+def dense_index(keys: np.ndarray, size: int | None = None) -> np.ndarray:
+    """returns an array of length size where index[key] = row position of key in keys, -1 where absent"""
+    if size is None:
+        size = int(keys.max()) + 1 if len(keys) else 0
+    index = np.full(size, -1, dtype=np.int64)
+    index[keys] = np.arange(len(keys))
+    return index
+
+def _is_int(series: pd.Series) -> bool:
+    return (pd.api.types.is_integer_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype)
+            and not series.hasnans)
+
+def _pack_keys(frame: pd.DataFrame, on: list[str], bits: list[int]) -> np.ndarray:
+    """packs several non-negative integer key columns into one int64 per row"""
+    packed = frame[on[0]].to_numpy().astype(np.int64)
+    for col, width in zip(on[1:], bits[1:]):
+        packed = (packed << width) | frame[col].to_numpy().astype(np.int64)
+    return packed
+
+def lookup_positions(left: pd.DataFrame, right: pd.DataFrame, on: list[str]) -> np.ndarray | None:
+    """returns the row position in right for each left row (-1 if no match),
+    or None when the keys can't be indexed (non integer, negative, too wide or right not unique on them)
+    """
+    if not all(_is_int(left[c]) and _is_int(right[c]) for c in on):
+        return None
+    if right.empty or left.empty:
+        return np.full(len(left), -1, dtype=np.int64)
+
+    lows = [min(left[c].min(), right[c].min()) for c in on]
+    highs = [int(max(left[c].max(), right[c].max())) for c in on]
+    if min(lows) < 0:
+        return None
+
+    if len(on) == 1 and highs[0] < DENSE_KEY_LIMIT:
+        keys = right[on[0]].to_numpy()
+        if len(np.unique(keys)) != len(keys):
+            return None
+        return dense_index(keys, highs[0] + 1)[left[on[0]].to_numpy()]
+
+    bits = [max(h.bit_length(), 1) for h in highs]
+    if sum(bits) > 63:
+        return None
+    index = pd.Index(_pack_keys(right, on, bits))
+    if not index.is_unique:
+        return None
+    return index.get_indexer(_pack_keys(left, on, bits))
+
+def _gather(series: pd.Series, positions: np.ndarray, fill: bool):
+    values = series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+    if not fill:
+        return values.take(positions)
+    # -1 positions become NaN, upcasting the column the same way a left merge would
+    return pd.api.extensions.take(values, positions, allow_fill=True)
+
+def indexed_merge(left: pd.DataFrame, right: pd.DataFrame, on: str | list[str], how: str = "inner") -> pd.DataFrame:
+    """Same result as left.merge(right, on=on, how=how) for how 'inner' / 'left', when right has
+    at most one row per key. Right rows are located by array index (small int keys such as hero_id)
+    or a hash index of the packed keys, then gathered with take.
+    Falls back to DataFrame.merge for anything else (duplicate right keys, non integer keys, overlapping columns).
+    """
+    on = [on] if isinstance(on, str) else list(on)
+    right_cols = [c for c in right.columns if c not in on]
+    positions = None
+    if how in ("inner", "left") and not set(right_cols) & set(left.columns):
+        positions = lookup_positions(left, right, on)
+    if positions is None:
+        return left.merge(right, on=on, how=how)
+
+    missing = positions < 0
+    any_missing = bool(missing.any())
+    columns = {}
+    if how == "inner" and any_missing:
+        rows = np.flatnonzero(~missing)
+        positions, any_missing = positions[rows], False
+        columns.update((c, _gather(left[c], rows, False)) for c in left.columns)
+    else:
+        columns.update((c, left[c].array.copy() if isinstance(left[c].dtype, pd.api.extensions.ExtensionDtype)
+                        else left[c].to_numpy(copy=True)) for c in left.columns)
+    columns.update((c, _gather(right[c], positions, any_missing)) for c in right_cols)
+
+    # copy=False keeps one block per column, consolidating the blocks would copy every column again
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from data.forest import CompiledForest
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Index of the saved model folders (model.joblib + meta.json + params.json, as written by cm.save_model)
+with lazy loading. A model is unpickled and compiled into a CompiledForest once, the node arrays are cached
+as .npy files and memory mapped on every later load, so a process starts scoring in milliseconds.
+At most max_resident models stay loaded, the least recently used one is dropped past that.
+Example launch command: python -m data.model_registry --warm
+"""
+
+MODEL_FILE = "model.joblib"
+DEFAULT_ROOTS = ("models", ".")
+DEFAULT_MODEL_CACHE = "v2_data//cache//models"
+# folder levels searched below each root, models/8.24.25/rf_std_v2 is two below models
+SCAN_DEPTH = 2
+# data folders that never hold models, not worth listing
+SKIP_DIRS = {"v2_data", "__pycache__", "benchmarks", "data"}
+
+class ModelEntry(NamedTuple):
+    """a model folder, from its meta.json / params.json (the model itself isn't read)
+    - key: folder relative to the working directory, with '/' separators
+    - layout: team stats layout of its features, 'other' for the early models trained on 'Unnamed: 0' / 'match_id'
+    - modified / size_bytes: of model.joblib, they key the compiled cache
+    """
+    key: str
+    folder: str
+    run_id: str | None
+    layout: str
+    n_features: int
+    params: dict
+    modified: float
+    size_bytes: int
+
+class LoadedModel(NamedTuple):
+    entry: ModelEntry
+    forest: CompiledForest
+    feature_names: list[str]
+    # column of predict_proba holding the 'Y' (team 0 wins) probability
+    win_column: int
+    load_s: float
+    # 'cache' = memory mapped compiled arrays, 'joblib' = unpickled and compiled now
+    source: str
+
+def _layout(feature_names: list[str]) -> str:
+    if any(not name.endswith(('_Team0', '_Team1', '_diff')) for name in feature_names):
+        return 'other'
+    family = 'quantiles' if any(f"_{q}_" in name for name in feature_names for q in ('q25', 'median', 'q75')) else 'std'
+    return f"{family}_diff" if all(name.endswith('_diff') for name in feature_names) else family
+
+def read_entry(folder: str) -> ModelEntry:
+    """the ModelEntry of one model folder"""
+    with open(os.path.join(folder, "meta.json")) as f:
+        meta = json.load(f)
+    params = {}
+    if os.path.exists(os.path.join(folder, "params.json")):
+        with open(os.path.join(folder, "params.json")) as f:
+            params = json.load(f)
+    stat = os.stat(os.path.join(folder, MODEL_FILE))
+    key = os.path.relpath(folder).replace(os.sep, "/")
+    return ModelEntry(key, folder, meta.get("run_id"), _layout(meta["feature_names"]), len(meta["feature_names"]),
+                      params, stat.st_mtime, stat.st_size)
+
+class ModelRegistry:
+    """Model folders under roots, loaded on first use.
+
+    - roots: folders searched SCAN_DEPTH levels deep for model.joblib + meta.json
+    - cache_root: compiled forests, one folder per (model folder, model.joblib mtime / size), so a retrained
+      model is recompiled
+    - max_resident: loaded models kept, the least recently used is dropped past it (its mapped pages go with it)
+    - mmap: memory map cached arrays instead of reading them into memory
+
+    Models are looked up by key, folder path or run_id. Safe to share between threads.
+    """
+
+    def __init__(self, roots: tuple[str, ...] = DEFAULT_ROOTS, cache_root: str | None = DEFAULT_MODEL_CACHE,
+                 max_resident: int = 4, mmap: bool = True):
+        self.roots = roots
+        self.cache_root = cache_root
+        self.max_resident = max_resident
+        self.mmap = mmap
+        self.index: dict[str, ModelEntry] | None = None
+        self.resident: OrderedDict[str, LoadedModel] = OrderedDict()
+        self.lock = threading.Lock()
+        # one lock per model key, held while it loads so other models stay servable
+        self.loading: dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "cache_loads": 0, "compiles": 0, "evictions": 0}
+
+    def scan(self) -> list[ModelEntry]:
+        """(re)indexes the model folders under roots, newest model first"""
+        index = {}
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            base = root.rstrip("/\\").count(os.sep)
+            for folder, dirs, files in os.walk(root):
+                depth = folder.rstrip("/\\").count(os.sep) - base
+                dirs[:] = [] if depth >= SCAN_DEPTH else sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+                if MODEL_FILE in files and "meta.json" in files:
+                    entry = read_entry(folder)
+                    index.setdefault(entry.key, entry)
+        self.index = dict(sorted(index.items(), key=lambda kv: -kv[1].modified))
+        return list(self.index.values())
+
+    def entries(self) -> list[ModelEntry]:
+        return list(self.index.values()) if self.index is not None else self.scan()
+
+    def entry(self, name: str) -> ModelEntry:
+        """ModelEntry of a key, run_id or model folder (which doesn't have to be under roots),
+        re-read if its model.joblib changed since it was indexed"""
+        key = os.path.relpath(name).replace(os.sep, "/") if os.path.isdir(name) else name
+        if self.index is not None and key in self.index:
+            return self._fresh(self.index[key])
+        if os.path.exists(os.path.join(name, MODEL_FILE)):
+            return read_entry(name)
+        matches = [e for e in self.entries() if name in (e.key, e.run_id)]
+        if not matches:
+            raise KeyError(f"no model {name!r}, known models: {[e.key for e in self.entries()]}")
+        return self._fresh(matches[0])
+
+    def _fresh(self, entry: ModelEntry) -> ModelEntry:
+        # a retrained model is saved over its folder, one stat tells whether the indexed entry is stale
+        stat = os.stat(os.path.join(entry.folder, MODEL_FILE))
+        if (stat.st_mtime, stat.st_size) == (entry.modified, entry.size_bytes):
+            return entry
+        entry = read_entry(entry.folder)
+        if self.index is not None and entry.key in self.index:
+            self.index[entry.key] = entry
+        return entry
+
+    def select(self, layout: str | None = None, n_features: int | None = None) -> ModelEntry:
+        """newest model with the given layout / number of features"""
+        for entry in self.entries():
+            if (layout is None or entry.layout == layout) and (n_features is None or entry.n_features == n_features):
+                return entry
+        raise KeyError(f"no model with layout {layout} and {n_features} features")
+
+    def _cache_path(self, entry: ModelEntry) -> str:
+        folder = hashlib.sha1(os.path.abspath(entry.folder).encode()).hexdigest()[:12]
+        return os.path.join(self.cache_root, f"{folder}_{int(entry.modified)}_{entry.size_bytes}")
+
+    def _load(self, entry: ModelEntry) -> LoadedModel:
+        t0 = time.perf_counter()
+        with open(os.path.join(entry.folder, "meta.json")) as f:
+            feature_names = json.load(f)["feature_names"]
+        cache_path = self._cache_path(entry) if self.cache_root else None
+        if cache_path and os.path.exists(os.path.join(cache_path, "forest.json")):
+            forest, source = CompiledForest.load(cache_path, self.mmap), "cache"
+            with self.lock:
+                self.stats["cache_loads"] += 1
+        else:
+            import joblib
+            forest, source = CompiledForest.compile(joblib.load(os.path.join(entry.folder, MODEL_FILE))), "joblib"
+            with self.lock:
+                self.stats["compiles"] += 1
+            if cache_path:
+                os.makedirs(self.cache_root, exist_ok=True)
+                # processes compiling the same cold model at once all keep the first copy saved
+                forest = CompiledForest.load(forest.save(cache_path, replace=False), self.mmap)
+        loaded = LoadedModel(entry, forest, feature_names, list(forest.classes_).index('Y'), time.perf_counter() - t0, source)
+        logging.info(f"Loaded model {entry.key} ({entry.run_id}) from {source} in {loaded.load_s * 1000:.1f}ms")
+        return loaded
+
+    def load(self, name: str) -> LoadedModel:
+        """the loaded model of a key, run_id or folder, loading it (and dropping the least recently used) if needed"""
+        entry = self.entry(name)
+        with self.lock:
+            loaded = self._resident(entry)
+            if loaded is not None:
+                return loaded
+            key_lock = self.loading.setdefault(entry.key, threading.Lock())
+        # the load runs outside self.lock, a cold compile only holds up threads wanting the same model
+        with key_lock:
+            with self.lock:
+                loaded = self._resident(entry)
+            if loaded is not None:
+                return loaded
+            loaded = self._load(entry)
+            with self.lock:
+                self.resident[entry.key] = loaded
+                self.resident.move_to_end(entry.key)
+                while len(self.resident) > self.max_resident:
+                    dropped, _ = self.resident.popitem(last=False)
+                    self.stats["evictions"] += 1
+                    logging.info(f"Dropped model {dropped}, {self.max_resident} models resident at most")
+            return loaded
+
+    def _resident(self, entry: ModelEntry) -> LoadedModel | None:
+        # caller holds self.lock
+        loaded = self.resident.get(entry.key)
+        if loaded is None or (loaded.entry.modified, loaded.entry.size_bytes) != (entry.modified, entry.size_bytes):
+            return None
+        self.resident.move_to_end(entry.key)
+        self.stats["hits"] += 1
+        return loaded
+
+    def warm(self) -> int:
+        """compiles every indexed model missing from the cache, returns how many were compiled"""
+        compiles = self.stats["compiles"]
+        for entry in self.entries():
+            if self.cache_root and not os.path.exists(os.path.join(self._cache_path(entry), "forest.json")):
+                self._load(entry)
+        return self.stats["compiles"] - compiles
+
+    def log_stats(self):
+        s = self.stats
+        logging.info(f"model registry: {len(self.resident)} resident of {len(self.entries())} models, {s['hits']} hits, "
+                     f"{s['cache_loads']} cache loads, {s['compiles']} compiles, {s['evictions']} evictions")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roots", nargs="+", default=list(DEFAULT_ROOTS), help="Folders searched for model folders")
+    parser.add_argument("--cache_root", default=DEFAULT_MODEL_CACHE, help="Compiled forest cache folder")
+    parser.add_argument("--warm", action="store_true", help="Compile every model missing from the cache")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(tuple(args.roots), args.cache_root)
+    lines = [f"{'key':<40} {'run_id':<36} {'layout':<15} {'features':>8} {'trees':>6} {'MB':>6}"]
+    for e in registry.scan():
+        lines.append(f"{e.key:<40} {str(e.run_id):<36} {e.layout:<15} {e.n_features:>8} "
+                     f"{str(e.params.get('n_estimators', '')):>6} {e.size_bytes / 1e6:>6.1f}")
+    logging.info("models\n" + "\n".join(lines))
+    if args.warm:
+        logging.info(f"compiled {registry.warm()} models into {args.cache_root}")
@@ -5,9 +5,12 @@ import sys
 import pandas as pd
 import numpy as np
 import logging
+from operator import itemgetter
 from urllib.parse import urlencode
 import time
 from datetime import timedelta, datetime
+from data import features as ft
+from data import lookup as lk
 #import fetch_data as fd
 
 logging.basicConfig(level=logging.INFO)
@@ -15,15 +18,39 @@ logger = logging.getLogger(__name__)
 
 """Contains functions for processing data and creating statistics"""
 
+# raw_matches / raw_players columns, in the order separate_match_players produces them
+MATCH_COLUMNS = ("match_id", "start_time", "game_mode", "match_mode", "duration_s", "winning_team")
+PLAYER_COLUMNS = ("account_id", "match_id", "team", "hero_id", "kills", "deaths", "assists", "denies", "net_worth")
+# fields copied from each player entry (match_id comes from the parent match)
+PLAYER_FIELDS = ("account_id", "team", "hero_id", "kills", "deaths", "assists", "denies", "net_worth")
+# fields that are integers in the API payload, everything else is kept as object
+INT_COLUMNS = {"match_id", "duration_s", "account_id", "hero_id", "kills", "deaths", "assists", "denies", "net_worth"}
+
+def _records_to_frame(records: list[dict], columns: tuple) -> pd.DataFrame:
+    """Builds a DataFrame from dicts one column at a time (raises KeyError if any record misses a column).
+    numpy infers int/float/bool columns in C, everything else goes through pandas inference,
+    so dtypes match pd.DataFrame(list_of_dicts) for API payloads.
+    """
+    data = {}
+    for name in columns:
+        values = list(map(itemgetter(name), records))
+        arr = np.array(values)
+        if arr.dtype.kind in "ifb":
+            data[name] = arr
+        elif arr.dtype.kind == "U":
+            data[name] = np.array(values, dtype=object)
+        else:
+            data[name] = pd.Series(values).to_numpy()
+    return pd.DataFrame(data, columns=list(columns))
+
 def prepare_match_stats(raw_players: pd.DataFrame, raw_matches: pd.DataFrame) -> pd.DataFrame:
     """Prepares match for future merging by creating win column, and adjusting columns"""
 
     match_players = pd.merge(raw_players[['account_id','match_id','team','hero_id']], raw_matches, on='match_id', how='left')
 
-    match_players['win'] = match_players.apply(
-        lambda row: 'Y' if row['team'] == row['winning_team'] else 'N',
-        axis=1
-    )
+    # one array comparison instead of a python lambda per player row
+    win = match_players['team'].to_numpy() == match_players['winning_team'].to_numpy()
+    match_players['win'] = np.where(win, 'Y', 'N').astype(object)
 
     return match_players
 
@@ -46,73 +73,237 @@ def check_unique_naming(p_h_stats=None,
 
 def separate_match_players(
         matches_grouped_by_day: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Normalizes bulk match data into two dataframes: matches and players."""
+    """Normalizes bulk match data into two dataframes: matches and players.
+    Matches missing a key are dropped, matches without exactly 12 players keep their match row
+    but contribute no players, players missing a key are dropped.
+    """
 
     logging.info("Normalizing bulk match data")
-    matches = []
-    players = []
     if not matches_grouped_by_day:
         logging.warning("No match data found — matches_grouped_by_day is empty.")
         return pd.DataFrame(), pd.DataFrame()
-    for day_idx, day_matches in enumerate(matches_grouped_by_day): #day = key, match = value
-        logging.info(f"Processing day #{day_idx} with {len(day_matches)} matches")
-        
-        for match in day_matches: # match: day = key: value | match_id: 7432551
-            try:
-                match_id = match["match_id"]
-                start_time = match["start_time"]
-                game_mode = match["game_mode"]
-                match_mode = match["match_mode"]
-                duration_s = match["duration_s"]
-                winning_team = match["winning_team"]
-            except KeyError as e:
-                logging.error(f"Match missing key {e}: {match.get('match_id', 'unknown')}", exc_info=True)
-                continue
 
-            # Append to matches list
-            matches.append({
-                "match_id": match_id, # PK
-                "start_time": start_time,
-                "game_mode": game_mode,
-                "match_mode": match_mode,
-                "duration_s": duration_s,
-                "winning_team": winning_team
-            })
-            
-            # Append each player to players list
-            if "players" not in match or len(match["players"]) != 12:
-                logging.error(f"Match {match.get('match_id', 'unknown')} has invalid player count: {len(match.get('players', []))}")
-                continue
-            for player in match["players"]: # player: match["players"] = key: value | player_id: 1234567
-                try:
-                    players.append({
-                        "account_id": player["account_id"],
-                        "match_id": match_id,
-                        "team": player["team"],
-                        "hero_id": player["hero_id"],
-                        "kills": player["kills"],
-                        "deaths": player["deaths"],
-                        "assists": player["assists"],
-                        "denies": player["denies"],
-                        "net_worth": player["net_worth"],
-                    })
-                except KeyError as e:
-                    logging.error(f"Player missing key {e}: {player.get('account_id', 'unknown')}", exc_info=True)
-                    continue
-
-    # Convert lists to DataFrames
-    df_matches = pd.DataFrame(matches)
-    df_players = pd.DataFrame(players)
-    if not matches:
+    all_matches = [match for day_matches in matches_grouped_by_day for match in day_matches]
+    logging.info(f"Processing {len(matches_grouped_by_day)} days with {len(all_matches)} matches")
+    if not all_matches:
         logging.warning("No matches appended — matches list is empty.")
+        logging.warning("No players appended — players list is empty.")
+        return pd.DataFrame(), pd.DataFrame()
+
+    # bulk key validation: column extraction raises on the first missing key, only then is a per-match mask built
+    valid_matches = all_matches
+    try:
+        df_matches = _records_to_frame(valid_matches, MATCH_COLUMNS)
+    except KeyError:
+        match_keys = frozenset(MATCH_COLUMNS)
+        missing = [m.get('match_id', 'unknown') for m in all_matches if not match_keys <= m.keys()]
+        logging.error(f"{len(missing)} matches missing keys, skipped: {missing[:20]}")
+        valid_matches = [m for m in all_matches if match_keys <= m.keys()]
+        if not valid_matches:
+            logging.warning("No matches appended — matches list is empty.")
+            logging.warning("No players appended — players list is empty.")
+            return pd.DataFrame(), pd.DataFrame()
+        df_matches = _records_to_frame(valid_matches, MATCH_COLUMNS)
+
+    # 12 player check as a mask over every valid match
+    player_counts = np.fromiter((len(m.get("players") or ()) for m in valid_matches), dtype=np.int64, count=len(valid_matches))
+    full_match = player_counts == 12
+    if not full_match.all():
+        bad_ids = df_matches['match_id'].to_numpy()[~full_match]
+        logging.error(f"{len(bad_ids)} matches have invalid player count, players skipped: {bad_ids[:20].tolist()}")
+
+    players = [player for match, ok in zip(valid_matches, full_match) if ok for player in match["players"]]
+    player_match_ids = np.repeat(df_matches['match_id'].to_numpy()[full_match], 12)
+
     if not players:
         logging.warning("No players appended — players list is empty.")
+        return df_matches, pd.DataFrame()
+
+    try:
+        df_players = _records_to_frame(players, PLAYER_FIELDS)
+    except KeyError:
+        player_keys = frozenset(PLAYER_FIELDS)
+        valid_player = np.fromiter((player_keys <= p.keys() for p in players), dtype=bool, count=len(players))
+        bad_players = [p.get('account_id', 'unknown') for p, ok in zip(players, valid_player) if not ok]
+        logging.error(f"{len(bad_players)} players missing keys, skipped: {bad_players[:20]}")
+        players = [p for p, ok in zip(players, valid_player) if ok]
+        player_match_ids = player_match_ids[valid_player]
+        if not players:
+            logging.warning("No players appended — players list is empty.")
+            return df_matches, pd.DataFrame()
+        df_players = _records_to_frame(players, PLAYER_FIELDS)
+
+    df_players.insert(1, "match_id", player_match_ids)
 
     return df_matches, df_players
 
+def _empty_column(name: str, capacity: int) -> np.ndarray:
+    if name in INT_COLUMNS:
+        return np.zeros(capacity, dtype=np.int64)
+    return np.empty(capacity, dtype=object)
+
+def _set_value(columns: dict, name: str, i: int, value):
+    try:
+        columns[name][i] = value
+    except (TypeError, ValueError, OverflowError):
+        # null / non integer value, keep it as is like pd.DataFrame(list_of_dicts) would
+        columns[name] = columns[name].astype(object)
+        columns[name][i] = value
+
+class MatchFrameBuilder:
+    """Columnar buffers that build raw_matches / raw_players straight from match dicts.
+
+    Same validation rules as separate_match_players (a match missing a key is skipped,
+    a match without 12 players keeps its match row but no players, a player missing a key is skipped),
+    but fields go directly into preallocated numpy columns instead of per-row dicts.
+    Feed it from a generator (e.g. fetch_data.iter_match_window) so the full response is never held in memory.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(1, capacity)
+        self.n_matches = 0
+        self.n_players = 0
+        self.received = 0
+        self.matches = {c: _empty_column(c, capacity) for c in MATCH_COLUMNS}
+        self.players = {c: _empty_column(c, capacity * 12) for c in PLAYER_COLUMNS}
+        # row of the owning match for every player row, used to drop players of deduped matches
+        self.player_match_row = np.zeros(capacity * 12, dtype=np.int64)
+
+    def __len__(self):
+        return self.n_matches
+
+    @staticmethod
+    def _grow(columns: dict, needed: int):
+        size = len(next(iter(columns.values())))
+        if needed <= size:
+            return
+        new_size = max(needed, size * 2)
+        for name, col in columns.items():
+            grown = np.zeros(new_size, dtype=col.dtype) if col.dtype != object else np.empty(new_size, dtype=object)
+            grown[:size] = col
+            columns[name] = grown
+
+    def add_match(self, match: dict) -> bool:
+        """appends one match and its players, returns False if the match row was skipped"""
+        self.received += 1
+        try:
+            values = [match[c] for c in MATCH_COLUMNS]
+        except KeyError as e:
+            logging.error(f"Match missing key {e}: {match.get('match_id', 'unknown')}")
+            return False
+
+        self._grow(self.matches, self.n_matches + 1)
+        row = self.n_matches
+        for name, value in zip(MATCH_COLUMNS, values):
+            _set_value(self.matches, name, row, value)
+        self.n_matches += 1
+
+        players = match.get("players")
+        if players is None or len(players) != 12:
+            logging.error(f"Match {values[0]} has invalid player count: {len(players or [])}")
+            return True
+
+        self._grow(self.players, self.n_players + 12)
+        if len(self.player_match_row) < len(self.players["account_id"]):
+            grown = np.zeros(len(self.players["account_id"]), dtype=np.int64)
+            grown[:len(self.player_match_row)] = self.player_match_row
+            self.player_match_row = grown
+
+        cols = self.players
+        for player in players:
+            try:
+                player_values = [player[f] for f in PLAYER_FIELDS]
+            except KeyError as e:
+                logging.error(f"Player missing key {e}: {player.get('account_id', 'unknown')}")
+                continue
+            i = self.n_players
+            try:
+                cols["match_id"][i] = values[0]
+                for name, value in zip(PLAYER_FIELDS, player_values):
+                    cols[name][i] = value
+            except (TypeError, ValueError, OverflowError):
+                # slow path, widens the offending column to object
+                _set_value(cols, "match_id", i, values[0])
+                for name, value in zip(PLAYER_FIELDS, player_values):
+                    _set_value(cols, name, i, value)
+            self.player_match_row[i] = row
+            self.n_players += 1
+        return True
+
+    def extend(self, matches) -> int:
+        """adds every match from an iterable, returns how many matches were received (valid or not)"""
+        received = self.received
+        for match in matches:
+            self.add_match(match)
+        return self.received - received
+
+    @classmethod
+    def concat(cls, builders: list, dedupe: bool = True) -> "MatchFrameBuilder":
+        """joins builders in order, optionally keeping only the first row of each match_id (and its players)"""
+        out = cls(capacity=1)
+        builders = [b for b in builders if b.n_matches]
+        if not builders:
+            return out
+
+        out.received = sum(b.received for b in builders)
+        for name in MATCH_COLUMNS:
+            out.matches[name] = np.concatenate([b.matches[name][:b.n_matches] for b in builders])
+        for name in PLAYER_COLUMNS:
+            out.players[name] = np.concatenate([b.players[name][:b.n_players] for b in builders])
+        offsets = np.cumsum([0] + [b.n_matches for b in builders[:-1]])
+        out.player_match_row = np.concatenate(
+            [b.player_match_row[:b.n_players] + off for b, off in zip(builders, offsets)])
+        out.n_matches = len(out.matches["match_id"])
+        out.n_players = len(out.players["account_id"])
+
+        if dedupe and out.n_matches:
+            match_ids = out.matches["match_id"]
+            if match_ids.dtype == object:
+                match_ids = pd.Series(match_ids)
+                keep = ~match_ids.duplicated(keep="first").to_numpy()
+            else:
+                _, first = np.unique(match_ids, return_index=True)
+                keep = np.zeros(out.n_matches, dtype=bool)
+                keep[first] = True
+            if not keep.all():
+                # renumber kept match rows so player_match_row stays valid
+                new_row = np.cumsum(keep) - 1
+                player_keep = keep[out.player_match_row]
+                for name in MATCH_COLUMNS:
+                    out.matches[name] = out.matches[name][keep]
+                for name in PLAYER_COLUMNS:
+                    out.players[name] = out.players[name][player_keep]
+                out.player_match_row = new_row[out.player_match_row[player_keep]]
+                out.n_matches = int(keep.sum())
+                out.n_players = int(player_keep.sum())
+        return out
+
+    @staticmethod
+    def _frame(columns: dict, names: tuple, n: int) -> pd.DataFrame:
+        # object columns go through a list so pandas infers the same dtype as pd.DataFrame(list_of_dicts)
+        return pd.DataFrame({
+            c: columns[c][:n].tolist() if columns[c].dtype == object else columns[c][:n]
+            for c in names
+        })
+
+    def to_frames(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """returns (raw_matches, raw_players) with the same columns and dtypes as separate_match_players"""
+        if not self.n_matches:
+            logging.warning("No matches appended — matches list is empty.")
+            df_matches = pd.DataFrame()
+        else:
+            df_matches = self._frame(self.matches, MATCH_COLUMNS, self.n_matches)
+        if not self.n_players:
+            logging.warning("No players appended — players list is empty.")
+            df_players = pd.DataFrame()
+        else:
+            df_players = self._frame(self.players, PLAYER_COLUMNS, self.n_players)
+        return df_matches, df_players
+
 def merge_player_hero_stats(player_stats, player_hero_stats, hero_stats)->pd.DataFrame:
-    p_ph_stats = player_stats.merge(player_hero_stats, on='account_id')
-    p_ph_h_stats = p_ph_stats.merge(hero_stats, on='hero_id')
+    # stats tables have one row per key, rows are gathered by index instead of hash merged
+    p_ph_stats = lk.indexed_merge(player_stats, player_hero_stats, on='account_id')
+    p_ph_h_stats = lk.indexed_merge(p_ph_stats, hero_stats, on='hero_id')
 
     move_col = 'hero_id'
     pos = 1
@@ -122,53 +313,14 @@ def merge_player_hero_stats(player_stats, player_hero_stats, hero_stats)->pd.Dat
 
     return p_ph_h_stats
 
-def calculate_ph_stats(p_ph_h_stats: pd.DataFrame) -> pd.DataFrame:
+def calculate_ph_stats(p_ph_h_stats: pd.DataFrame, features: list[str] | None = None) -> pd.DataFrame:
     """
-    Create player hero stats by aggregating the player_hero_stats DataFrame.
-    Creates aggregate function across all hero_stats for players in df.
-    Checks for potential divide by zero errors and sets result to 0 if denominator is zero.
+    Create player hero stats from the merged player, player_hero and hero stats.
+    Adds the derived features in data.features.FEATURES to p_ph_h_stats in place and returns it.
+    features = columns a model needs, only those features and their dependencies are computed (None = all)
+    Ratios whose guard column is zero are set to 0, without evaluating the division for those rows.
     """
-    import numpy as np
-    
-    all_stats = p_ph_h_stats.copy()
-
-    # player_hero kd for the player<>hero combo
-    all_stats['ph_total_kd'] = np.where(all_stats['ph_deaths'] == 0, 0, 
-                                        all_stats['ph_kills'] / all_stats['ph_deaths'])
-
-    # all 100 badge hero stats, total kd- used to compare player performance with hero
-    all_stats['h_total_kd'] = np.where(all_stats['h_total_deaths'] == 0, 0, 
-                                        all_stats['h_total_kills'] / all_stats['h_total_deaths'])
-
-    # compares player_hero kd to average hero_kd - player skill with hero.
-    all_stats['ph_kd_ratio'] = np.where(all_stats['ph_total_kd'] == 0, 0, 
-                                        all_stats['ph_total_kd']/ all_stats['h_total_kd'])
-
-    # What % of matches the player played with hero, compared to all matches played with hero.
-    all_stats['ph_hero_xp_ratio'] = np.where(all_stats['ph_matches_played'] == 0, 0, 
-                                        all_stats['ph_matches_played'] / all_stats['h_matches'])
-    
-    # Create damage per match ratio, player_hero to hero
-    all_stats['ph_avg_match_length'] = np.where(all_stats['ph_time_played'] == 0, 0,
-                                        all_stats['ph_time_played'] / all_stats['ph_matches_played']/60)
-    all_stats['ph_avg_damage_per_match'] = np.where(all_stats['ph_avg_match_length'] == 0, 0,
-                                        all_stats['ph_damage_per_min'] * all_stats['ph_avg_match_length'])
-    all_stats['h_damage_per_match'] = np.where(all_stats['h_matches'] == 0, 0,
-                                        all_stats['h_total_player_damage'] / all_stats['h_matches'])
-    all_stats['ph_damage_ratio'] = np.where(all_stats['ph_avg_damage_per_match'] == 0, 0,
-                                        all_stats['ph_avg_damage_per_match'] / all_stats['h_damage_per_match'])
-
-    # player_hero ratios
-    all_stats['ph_assists_ratio'] = np.where(all_stats['h_total_assists'] == 0, 0, 
-                                            all_stats['ph_assists']/ all_stats['h_total_assists'])
-    all_stats['ph_win_rate'] = np.where(all_stats['ph_matches_played'] == 0, 0, 
-                                        all_stats['ph_wins'] / all_stats['ph_matches_played'])
-    all_stats['h_total_win_rate'] = np.where(all_stats['h_matches'] == 0, 0,
-                                        all_stats['h_wins'] / all_stats['h_matches'])
-    all_stats['ph_win_rate_ratio'] = np.where(all_stats['ph_win_rate'] == 0, 0, 
-                                            all_stats['ph_win_rate'] / all_stats['h_total_win_rate'])
-    
-    return all_stats
+    return ft.compute_features(p_ph_h_stats, features)
 
 if __name__ == "__main__":
     start_date = "2025-08-19"
@@ -0,0 +1,95 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Compact dtype schema applied to every DataFrame in the training data pipeline"""
+
+TEAM_DTYPE = pd.CategoricalDtype(["Team0", "Team1"])
+
+# identifier columns and their compact dtype, kept as int64 if the values don't fit
+ID_DTYPES = {
+    "match_id": np.int64,
+    "account_id": np.uint32,
+    "hero_id": np.int16,
+}
+
+CATEGORY_DTYPES = {
+    "team": TEAM_DTYPE,
+    "winning_team": TEAM_DTYPE,
+    "game_mode": "category",
+    "match_mode": "category",
+}
+
+# labels used for the 'win' column before the schema, and for the training target 'team_0_win'
+WIN_LABEL = "Y"
+LOSS_LABEL = "N"
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def _fits(series: pd.Series, dtype) -> bool:
+    if series.empty:
+        return True
+    info = np.iinfo(dtype)
+    return series.min() >= info.min and series.max() <= info.max
+
+def _compact(name: str, series: pd.Series) -> pd.Series | None:
+    """returns the column cast to its schema dtype, or None if it should be left alone"""
+    dtype = series.dtype
+
+    if name in ID_DTYPES:
+        if pd.api.types.is_integer_dtype(dtype) and dtype != ID_DTYPES[name]:
+            target = ID_DTYPES[name] if _fits(series, ID_DTYPES[name]) else np.int64
+            return series.astype(target) if dtype != target else None
+        return None
+
+    if name in CATEGORY_DTYPES:
+        if isinstance(dtype, pd.CategoricalDtype):
+            return None
+        target = CATEGORY_DTYPES[name]
+        # unknown team labels would silently become NaN in TEAM_DTYPE, keep them as a plain category
+        if target is TEAM_DTYPE and not series.dropna().isin(TEAM_DTYPE.categories).all():
+            target = "category"
+        return series.astype(target)
+
+    if name == "win":
+        if dtype == object:
+            return series == WIN_LABEL
+        return None
+
+    if dtype == np.float64:
+        return series.astype(np.float32)
+    if dtype == np.int64 and _fits(series, np.int32):
+        return series.astype(np.int32)
+    return None
+
+def apply_schema(df: pd.DataFrame, stage: str = "", report: bool = True) -> pd.DataFrame:
+    """Casts df's columns to the pipeline schema, replacing columns in place and returning df.
+    - match_id int64, account_id uint32, hero_id int16 (int64 if out of range)
+    - team / winning_team categorical, game_mode / match_mode category
+    - win 'Y'/'N' -> bool
+    - remaining float64 -> float32, remaining int64 -> int32 when the values fit
+    Logs memory before and after under stage when report is set.
+    """
+    if df is None or df.empty:
+        return df
+
+    before = memory_mb(df) if report else 0.0
+    for i, name in enumerate(df.columns):
+        compact = _compact(name, df.iloc[:, i])
+        if compact is not None:
+            df.isetitem(i, compact)
+
+    if report:
+        after = memory_mb(df)
+        logging.info(f"schema {stage}: {df.shape[0]} rows x {df.shape[1]} cols, {before:.1f} MB -> {after:.1f} MB")
+    return df
+
+def win_label(series: pd.Series) -> pd.Series:
+    """maps a boolean win column back to the 'Y'/'N' labels models are trained on"""
+    if series.dtype == bool:
+        return pd.Series(np.where(series.to_numpy(), WIN_LABEL, LOSS_LABEL), index=series.index, dtype=object)
+    return series
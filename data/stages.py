@@ -0,0 +1,167 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import nullcontext
+import pandas as pd
+
+from data import fetch_data as fd
+from data.instrument import StageMetrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Content-hashed pipeline stages: outputs are stored under a key derived from the stage code (and the code it calls),
+its parameters, its inputs and the API it fetches from, so reruns skip every stage whose key already has a complete artifact"""
+
+DEFAULT_STAGE_ROOT = "v2_data//stages"
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def source_digest(*objects) -> str:
+    """hash of the source of functions, classes or modules"""
+    h = hashlib.sha256()
+    for obj in objects:
+        h.update(inspect.getsource(obj).encode())
+    return h.hexdigest()
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """hash of a frame's columns, dtypes and values (row order included, index ignored)"""
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+class Artifact:
+    """Output tables of one stage run, loaded from disk on first access"""
+
+    def __init__(self, key: str, folder: str | None = None, tables: dict[str, pd.DataFrame] | None = None, fresh: bool = False):
+        self.key = key
+        self.folder = folder
+        self.fresh = fresh
+        self._tables = tables
+
+    @property
+    def names(self) -> list[str]:
+        """table names, read from the manifest without loading the tables"""
+        if self._tables is not None:
+            return list(self._tables)
+        with open(os.path.join(self.folder, "manifest.json")) as f:
+            return json.load(f)["tables"]
+
+    @property
+    def tables(self) -> dict[str, pd.DataFrame]:
+        if self._tables is None:
+            self._tables = {name: pd.read_pickle(os.path.join(self.folder, f"{name}.pkl")) for name in self.names}
+        return self._tables
+
+    def __getitem__(self, table: str) -> pd.DataFrame:
+        return self.tables[table]
+
+    @classmethod
+    def from_frames(cls, name: str, tables: dict[str, pd.DataFrame]) -> "Artifact":
+        """in-memory artifact keyed by the content of its tables, e.g. a filtered copy of another stage's output"""
+        return cls(_digest([name, {t: frame_digest(df) for t, df in tables.items()}]), tables=tables)
+
+class StageRunner:
+    """Runs pipeline stages, persisting each output under root/<stage>/<key>.
+
+    The key hashes the stage function's source, the source of the code it calls (deps), its params,
+    the keys of its input artifacts and the API base url, so a change anywhere upstream re-runs everything
+    downstream of it and nothing else.
+    An artifact counts once its manifest.json is written (last), so a crash mid-write re-runs the stage.
+    force = stage names to re-run regardless of stored artifacts ('all' re-runs everything)
+    trace = optional data.instrument.RunTrace recording each stage's time, memory, rows and bytes
+    deps = stage name -> modules / functions / classes the stage calls, e.g. {'derive': (dp, ft)}
+    """
+
+    def __init__(self, root: str = DEFAULT_STAGE_ROOT, force: tuple[str, ...] = (), trace=None,
+                 deps: dict[str, tuple] | None = None):
+        self.root = root
+        self.force = set(force)
+        self.trace = trace
+        self.deps = deps or {}
+        self.log = []
+
+    def key(self, name: str, fn, params: dict, inputs: dict[str, Artifact]) -> str:
+        return _digest({
+            "stage": name,
+            "code": source_digest(fn, *self.deps.get(name, ())),
+            "params": params,
+            "inputs": {k: a.key for k, a in sorted(inputs.items())},
+            # mock / recorded api runs never share artifacts with the real api
+            "api_base": fd.get_client().base(),
+        })
+
+    def run(self, name: str, fn, params: dict | None = None, inputs: dict[str, Artifact] | None = None,
+            options: dict | None = None) -> Artifact:
+        """returns the stored artifact for this stage's key, or runs fn and stores its output.
+        fn is called with the input tables it names as arguments, params and options as keyword arguments,
+        and returns {table: DataFrame}. options (worker counts, cache paths) don't change the key.
+        """
+        params = params or {}
+        inputs = inputs or {}
+        options = options or {}
+        key = self.key(name, fn, params, inputs)
+        folder = os.path.join(self.root, name, key)
+        manifest = os.path.join(folder, "manifest.json")
+
+        if os.path.exists(manifest) and not ({name, "all"} & self.force):
+            logging.info(f"stage {name}: up to date ({key}), skipping")
+            self.log.append({"stage": name, "key": key, "skipped": True, "seconds": 0.0})
+            if self.trace is not None:
+                self.trace.skipped(name, key=key)
+            return Artifact(key, folder)
+
+        wanted = inspect.signature(fn).parameters
+        kwargs = {table: df for artifact in inputs.values() for table, df in artifact.tables.items() if table in wanted}
+        rows_in = sum(len(df) for df in kwargs.values())
+        staged = self.trace.stage(name, rows_in=rows_in) if self.trace is not None else nullcontext(StageMetrics(name, "stage"))
+        with staged as metrics:
+            t0 = time.perf_counter()
+            logging.info(f"stage {name}: running ({key})")
+            tables = fn(**kwargs, **params, **options)
+            elapsed = time.perf_counter() - t0
+
+            # written aside and renamed in, so processes sharing root never see (or delete) a half written folder
+            tmp = f"{folder}.{os.getpid()}.tmp"
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp)
+            os.makedirs(tmp)
+            for table, df in tables.items():
+                path = os.path.join(tmp, f"{table}.pkl")
+                df.to_pickle(path)
+                metrics.bytes_written += os.path.getsize(path)
+            with open(os.path.join(tmp, "manifest.json"), "w") as f:
+                json.dump({
+                    "stage": name, "key": key, "params": params,
+                    "inputs": {k: a.key for k, a in inputs.items()},
+                    "tables": list(tables), "seconds": elapsed, "created_at": time.time(),
+                }, f, indent=4, default=str)
+            # a forced re-run replaces the stored folder, one without a manifest is left from an older interrupted run
+            if os.path.exists(folder) and ({name, "all"} & self.force or not os.path.exists(manifest)):
+                shutil.rmtree(folder, ignore_errors=True)
+            try:
+                os.replace(tmp, folder)
+            except OSError:
+                # another process stored the same key first, its tables are the same stage output
+                if not os.path.exists(manifest):
+                    raise
+                shutil.rmtree(tmp)
+            metrics.rows_out = sum(len(df) for df in tables.values())
+            metrics.args["key"] = key
+
+        self.log.append({"stage": name, "key": key, "skipped": False, "seconds": elapsed})
+        return Artifact(key, folder, tables, fresh=True)
+
+    def log_summary(self):
+        ran = [s for s in self.log if not s["skipped"]]
+        lines = [f"stages: {len(ran)} ran, {len(self.log) - len(ran)} skipped"]
+        for s in self.log:
+            status = "skipped" if s["skipped"] else f"{s['seconds']:.2f}s"
+            lines.append(f"  {s['stage']:<24} {status}")
+        logging.info("\n".join(lines))
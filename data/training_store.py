@@ -0,0 +1,95 @@
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from data import columnar as col
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Append-only store of team stats / training data built incrementally, one batch of new matches at a time"""
+
+DEFAULT_STORE_ROOT = "v2_data//training_store"
+
+# columns identifying a row per table, used to drop rows left over from an interrupted append
+TABLE_KEYS = {"team_stats": ["match_id", "team"]}
+DEFAULT_KEYS = ["match_id"]
+
+class TrainingStore:
+    """Folder of append-only tables (team_stats, training_data, training_data_<layout>) plus a match index.
+
+    - match_index.csv: every match_id already built, with its start_time and the time it was added
+    - <table>.parquet/: rows appended per build as Parquet files partitioned by match date,
+      only rows of indexed matches are returned by load
+
+    Tables are appended before the index, so a build interrupted in between is rebuilt next run
+    and its leftover rows are dropped by load (last copy of each key wins).
+    """
+
+    def __init__(self, folder: str):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.index_path = os.path.join(folder, "match_index.csv")
+        self._index = None
+
+    def table_path(self, table: str) -> str:
+        return col.table_path(self.folder, table)
+
+    def stored_columns(self, table: str) -> list[str] | None:
+        path = self.table_path(table)
+        if not os.path.exists(path):
+            return None
+        return [c for c in ds.dataset(path, format="parquet", partitioning="hive").schema.names
+                if c != col.PARTITION_COLUMN]
+
+    @property
+    def index(self) -> pd.DataFrame:
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                self._index = pd.read_csv(self.index_path)
+            else:
+                self._index = pd.DataFrame({
+                    "match_id": pd.Series(dtype=np.int64),
+                    "start_time": pd.Series(dtype=np.int64),
+                    "added_at": pd.Series(dtype=np.float64),
+                })
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def new_match_mask(self, match_ids: pd.Series) -> np.ndarray:
+        """True for match ids not built yet"""
+        return ~match_ids.isin(self.index["match_id"]).to_numpy()
+
+    def append(self, tables: dict[str, pd.DataFrame], matches: pd.DataFrame):
+        """appends each table's rows, then records matches (match_id, start_time) in the index.
+        Raises ValueError if a table's columns differ from what is already stored.
+        """
+        dates = col.match_dates(matches)
+        for table, frame in tables.items():
+            stored = self.stored_columns(table)
+            if stored is not None and stored != list(frame.columns):
+                raise ValueError(
+                    f"{table} columns differ from the store at {self.table_path(table)}, rebuild the store instead of appending")
+            col.write_table(self.table_path(table), frame, dates, append=True)
+
+        added = matches[["match_id", "start_time"]].assign(added_at=time.time())
+        added.to_csv(self.index_path, mode="a", header=not os.path.exists(self.index_path), index=False)
+        self._index = pd.concat([self.index, added], ignore_index=True)
+        logging.info(f"training store {self.folder}: appended {len(added)} matches, {len(self.index)} total")
+
+    def load(self, table: str, columns: list[str] | None = None, dates: list[str] | None = None) -> pd.DataFrame:
+        """reads a table, keeping rows of indexed matches only (last copy of each key).
+        columns / dates (match_date partitions, 'YYYY-MM-DD') limit what is read from disk
+        """
+        frame = col.read_table(self.table_path(table), columns=columns, dates=dates)
+        keys = [k for k in TABLE_KEYS.get(table, DEFAULT_KEYS) if k in frame.columns]
+        if "match_id" in frame.columns:
+            frame = frame[frame["match_id"].isin(self.index["match_id"])]
+        if keys:
+            frame = frame.drop_duplicates(keys, keep="last")
+        return frame.reset_index(drop=True)
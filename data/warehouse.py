@@ -0,0 +1,344 @@
+import argparse
+import logging
+import os
+from datetime import datetime
+import duckdb
+import pandas as pd
+
+from create_team_stats import TEAM_STATS, LAYOUTS, LAYOUT_STATS, QUANTILES
+from data import features as ft
+from data.fetch_data import unix_utc_start, unix_utc_eod
+from data.schema import apply_schema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""DuckDB warehouse: raw matches, players, player hero and hero stats are ingested into tables and
+training data is built with SQL (merge -> features -> team aggregates -> layout) that DuckDB runs
+on all threads, spilling to disk past memory_limit, so long windows never have to fit in a DataFrame.
+Player hero and hero stats are kept as one snapshot per as-of date, and every match is built from the
+snapshots of the ingested window it belongs to, so a later window never leaks newer stats into older matches."""
+
+DEFAULT_WAREHOUSE_PATH = "v2_data//warehouse.duckdb"
+
+# one row per key in each raw table, re-ingested rows replace the stored ones
+TABLE_KEYS = {
+    'raw_matches': ['match_id'],
+    'raw_players': ['match_id', 'account_id'],
+    'player_hero_stats': ['as_of_date', 'account_id', 'hero_id'],
+    'hero_stats': ['as_of_date', 'hero_id'],
+}
+# stats tables hold one snapshot per as_of_date (the fetch_till_date they were fetched with)
+SNAPSHOT_TABLES = ('player_hero_stats', 'hero_stats')
+SNAPSHOT_COLUMN = 'as_of_date'
+
+# fd.process_player_stats as SQL aggregates over player_hero_stats
+PLAYER_STATS = {
+    'p_total_matches_played': "SUM(matches_played)",
+    'p_total_kills': "SUM(kills)",
+    'p_total_deaths': "SUM(deaths)",
+    'p_total_wins': "SUM(wins)",
+    'p_total_assists': "SUM(assists)",
+    'p_total_time_played': "SUM(time_played)",
+    'p_avg_kills': "COALESCE(SUM(kills) / NULLIF(SUM(matches_played), 0), 0)",
+    'p_win_rate': "COALESCE(SUM(wins) / NULLIF(SUM(matches_played), 0), 0)",
+}
+
+# team stat -> SQL aggregate, NaN is turned into NULL first so it is skipped like in pandas
+AGGREGATES = {
+    'min': "MIN({x})",
+    'max': "MAX({x})",
+    'mean': "AVG({x})",
+    'std': "STDDEV_SAMP({x})",
+    **{stat: f"QUANTILE_CONT({{x}}, {q})" for stat, q in QUANTILES.items()},
+}
+
+FLOAT_TYPES = ('FLOAT', 'DOUBLE')
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _feature_sql(feature: ft.Feature) -> str:
+    """same semantics as features._evaluate: 0 where guard == 0, a (op) b everywhere else (NULL/NaN included)"""
+    op = '/' if feature.op == 'div' else '*'
+    value = f"CAST({_q(feature.a)} AS DOUBLE) {op} CAST({_q(feature.b)} AS DOUBLE)"
+    if feature.divisor is not None:
+        value = f"({value}) / {float(feature.divisor)}"
+    return f"CASE WHEN {_q(feature.guard)} = 0 THEN 0.0 ELSE {value} END"
+
+def _team_stat_sql(column: str, stat: str, source_type: str) -> str:
+    """aggregate of a player stat over a team, typed like cts._stat_dtype:
+    min / max keep the column type, other stats are DOUBLE unless the column is FLOAT"""
+    x = f"s.{_q(column)}"
+    if source_type == 'FLOAT':
+        x = f"NULLIF(CAST({x} AS FLOAT), CAST('NaN' AS FLOAT))"
+    result_type = source_type if stat in ('min', 'max') or source_type == 'FLOAT' else 'DOUBLE'
+    return f"CAST({AGGREGATES[stat].format(x=x)} AS {result_type})"
+
+class Warehouse:
+    """DuckDB file holding raw_matches, raw_players, player_hero_stats (unprefixed, as fetched),
+    hero_stats (h_ prefixed, as stage_fetch_hero_stats returns it), the ingested windows and built training tables.
+
+    threads / memory_limit (e.g. '4GB') bound the build, anything past memory_limit spills to temp_directory.
+    """
+
+    def __init__(self, path: str = DEFAULT_WAREHOUSE_PATH, threads: int | None = None,
+                 memory_limit: str | None = None, temp_directory: str | None = None):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.con = duckdb.connect(path)
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = '{memory_limit}'")
+        self.con.execute(f"SET temp_directory = '{temp_directory or path + '.tmp'}'")
+        # builds order their output explicitly, dropping insertion order lets large scans stream
+        self.con.execute("SET preserve_insertion_order = false")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def tables(self) -> list[str]:
+        return [row[0] for row in self.con.execute("SELECT table_name FROM duckdb_tables()").fetchall()]
+
+    def columns(self, query: str) -> dict[str, str]:
+        """{column: duckdb type} of a query's result"""
+        relation = self.con.sql(query)
+        return {name: str(kind) for name, kind in zip(relation.columns, relation.types)}
+
+    def ingest(self, table: str, source: pd.DataFrame | str, as_of_date: str | None = None) -> int:
+        """Upserts rows into a raw table from a DataFrame or a Parquet table written by data.columnar
+        (a file or a match_date partitioned folder, read by DuckDB directly). Returns the stored row count.
+        as_of_date (YYYY-MM-DD) = fetch_till_date of player_hero_stats / hero_stats rows, they replace that snapshot only.
+        Raises ValueError for unknown tables, a missing as_of_date or columns that differ from the stored ones.
+        """
+        if table not in TABLE_KEYS:
+            raise ValueError(f"Unknown warehouse table {table}, expected one of {list(TABLE_KEYS)}")
+        if table in SNAPSHOT_TABLES:
+            if as_of_date is None:
+                raise ValueError(f"{table} rows are snapshots, pass the as_of_date they were fetched for")
+            datetime.strptime(as_of_date, "%Y-%m-%d")
+
+        registered = isinstance(source, pd.DataFrame)
+        if registered:
+            self.con.register("_ingest", source)
+            relation = "_ingest"
+        elif os.path.isdir(source):
+            relation = f"read_parquet('{source}/**/*.parquet', hive_partitioning = true)"
+            relation = f"(SELECT * EXCLUDE (match_date) FROM {relation})"
+        else:
+            relation = f"read_parquet('{source}')"
+        if table in SNAPSHOT_TABLES:
+            relation = f"(SELECT *, '{as_of_date}' AS {SNAPSHOT_COLUMN} FROM {relation})"
+
+        try:
+            if table not in self.tables():
+                self.con.execute(f"CREATE TABLE {table} AS SELECT * FROM {relation}")
+            else:
+                stored, incoming = self.columns(f"SELECT * FROM {table}"), self.columns(f"SELECT * FROM {relation}")
+                if list(stored) != list(incoming):
+                    raise ValueError(f"{table} columns differ from the warehouse, rebuild it instead of ingesting")
+                keys = " AND ".join(f"{table}.{_q(k)} = i.{_q(k)}" for k in TABLE_KEYS[table])
+                self.con.execute("BEGIN TRANSACTION")
+                self.con.execute(f"DELETE FROM {table} USING {relation} AS i WHERE {keys}")
+                self.con.execute(f"INSERT INTO {table} SELECT * FROM {relation}")
+                self.con.execute("COMMIT")
+        finally:
+            if registered:
+                self.con.unregister("_ingest")
+
+        rows = self.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        logging.info(f"warehouse {table}: {rows} rows")
+        return rows
+
+    def record_window(self, start_date: str, end_date: str, player_as_of: str, hero_as_of: str):
+        """registers a fetched window: its matches are built from the player_hero_stats snapshot of player_as_of
+        and the hero_stats snapshot of hero_as_of"""
+        for date in (start_date, end_date, player_as_of, hero_as_of):
+            datetime.strptime(date, "%Y-%m-%d")
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS windows (start_date VARCHAR, end_date VARCHAR, start_unix BIGINT, end_unix BIGINT,
+                                                player_as_of VARCHAR, hero_as_of VARCHAR)""")
+        self.con.execute("BEGIN TRANSACTION")
+        self.con.execute("DELETE FROM windows WHERE start_date = ? AND end_date = ?", [start_date, end_date])
+        self.con.execute("INSERT INTO windows VALUES (?, ?, ?, ?, ?, ?)",
+                         [start_date, end_date, unix_utc_start(start_date), unix_utc_eod(end_date), player_as_of, hero_as_of])
+        self.con.execute("COMMIT")
+
+    def ingest_window(self, tables: dict[str, pd.DataFrame | str], start_date: str, end_date: str,
+                      player_as_of: str | None = None, hero_as_of: str | None = None):
+        """ingests the four raw tables of one create_training_data window and records it.
+        The as-of dates default to the pipeline's: player stats till start_date, hero stats till end_date."""
+        player_as_of, hero_as_of = player_as_of or start_date, hero_as_of or end_date
+        as_of = {'player_hero_stats': player_as_of, 'hero_stats': hero_as_of}
+        for table in TABLE_KEYS:
+            self.ingest(table, tables[table], as_of.get(table))
+        self.record_window(start_date, end_date, player_as_of, hero_as_of)
+
+    def _stats_sql(self, columns: list[str]) -> str:
+        """player<>hero rows with player and hero stats and the features needed for columns, one set per
+        (player_as_of, hero_as_of) snapshot pair the players use,
+        like merge_player_hero_stats + calculate_ph_stats + apply_schema (float results as FLOAT)"""
+        ph_columns = [c for c in self.columns("SELECT * FROM player_hero_stats")
+                      if c not in ('account_id', 'hero_id', SNAPSHOT_COLUMN)]
+        ph_names = {c if c.startswith('ph_') else f"ph_{c}": c for c in ph_columns}
+        h_names = [c for c in self.columns("SELECT * FROM hero_stats") if c not in ('hero_id', SNAPSHOT_COLUMN)]
+
+        needed = [c for c in ft.source_columns(columns) if c not in ('account_id', 'hero_id')]
+        unknown = [c for c in needed if c not in ph_names and c not in h_names and c not in PLAYER_STATS]
+        if unknown:
+            raise KeyError(f"Missing source columns for features: {unknown}")
+
+        select = [f"ph.{_q(ph_names[c])} AS {_q(c)}" if c in ph_names
+                  else f"h.{_q(c)}" if c in h_names else f"p.{_q(c)}" for c in needed]
+        # player totals only for accounts playing in the window, over all of their heroes in the snapshot
+        p_stats = "".join(f", {expr} AS {name}" for name, expr in PLAYER_STATS.items() if name in needed)
+
+        sql = f"""
+            SELECT s.player_as_of, s.hero_as_of, ph.account_id, ph.hero_id, {", ".join(select)}
+            FROM (SELECT DISTINCT player_as_of, hero_as_of, account_id FROM players) s
+            JOIN player_hero_stats ph ON ph.{SNAPSHOT_COLUMN} = s.player_as_of AND ph.account_id = s.account_id
+            JOIN (SELECT {SNAPSHOT_COLUMN}, account_id{p_stats} FROM player_hero_stats
+                  WHERE ({SNAPSHOT_COLUMN}, account_id) IN (SELECT player_as_of, account_id FROM players)
+                  GROUP BY {SNAPSHOT_COLUMN}, account_id) p
+              ON p.{SNAPSHOT_COLUMN} = s.player_as_of AND p.account_id = s.account_id
+            JOIN hero_stats h ON h.{SNAPSHOT_COLUMN} = s.hero_as_of AND h.hero_id = ph.hero_id"""
+        for name in ft.resolve(columns):
+            sql = f"SELECT *, {_feature_sql(ft.FEATURES[name])} AS {_q(name)} FROM ({sql})"
+        return sql
+
+    def _players_sql(self, start_date: str | None, end_date: str | None, window: tuple[str, str] | None = None) -> str:
+        """match players in the window with their win flag, like dp.prepare_match_stats, and the as-of dates of
+        the stats snapshots they are built from: those of the latest starting recorded window holding the match
+        (only the given (start_date, end_date) window if set). Matches outside every recorded window are left out."""
+        where = []
+        if start_date:
+            where.append(f"m.start_time >= {unix_utc_start(start_date)}")
+        if end_date:
+            where.append(f"m.start_time <= {unix_utc_eod(end_date)}")
+        windows = "windows"
+        if window is not None:
+            for date in window:
+                datetime.strptime(date, "%Y-%m-%d")
+            windows = f"(SELECT * FROM windows WHERE start_date = '{window[0]}' AND end_date = '{window[1]}')"
+        return f"""
+            SELECT p.account_id, p.match_id, CAST(p.team AS VARCHAR) AS team, p.hero_id,
+                   CAST(p.team AS VARCHAR) = CAST(m.winning_team AS VARCHAR) AS win, w.player_as_of, w.hero_as_of
+            FROM raw_players p JOIN raw_matches m USING (match_id)
+            JOIN (SELECT m.match_id, w.player_as_of, w.hero_as_of
+                  FROM raw_matches m JOIN {windows} w ON m.start_time BETWEEN w.start_unix AND w.end_unix
+                  QUALIFY ROW_NUMBER() OVER (PARTITION BY m.match_id ORDER BY w.player_as_of DESC, w.hero_as_of) = 1) w
+              USING (match_id)
+            {f"WHERE {' AND '.join(where)}" if where else ""}"""
+
+    def training_sql(self, layout: str = 'std_diff', start_date: str | None = None, end_date: str | None = None,
+                     columns: list[str] = TEAM_STATS, window: tuple[str, str] | None = None) -> str:
+        """SQL producing the same rows and columns as cts.create_team_stat_layouts(...)[layout]
+        for matches started between start_date and end_date (inclusive days, UTC), ordered by match_id.
+        window = a recorded (start_date, end_date) window whose stats snapshots every match uses, by default
+        each match uses the snapshots of the latest starting window holding it"""
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown team stat layout: {layout}, expected one of {LAYOUTS}")
+        family = 'std' if layout == 'team' else layout.removesuffix('_diff')
+        stats = LAYOUT_STATS[family]
+
+        players = self._players_sql(start_date, end_date, window)
+        player_stats = self._stats_sql(columns)
+        with_sql = f"WITH players AS ({players}), player_stats AS ({player_stats})"
+
+        # p_m_stats types after apply_schema: float features are FLOAT, integer stats stay integers
+        # unless a player has no stats, then the left merge made them float (FLOAT after apply_schema)
+        types = self.columns(f"{with_sql} SELECT * FROM player_stats")
+        missing_stats = self.con.execute(f"""{with_sql}
+            SELECT COUNT(*) FILTER (WHERE s.account_id IS NULL) > 0
+            FROM players pl LEFT JOIN (SELECT player_as_of, hero_as_of, account_id, hero_id FROM player_stats) s
+              USING (player_as_of, hero_as_of, account_id, hero_id)""").fetchone()[0]
+        src = {c: 'FLOAT' if types[c] in FLOAT_TYPES or missing_stats else 'BIGINT' if types[c] == 'HUGEINT' else types[c]
+               for c in columns}
+        aggregates = ", ".join(f"{_team_stat_sql(c, s, src[c])} AS {_q(f'{c}_{s}')}" for c in columns for s in stats)
+        team_sql = f"""
+            SELECT pl.match_id, pl.team, FIRST(pl.win) AS win_first, {aggregates}
+            FROM players pl LEFT JOIN player_stats s USING (player_as_of, hero_as_of, account_id, hero_id)
+            GROUP BY pl.match_id, pl.team"""
+        with_sql += f", team AS ({team_sql})"
+
+        if layout == 'team':
+            select = ", ".join(_q(f"{c}_{s}") for c in columns for s in stats)
+            return f"{with_sql} SELECT match_id, team, {select}, win_first FROM team ORDER BY match_id, team"
+
+        labels = [row[0] for row in self.con.execute(
+            f"SELECT DISTINCT CAST(team AS VARCHAR) FROM raw_players ORDER BY 1").fetchall()]
+        if len(labels) != 2:
+            raise ValueError(f"Expected two teams in raw_players, found {labels}")
+        team_0_win = "CASE WHEN t0.win_first THEN 'Y' WHEN NOT t0.win_first THEN 'N' END AS team_0_win"
+        joins = f"""
+            FROM (SELECT DISTINCT match_id FROM team) m
+            LEFT JOIN team t0 ON t0.match_id = m.match_id AND t0.team = '{labels[0]}'
+            LEFT JOIN team t1 ON t1.match_id = m.match_id AND t1.team = '{labels[1]}'"""
+
+        if layout.endswith('_diff'):
+            select = ", ".join(
+                f"ROUND(t0.{_q(f'{c}_{s}')} - t1.{_q(f'{c}_{s}')}, 3) AS {_q(f'{c}_{s}_diff')}"
+                for c in columns for s in stats)
+            return f"{with_sql} SELECT m.match_id, {team_0_win}, {select} {joins} ORDER BY m.match_id"
+
+        select = ", ".join(
+            f"t{t}.{_q(f'{c}_{s}')} AS {_q(f'{c}_{s}_{label}')}"
+            for c in columns for s in stats for t, label in enumerate(labels))
+        return f"{with_sql} SELECT m.match_id, {select}, {team_0_win} {joins} ORDER BY m.match_id"
+
+    def build(self, layout: str = 'std_diff', start_date: str | None = None, end_date: str | None = None,
+              table: str | None = None, columns: list[str] = TEAM_STATS, window: tuple[str, str] | None = None) -> str:
+        """materializes a layout into a warehouse table (training_data_<layout> by default), returns its name"""
+        table = table or f"training_data_{layout}"
+        self.con.execute(f"CREATE OR REPLACE TABLE {table} AS {self.training_sql(layout, start_date, end_date, columns, window)}")
+        rows = self.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        logging.info(f"warehouse {table}: built {rows} rows for {start_date or 'start'} to {end_date or 'end'}")
+        return table
+
+    def fetch(self, table: str, columns: list[str] | None = None) -> pd.DataFrame:
+        """reads a built table into a DataFrame with the pipeline schema applied"""
+        select = ", ".join(_q(c) for c in columns) if columns else "*"
+        frame = self.con.execute(f"SELECT {select} FROM {table}").df()
+        for c in frame.columns:
+            if isinstance(frame[c].dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(frame[c].dtype):
+                # NULL integer stats become float NaN, as the pandas left merge upcasts them
+                frame[c] = frame[c].to_numpy(dtype='float64', na_value=float('nan')) if frame[c].hasnans \
+                    else frame[c].to_numpy(dtype=frame[c].dtype.numpy_dtype)
+        return apply_schema(frame, table)
+
+    def export(self, table: str, path: str) -> str:
+        """writes a built table to a zstd Parquet folder partitioned by match date, readable by data.columnar,
+        without going through pandas"""
+        if os.path.exists(path):
+            raise FileExistsError(f"{path} already exists")
+        self.con.execute(f"""
+            COPY (SELECT t.*, strftime(epoch_ms(CAST(m.start_time AS BIGINT) * 1000), '%Y-%m-%d') AS match_date
+                  FROM {table} t JOIN raw_matches m USING (match_id) ORDER BY t.match_id)
+            TO '{path}' (FORMAT parquet, COMPRESSION zstd, PARTITION_BY (match_date))""")
+        logging.info(f"warehouse {table}: exported to {path}")
+        return path
+
+if __name__ == "__main__":
+    # Example launch command: python -m data.warehouse 2025-08-01 2025-08-31 --layout std_diff --export v2_data//august.parquet
+    parser = argparse.ArgumentParser()
+    parser.add_argument("start_date", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("end_date", help="End date (YYYY-MM-DD)")
+    parser.add_argument("--path", default=DEFAULT_WAREHOUSE_PATH, help="Warehouse file")
+    parser.add_argument("--layout", default="std_diff", choices=LAYOUTS, help="Team stat layout to build")
+    parser.add_argument("--threads", type=int, help="DuckDB threads, defaults to all cores")
+    parser.add_argument("--memory_limit", help="DuckDB memory limit before spilling to disk, e.g. 4GB")
+    parser.add_argument("--export", help="Parquet folder to export the built table to")
+    args = parser.parse_args()
+
+    with Warehouse(args.path, args.threads, args.memory_limit) as wh:
+        table = wh.build(args.layout, args.start_date, args.end_date)
+        if args.export:
+            wh.export(table, args.export)
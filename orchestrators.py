@@ -1,9 +1,13 @@
 import argparse
 import json
 import logging
+import multiprocessing
 import os
 import sys
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 from sklearn.ensemble import RandomForestClassifier
@@ -14,6 +18,9 @@ from sklearn.metrics import accuracy_score, classification_report, confusion_mat
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import pyparsing
 import requests
 
@@ -22,104 +29,476 @@ import data.create_model as cm
 import create_team_stats as cts
 import run_predictions as rp
 from data import fetch_data as fd
+from data.cache import PlayerHeroStatsCache, MatchDayCache, DEFAULT_CACHE_PATH, DEFAULT_MATCH_DAY_CACHE
+from data import schema
+from data.schema import apply_schema
+from data.training_store import TrainingStore, DEFAULT_STORE_ROOT
+from data.stages import StageRunner, Artifact, DEFAULT_STAGE_ROOT
+from data import columnar as col
+from data.warehouse import Warehouse, DEFAULT_WAREHOUSE_PATH
+from data.instrument import RunTrace
+from data.model_registry import ModelRegistry
 from data import process_data as dp
+from data import features as ft
+from data import lookup as lk
 
 logging.basicConfig(level=logging.INFO)
 logging = logging.getLogger(__name__)
 
 
 
-def create_training_data(start_date,end_date,name="test",team_stat_model="diff"):
-    """fetch player, match, and hero data to be used for training a model
-    Example launch command: python orchestrators.py 2025-08-01 2025-08-05 --name my_output_folder
-    
-    team_stat_model = 'std' or 'diff' 
-        std = creates team team stats as raw values, 2 columns per stat (team0, team1)
-        diff = creates a differential of the team stats, 1 column per stats.
-    """
-
-    # Ensure the output folder exists
-    folder_name = f"v2_data//pred_data//test_pred_v2_{start_date}_{end_date}//{name}"
-
-    os.makedirs(folder_name, exist_ok=True)
-
-    logging.info(f"Starting creation of training data. Folder_name set to {folder_name}")
+# team_stat_model -> layout from cts.create_team_stat_layouts written as training_data.parquet
+TEAM_STAT_LAYOUTS = {
+    'std': 'std',
+    'diff': 'std_diff',
+    'quantiles': 'quantiles',
+    'quantiles_diff': 'quantiles_diff',
+}
 
+def stage_fetch_matches(start_date, end_date, fetch_workers=4, day_cache_path=None):
     logging.info(f"Fetching batch matches from {start_date} to {end_date}")
-    batch_matches = fd.bulk_fetch_matches(start_date, end_date, limit=5000)
-
-    logging.info(f"Fetched {len(batch_matches)} matches, splitting into players and matches")
-    raw_matches, raw_players = dp.separate_match_players(batch_matches)
-    player_matches = raw_players[['account_id', 'match_id']]
+    # full days are split into hours/minutes by the fetcher, so the per-request limit can stay small.
+    # responses are streamed straight into raw_matches / raw_players columns
+    day_cache = MatchDayCache(day_cache_path) if day_cache_path else None
+    # a failed day fails the stage, so nothing incomplete is stored and the next run fetches the window again
+    raw_matches, raw_players = fd.bulk_fetch_match_frames(
+        start_date, end_date, limit=1000, max_workers=fetch_workers, day_cache=day_cache, raise_on_failure=True)
+    if day_cache is not None:
+        day_cache.log_stats()
+    logging.info(f"Fetched {len(raw_matches)} matches and {len(raw_players)} player rows")
+    return {
+        'raw_matches': apply_schema(raw_matches, "raw_matches"),
+        'raw_players': apply_schema(raw_players, "raw_players"),
+    }
+
+def stage_normalize(raw_matches, raw_players):
+    logging.info(f"Preparing match data to be merged with stats")
+    return {
+        'player_matches': raw_players[['account_id', 'match_id']],
+        'match_players': apply_schema(dp.prepare_match_stats(raw_players, raw_matches), "match_players"),
+    }
 
+def stage_fetch_player_hero_stats(raw_players, fetch_till_date, fetch_workers=4, cache_path=DEFAULT_CACHE_PATH):
     logging.info(f"Fetching player_hero stats, this may take a few seconds...")
+    ph_cache = PlayerHeroStatsCache(cache_path) if cache_path else None
     player_hero_stats= fd.fetch_player_hero_stats_batch(
     account_ids=raw_players["account_id"].unique().tolist(),
-    fetch_till_date=start_date,
+    fetch_till_date=fetch_till_date,
     fetch_from_date=None,
-    batch_size=700
+    batch_size=700,
+    cache=ph_cache,
+    max_workers=fetch_workers,
+    raise_on_failure=True
     )
-
-    logging.info(f"fetched player stats for {len(player_hero_stats)}, breaking down and formatting data")
-    hero_stats = pd.json_normalize(fd.fetch_hero_stats(fetch_from_date='2020-01-01', fetch_till_date=end_date))
+    if ph_cache is not None:
+        ph_cache.log_stats()
+    # per-endpoint request / retry / latency counters from the shared api client
+    fd.get_client().log_stats()
+    logging.info(f"fetched player stats for {len(player_hero_stats)}")
+    return {'player_hero_stats': apply_schema(player_hero_stats, "player_hero_stats")}
+
+def stage_fetch_pipelined(start_date, end_date, fetch_till_date, fetch_workers=4, cache_path=DEFAULT_CACHE_PATH):
+    logging.info(f"Fetching matches from {start_date} to {end_date} and their player_hero stats as one pipeline")
+    # each day's new accounts go to the player hero stats workers as soon as the day is parsed
+    ph_cache = PlayerHeroStatsCache(cache_path) if cache_path else None
+    raw_matches, raw_players, player_hero_stats = fd.pipelined_fetch_match_player_frames(
+        start_date, end_date, fetch_till_date=fetch_till_date, limit=1000, batch_size=700,
+        cache=ph_cache, max_workers=fetch_workers, raise_on_failure=True)
+    if ph_cache is not None:
+        ph_cache.log_stats()
+    fd.get_client().log_stats()
+    logging.info(f"Fetched {len(raw_matches)} matches, {len(raw_players)} player rows and player stats for {len(player_hero_stats)}")
+    return {
+        'raw_matches': apply_schema(raw_matches, "raw_matches"),
+        'raw_players': apply_schema(raw_players, "raw_players"),
+        'player_hero_stats': apply_schema(player_hero_stats, "player_hero_stats"),
+    }
+
+def stage_fetch_hero_stats(fetch_till_date):
+    response = fd.fetch_hero_stats(fetch_from_date='2020-01-01', fetch_till_date=fetch_till_date)
+    if "error" in response:
+        # an error dict would be stored as a one row h_error table
+        raise RuntimeError(f"hero stats fetch failed after retries: {response['error']}")
+    hero_stats = pd.json_normalize(response)
     hero_stats = hero_stats.add_prefix('h_')
     hero_stats = hero_stats.rename(columns={'h_hero_id': 'hero_id'})
+    return {'hero_stats': apply_schema(hero_stats, "hero_stats")}
 
+def stage_merge(player_hero_stats, hero_stats):
     logging.info(f"processing player stats")
-    player_stats = fd.process_player_stats(player_hero_stats)
-
-    logging.info(f"Preparing match data to be merged with stats")
-    match_players = dp.prepare_match_stats(raw_players, raw_matches)
-
-    logging.info(f"saving raw and calculated files to .csv as checkpoint.")
-    # Raw files
-    raw_players.to_csv(f"{folder_name}/raw_players.csv", index=False)
-    raw_matches.to_csv(f"{folder_name}/raw_matches.csv", index=False)
-    player_matches.to_csv(f"{folder_name}/player_matches.csv", index=False)
-
-    # Aggregated and calculated files
-    match_players.to_csv(f"{folder_name}/match_players.csv", index=False)
-    player_stats.to_csv(f"{folder_name}/player_stats.csv", index=False)
-    player_hero_stats.to_csv(f"{folder_name}/player_hero_stats.csv", index=False)
-    hero_stats.to_csv(f"{folder_name}/hero_stats.csv", index=False)
+    player_stats = apply_schema(fd.process_player_stats(player_hero_stats), "player_stats")
 
     logging.info(f"Checking unique naming for hero, player_hero, and player stats")
-
     player_hero_stats, player_stats, hero_stats = dp.check_unique_naming(player_hero_stats, player_stats, hero_stats)
 
     logging.info(f"Merging stats into player_player_hero_hero_stats (p_ph_h_stats)")
+    p_ph_h_stats = apply_schema(dp.merge_player_hero_stats(player_hero_stats, player_stats, hero_stats), "p_ph_h_stats")
+    return {'player_stats': player_stats, 'p_ph_h_stats': p_ph_h_stats}
 
-    p_ph_h_stats = dp.merge_player_hero_stats(player_hero_stats, player_stats, hero_stats)
-
-    logging.info(f"Merging completed, saving as p_ph_h_stats.csv to {folder_name}")
-    p_ph_h_stats.to_csv(f"{folder_name}/p_ph_h_stats.csv", index=False)
-
+def stage_derive(p_ph_h_stats, features):
     logging.info(f"calculating all stats")
-    all_stats = dp.calculate_ph_stats(p_ph_h_stats)
-
-    logging.info(f"Calculations completed, saving all stats to {folder_name}")
-    all_stats.to_csv(f"{folder_name}/all_stats.csv", index=False)
+    # features are added to p_ph_h_stats in place, only the ones the team stats use
+    return {'all_stats': apply_schema(dp.calculate_ph_stats(p_ph_h_stats, features=features), "all_stats")}
 
+def stage_team_stats(match_players, all_stats, basic):
     logging.info(f"Merging match data and player stats data.")
-    p_m_stats = cts.merge_match_player_stats(match_players, all_stats)
-
-    logging.info(f"Merging completed, saving as p_m_stats.csv to {folder_name}")
-    p_m_stats.to_csv(f"{folder_name}/p_m_stats.csv", index=False)
-
-    logging.info(f"Creating team stats using {team_stat_model}")
-    if team_stat_model == 'std':
-        team_stats = cts.create_std_team_stats(p_m_stats)
-        training_data = cts.create_training_data(team_stats)
-    elif team_stat_model == 'diff':
-        team_stats = cts.create_std_team_stats(p_m_stats)
-        training_data = cts.create_differential_training_data(team_stats)
-    elif team_stat_model == 'basic':
+    p_m_stats = apply_schema(cts.merge_match_player_stats(match_players, all_stats), "p_m_stats")
+
+    if basic:
         team_stats = cts.create_basic_team_stats(p_m_stats)
-        training_data = cts.create_training_data(team_stats)
+        tables = {'team_stats': team_stats, 'training_data': cts.create_training_data(team_stats)}
+    else:
+        # every layout comes out of one aggregation pass, the model picks which is training_data.parquet
+        layouts = cts.create_team_stat_layouts(p_m_stats)
+        tables = {'team_stats': layouts.pop('team')}
+        tables.update((f"training_data_{layout}", frame) for layout, frame in layouts.items())
+
+    for table, frame in tables.items():
+        apply_schema(frame, table)
+    return {'p_m_stats': p_m_stats, **tables}
+
+# code each stage calls besides its own function, part of its key so editing any of it re-runs the stage
+FETCH_MATCHES_CODE = (fd.bulk_fetch_match_frames, fd.fetch_match_window_columns, fd.iter_match_window, dp.MatchFrameBuilder, schema)
+FETCH_PLAYER_HERO_CODE = (fd.fetch_player_hero_stats_batch, fd.fetch_player_hero_stats_by_account, fd._player_hero_stats_loop,
+                          fd.fetch_player_hero_stats, fd.format_player_hero_response, fd._player_hero_frame, schema)
+STAGE_DEPS = {
+    'fetch_matches': FETCH_MATCHES_CODE,
+    'fetch_pipelined': (fd.pipelined_fetch_match_player_frames, *FETCH_MATCHES_CODE, *FETCH_PLAYER_HERO_CODE),
+    'fetch_player_hero_stats': FETCH_PLAYER_HERO_CODE,
+    'fetch_hero_stats': (fd.fetch_hero_stats, schema),
+    'normalize': (dp, ft, lk, schema),
+    'merge': (fd.process_player_stats, dp, ft, lk, schema),
+    'derive': (dp, ft, lk, schema),
+    'team_stats': (cts, lk, schema),
+}
+
+def save_checkpoints(folder_name, artifact, dates=None, trace=None):
+    """writes each table of a stage that ran this time to <table>.parquet. A skipped stage's stored tables are
+    only written when the folder doesn't have them yet (a new --name, or a cleared folder).
+    dates = match_id -> match date (col.match_dates), tables with a match_id are partitioned by it
+    trace = optional RunTrace, each table write is recorded as a 'checkpoint <table>' stage
+    """
+    # a stored artifact's tables are only read from disk when the folder is missing one of them
+    tables = [table for table in artifact.names
+              if artifact.fresh or not col.table_exists(col.table_path(folder_name, table))]
+    for table in tables:
+        frame = artifact[table]
+        with trace.stage(f"checkpoint {table}", "io", rows_in=len(frame)) if trace else nullcontext() as metrics:
+            written = col.write_table(col.table_path(folder_name, table), frame, dates)
+            if metrics is not None:
+                metrics.rows_out, metrics.bytes_written = len(frame), written
+        logging.info(f"checkpoint {table}: {len(frame)} rows, {written / 1e6:.2f} MB")
+
+def load_training_data(folder_name, file_name="training_data", columns=None):
+    """reads <file_name>.parquet from a training data folder, falling back to the .csv older folders have"""
+    path = col.table_path(folder_name, file_name)
+    if col.table_exists(path):
+        return col.read_table(path, columns=columns)
+    return pd.read_csv(f"{folder_name}//{file_name}.csv", usecols=columns)
+
+def warehouse_training_data(warehouse_path, tables, layout, start_date, end_date):
+    """ingests the fetched tables into the DuckDB warehouse as one window (player stats as of start_date,
+    hero stats as of end_date, like the pandas stages) and builds the layout there with SQL from its snapshots"""
+    with Warehouse(warehouse_path) as wh:
+        wh.ingest_window(tables, start_date, end_date)
+        return wh.fetch(wh.build(layout, start_date, end_date, window=(start_date, end_date)))
+
+def training_data_folder(start_date, end_date, name):
+    return f"v2_data//pred_data//test_pred_v2_{start_date}_{end_date}//{name}"
+
+def create_training_data(start_date,end_date,name="test",team_stat_model="diff",fetch_workers=4,cache_path=DEFAULT_CACHE_PATH,
+                         incremental=False,store_folder=None,stage_root=DEFAULT_STAGE_ROOT,force_stages=(),
+                         backend="pandas",warehouse_path=DEFAULT_WAREHOUSE_PATH,pipelined=False,
+                         trace_path=None,profile_stages=(),profiler="cprofile",day_cache_path=None):
+    """fetch player, match, and hero data to be used for training a model
+    Example launch command: python orchestrators.py 2025-08-01 2025-08-05 --name my_output_folder
+    
+    team_stat_model = 'std', 'diff', 'quantiles', 'quantiles_diff' or 'basic'
+        std = creates team team stats as raw values, 2 columns per stat (team0, team1)
+        diff = creates a differential of the team stats, 1 column per stats.
+        quantiles / quantiles_diff = same with min, max, q25, median, q75 per stat
+        every layout but basic is also saved as training_data_<layout>.parquet
+    every table is checkpointed to folder_name as zstd Parquet, partitioned by match date when it has match ids
+    fetch_workers = number of days of matches / player hero stats batches fetched concurrently
+    cache_path = sqlite file caching player hero stats between runs, None disables the cache
+    incremental = only build matches missing from the training store and append them to it
+    store_folder = training store folder, defaults to v2_data//training_store//<name>
+    stage_root = where stage outputs are kept, keyed by a hash of the stage code (STAGE_DEPS included), params, inputs and api base.
+        A rerun (or one with a different team_stat_model) resumes from the last stage whose key is stored.
+    force_stages = stage names to re-run anyway, e.g. ('fetch_matches',) to pick up late matches, or ('all',)
+    backend = 'pandas' runs every stage below in memory, 'duckdb' runs the fetch stages, ingests their output
+        into the warehouse at warehouse_path and builds training data there with SQL (merge -> derive -> team_stats).
+        The warehouse keeps every ingested window, see data.warehouse to build longer ranges from it.
+    pipelined = fetch matches and player hero stats as one stage (fetch_pipelined), player stats for each day's
+        accounts download while later days are fetched. Incremental builds always fetch the two in sequence,
+        player stats are only fetched for the matches the store is missing.
+    trace_path = Chrome trace / stage metrics json of the run (wall, cpu, peak rss, rows, bytes, http requests per stage),
+        defaults to <folder>//run_trace.json, written even if the run fails
+    profile_stages / profiler = stages to profile with 'cprofile' (.prof) or 'sample' (.folded stacks), saved next to the trace
+    day_cache_path = folder of fetched match days (data.cache.MatchDayCache) fetch_matches shares with other runs,
+        None fetches every day
+    returns the run's RunTrace
+
+    stages: fetch_matches -> normalize ------------------------------> team_stats -> training_data
+                          -> fetch_player_hero_stats -> merge -> derive -^
+            fetch_hero_stats ----------------------------^
+    """
+
+    if backend == 'duckdb' and team_stat_model == 'basic':
+        raise ValueError("The duckdb backend builds std / diff / quantiles / quantiles_diff team stats, not basic")
+
+    # Ensure the output folder exists
+    folder_name = training_data_folder(start_date, end_date, name)
 
-    logging.info(f"Team stats created, saving as team_stats.csv to {folder_name}")
-    team_stats.to_csv(f"{folder_name}/team_stats.csv", index=False)
-    training_data.to_csv(f"{folder_name}/training_data.csv", index=False)
+    os.makedirs(folder_name, exist_ok=True)
+
+    trace_path = trace_path or f"{folder_name}//run_trace.json"
+    trace = RunTrace(f"train_data_{start_date}_{end_date}_{name}", profile_stages, profiler,
+                     profile_dir=os.path.dirname(trace_path) or ".")
+    try:
+        logging.info(f"Starting creation of training data. Folder_name set to {folder_name}")
+        runner = StageRunner(stage_root, force=force_stages, trace=trace, deps=STAGE_DEPS)
+        fetch_options = {'fetch_workers': fetch_workers}
+
+        pipelined = pipelined and not incremental
+        if pipelined:
+            matches = runner.run("fetch_pipelined", stage_fetch_pipelined,
+                params={'start_date': start_date, 'end_date': end_date, 'fetch_till_date': start_date},
+                options={**fetch_options, 'cache_path': cache_path})
+        else:
+            matches = runner.run("fetch_matches", stage_fetch_matches,
+                params={'start_date': start_date, 'end_date': end_date},
+                options={**fetch_options, 'day_cache_path': day_cache_path})
+
+        store = None
+        if incremental:
+            store = TrainingStore(store_folder or f"{DEFAULT_STORE_ROOT}//{name}")
+            raw_matches, raw_players = matches['raw_matches'], matches['raw_players']
+            # everything below (player stats fetch included) only runs for matches the store hasn't seen
+            new_matches = store.new_match_mask(raw_matches['match_id'])
+            logging.info(f"Incremental build: {new_matches.sum()} new matches of {len(raw_matches)}, {len(store)} already in {store.folder}")
+            if not new_matches.any():
+                logging.info("No new matches, training store is up to date")
+                return trace
+            raw_matches = raw_matches[new_matches].reset_index(drop=True)
+            raw_players = raw_players[raw_players['match_id'].isin(raw_matches['match_id'])].reset_index(drop=True)
+            matches = Artifact.from_frames("new_matches", {'raw_matches': raw_matches, 'raw_players': raw_players})
+
+        dates = col.match_dates(matches['raw_matches'])
+
+        def run(name, fn, **kwargs):
+            # checkpoint right away, later stages (derive) add columns to their inputs in place
+            artifact = runner.run(name, fn, **kwargs)
+            save_checkpoints(folder_name, artifact, dates, trace)
+            return artifact
+
+        save_checkpoints(folder_name, Artifact(matches.key, tables=matches.tables, fresh=True) if incremental else matches,
+                         dates, trace)
+        if pipelined:
+            player_hero = matches
+        else:
+            player_hero = run("fetch_player_hero_stats", stage_fetch_player_hero_stats,
+                params={'fetch_till_date': start_date}, inputs={'matches': matches},
+                options={**fetch_options, 'cache_path': cache_path})
+        heroes = run("fetch_hero_stats", stage_fetch_hero_stats, params={'fetch_till_date': end_date})
+
+        if backend == 'duckdb':
+            tables = {**matches.tables, **player_hero.tables, **heroes.tables}
+            with trace.stage("warehouse_build", rows_in=sum(len(df) for df in tables.values())) as metrics:
+                training_data = warehouse_training_data(
+                    warehouse_path, tables, TEAM_STAT_LAYOUTS[team_stat_model], start_date, end_date)
+                metrics.rows_out = len(training_data)
+            # the warehouse holds every window ingested so far, keep this run's matches
+            training_data = training_data[training_data['match_id'].isin(matches['raw_matches']['match_id'])].reset_index(drop=True)
+            team_tables = {}
+        else:
+            normalized = run("normalize", stage_normalize, inputs={'matches': matches})
+            merged = run("merge", stage_merge, inputs={'player_hero': player_hero, 'heroes': heroes})
+            derived = run("derive", stage_derive, params={'features': cts.TEAM_STATS}, inputs={'merged': merged})
+            team = run("team_stats", stage_team_stats,
+                params={'basic': team_stat_model == 'basic'}, inputs={'normalized': normalized, 'derived': derived})
+            team_tables = team.tables
+
+            if team_stat_model == 'basic':
+                training_data = team['training_data']
+            else:
+                training_data = team[f"training_data_{TEAM_STAT_LAYOUTS[team_stat_model]}"]
+        logging.info(f"Saving {team_stat_model} team stats as training_data.parquet to {folder_name}")
+        with trace.stage("write training_data", "io", rows_in=len(training_data)) as metrics:
+            metrics.bytes_written = col.write_table(col.table_path(folder_name, "training_data"), training_data, dates)
+            metrics.rows_out = len(training_data)
+
+        if store is not None:
+            tables = {table: frame for table, frame in team_tables.items() if table != 'p_m_stats'}
+            tables['training_data'] = training_data
+            with trace.stage("store_append", "io", rows_in=sum(len(df) for df in tables.values())):
+                store.append(tables, raw_matches)
+
+    finally:
+        trace.log_summary()
+        trace.write(trace_path)
+    return trace
+
+
+def backfill_windows(start_date, end_date, window_days, stride_days=None):
+    """splits start_date..end_date into window_days long (start, end) windows, a new one every stride_days
+    (defaults to window_days, i.e. back to back). A span shorter than window_days is one window."""
+    days = fd.day_windows(start_date, end_date)
+    stride_days = stride_days or window_days
+    if len(days) <= window_days:
+        return [(days[0], days[-1])]
+    return [(days[i], days[i + window_days - 1]) for i in range(0, len(days) - window_days + 1, stride_days)]
+
+def _backfill_worker_init(api_base, rate_per_s, burst, slots):
+    # runs once in every worker process: its share of the rate limit, and the slots shared by all workers
+    fd.set_api_base(api_base)
+    fd.set_client(fd.ApiClient(rate_per_s=rate_per_s, burst=burst, slots=slots))
+
+def _backfill_fetch_day(day, day_cache_path, fetch_workers):
+    day_cache = MatchDayCache(day_cache_path)
+    if not day_cache.settled(fd.unix_utc_eod(day)):
+        # not cacheable yet, every window covering it fetches it itself
+        return {'day': day, 'cached': False}
+    raw_matches, _ = fd.bulk_fetch_match_frames(day, day, limit=1000, max_workers=fetch_workers, day_cache=day_cache,
+                                                raise_on_failure=True)
+    return {'day': day, 'cached': True, 'matches': len(raw_matches)}
+
+def _backfill_hero_stats(end_date, stage_root):
+    StageRunner(stage_root, deps=STAGE_DEPS).run("fetch_hero_stats", stage_fetch_hero_stats, params={'fetch_till_date': end_date})
+    return {'end_date': end_date}
+
+def _backfill_warm_player_stats(fetch_till_date, days, day_cache_path, cache_path, fetch_workers):
+    day_cache = MatchDayCache(day_cache_path)
+    account_ids = set()
+    for day in days:
+        builder = day_cache.get(day, fd.get_client().base())
+        if builder is not None and len(builder):
+            account_ids.update(builder.to_frames()[1]['account_id'].unique().tolist())
+    ph_cache = PlayerHeroStatsCache(cache_path)
+    fd.fetch_player_hero_stats_batch(
+        account_ids=sorted(account_ids), fetch_till_date=fetch_till_date, fetch_from_date=None,
+        batch_size=700, cache=ph_cache, max_workers=fetch_workers)
+    ph_cache.log_stats()
+    return {'fetch_till_date': fetch_till_date, 'accounts': len(account_ids), 'cache_hits': ph_cache.stats['hits']}
+
+def _backfill_window(start_date, end_date, submitted_at, options):
+    started_at = time.time()
+    result = {'start_date': start_date, 'end_date': end_date, 'pid': os.getpid(), 'status': 'ok', 'error': None,
+              'queue_s': round(started_at - submitted_at, 3)}
+    trace_path = f"{training_data_folder(start_date, end_date, options['name'])}//run_trace.json"
+    try:
+        stages = [m.to_dict() for m in create_training_data(start_date, end_date, trace_path=trace_path, **options).stages]
+    except Exception as e:
+        logging.exception(f"window {start_date} - {end_date} failed")
+        result.update(status='failed', error=repr(e))
+        # the stages that ran before the failure, create_training_data writes the trace either way
+        try:
+            with open(trace_path) as f:
+                stages = json.load(f)['stages']
+        except (OSError, ValueError, KeyError):
+            stages = None
+    result['wall_s'] = round(time.time() - started_at, 3)
+
+    if stages is None:
+        result.update(http_requests=None, rows=None, stages_s=None, skipped_stages=None)
+        return result
+    result['http_requests'] = sum(m['http_requests'] for m in stages)
+    # None when the window failed before writing training_data
+    result['rows'] = next((m['rows_out'] for m in stages if m['stage'] == 'write training_data'),
+                          0 if result['status'] == 'ok' else None)
+    result['stages_s'] = {m['stage']: m['wall_s'] for m in stages if m['category'] == 'stage' and not m['skipped']}
+    result['skipped_stages'] = [m['stage'] for m in stages if m['category'] == 'stage' and m['skipped']]
+    return result
+
+def _backfill_phase(summary, phase, jobs):
+    # waits for every job of a phase, a failed job is logged and left to the windows to redo
+    t0 = time.perf_counter()
+    results, failed = [], 0
+    for job in as_completed(jobs):
+        try:
+            results.append(job.result())
+        except Exception as e:
+            failed += 1
+            logging.error(f"backfill {phase}: {jobs[job]} failed: {e!r}")
+    summary['phases'][phase] = {'jobs': len(jobs), 'failed': failed, 'wall_s': round(time.perf_counter() - t0, 3)}
+    logging.info(f"backfill {phase}: {len(jobs) - failed} of {len(jobs)} jobs done in {summary['phases'][phase]['wall_s']:.1f}s")
+    return results
+
+def backfill_training_data(windows, name="backfill", team_stat_model="diff", processes=4, api_concurrency=8,
+                           rate_per_s=10, burst=20, fetch_workers=4, cache_path=DEFAULT_CACHE_PATH,
+                           day_cache_path=DEFAULT_MATCH_DAY_CACHE, stage_root=DEFAULT_STAGE_ROOT, summary_path=None):
+    """builds training data for many (start_date, end_date) windows across a process pool,
+    fetching what the windows share once
+    Example launch command: python orchestrators.py --mode backfill 2025-07-01 2025-08-25 --window_days 14 --stride_days 7 --name bf
+
+    1. prefetch: every settled day of any window goes into the match day cache once, and fetch_hero_stats
+       runs once per distinct end date into the shared stage_root, both spread over the pool
+    2. warm: one player hero stats snapshot per distinct window start (the player stats as-of date), over the cached
+       accounts of every window starting then, fetched once into the sqlite cache at cache_path (skipped if None).
+       Windows with different starts need different snapshots, an account playing in both is fetched once per start.
+    3. windows: create_training_data per window, matches, hero stats and player stats come from the caches,
+       only days that weren't settled yet (and their accounts) are fetched by the window itself
+    processes = worker processes, api_concurrency = requests in flight across all of them,
+    rate_per_s / burst = total request rate, each worker gets 1/processes of it
+    A failed window doesn't stop the others. The summary (per window status, wall / queue time, http requests,
+    rows, stage times, and the phase times) goes to summary_path, default v2_data//pred_data//backfill_<name>_summary.json.
+    A failed window reports what its stages did before the failure, rows is None unless training_data was written.
+    """
+    windows = list(dict.fromkeys((start, end) for start, end in windows))
+    summary_path = summary_path or f"v2_data//pred_data//backfill_{name}_summary.json"
+    summary = {'name': name, 'processes': processes, 'api_concurrency': api_concurrency, 'rate_per_s': rate_per_s,
+               'started_at': time.time(), 'phases': {}, 'windows': []}
+    logging.info(f"Backfilling {len(windows)} windows with {processes} processes, {api_concurrency} requests in flight at most")
+
+    t0 = time.perf_counter()
+    # spawned workers start clean instead of forking the parent's threads, sockets and sqlite handles
+    context = multiprocessing.get_context("spawn")
+    slots = context.BoundedSemaphore(api_concurrency)
+    initargs = (fd.API_BASE, rate_per_s / processes, max(1.0, burst / processes), slots)
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_backfill_worker_init, initargs=initargs) as pool:
+        days = sorted({day for start, end in windows for day in fd.day_windows(start, end)})
+        jobs = {pool.submit(_backfill_fetch_day, day, day_cache_path, fetch_workers): f"day {day}" for day in days}
+        jobs.update({pool.submit(_backfill_hero_stats, end, stage_root): f"hero stats {end}"
+                     for end in sorted({end for _, end in windows})})
+        prefetched = _backfill_phase(summary, 'prefetch', jobs)
+        summary['phases']['prefetch']['days_cached'] = sum(1 for r in prefetched if r.get('cached'))
+
+        if cache_path:
+            days_by_start = {}
+            for start, end in windows:
+                days_by_start.setdefault(start, set()).update(fd.day_windows(start, end))
+            jobs = {pool.submit(_backfill_warm_player_stats, start, sorted(days_by_start[start]), day_cache_path,
+                                cache_path, fetch_workers): f"player stats as of {start}"
+                    for start in sorted(days_by_start)}
+            warmed = _backfill_phase(summary, 'warm', jobs)
+            summary['phases']['warm']['accounts'] = sum(r['accounts'] for r in warmed)
+
+        options = {'name': name, 'team_stat_model': team_stat_model, 'fetch_workers': fetch_workers,
+                   'cache_path': cache_path, 'stage_root': stage_root, 'day_cache_path': day_cache_path}
+        submitted_at = time.time()
+        jobs = {pool.submit(_backfill_window, start, end, submitted_at, options): f"window {start} - {end}"
+                for start, end in windows}
+        for job in as_completed(jobs):
+            result = job.result()
+            summary['windows'].append(result)
+            logging.info(f"backfill {jobs[job]}: {result['status']} in {result['wall_s']:.1f}s "
+                         f"({len(summary['windows'])} of {len(windows)} done)")
+        summary['phases']['windows'] = {'jobs': len(jobs), 'wall_s': round(time.time() - submitted_at, 3),
+                                        'failed': sum(1 for r in summary['windows'] if r['status'] != 'ok')}
+
+    summary['wall_s'] = round(time.perf_counter() - t0, 3)
+    summary['windows'].sort(key=lambda r: (r['start_date'], r['end_date']))
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=4)
+
+    lines = [f"{'window':<24} {'status':<7} {'wall_s':>8} {'queue_s':>8} {'http':>6} {'rows':>8} {'skipped':>8}"]
+    for r in summary['windows']:
+        skipped = len(r['skipped_stages']) if r['skipped_stages'] is not None else None
+        lines.append(f"{r['start_date'] + ' - ' + r['end_date']:<24} {r['status']:<7} {r['wall_s']:>8.1f} "
+                     f"{r['queue_s']:>8.1f} {str(r['http_requests']):>6} {str(r['rows']):>8} {str(skipped):>8}")
+    logging.info(f"backfill {name} done in {summary['wall_s']:.1f}s, summary written to {summary_path}\n" + "\n".join(lines))
+    return summary
 
 def create_ml_model(
         training_data_file_name: str,
@@ -129,12 +508,15 @@ def create_ml_model(
         model_identifier: str,
         model_folder_name: str,
         config: str,
-        test_data: str = None):
+        test_data: str = None,
+        trace_path: str = None,
+        profile_stages: tuple = (),
+        profiler: str = "cprofile"):
     """
     Create a random forest model using the provided training data and parameters, optional define specific test data.
 
     Args:
-        training_data_file_name - the name of the training_data file, expects .csv
+        training_data_file_name - the name of the training_data file, without extension (.parquet, or .csv for older folders)
         training_data_folder_name - the unique name of the folder for training data, i.e. ...//my_output_folder
         start_date - the start date for the training data - used for folder name
         end_date - the end date for the training data - used for folder name
@@ -142,6 +524,8 @@ def create_ml_model(
         model_folder_name - the name of the folder to save the model, e.g. 8.26.25//rf_v4
         config - the path to the configuration file
         test_data - optional test data to evaluate the model
+        trace_path - stage metrics / Chrome trace json of the run, defaults to <model_folder_name>//<model_id>_run_trace.json
+        profile_stages, profiler - stages to profile with 'cprofile' or 'sample', see create_training_data
 
     """
 
@@ -152,45 +536,244 @@ def create_ml_model(
 
     file_path = f"v2_data//pred_data//test_pred_v2_{start_date}_{end_date}//{training_data_folder_name}"
 
-    #load and check training data
-    training_data = pd.read_csv(f"{file_path}//{training_data_file_name}.csv")
-    bol = cm.check_data_issues(training_data)
+    trace = RunTrace(f"ml_model_{model_identifier}", profile_stages, profiler, profile_dir=model_folder_name)
+    try:
+        #load and check training data
+        with trace.stage("load_training_data", "io") as metrics:
+            training_data = load_training_data(file_path, training_data_file_name)
+            metrics.rows_out = len(training_data)
+        with trace.stage("check_data_issues", rows_in=len(training_data)):
+            bol = cm.check_data_issues(training_data)
 
-    if not bol:
-        logging.error("Data issues found in training data.")
-        sys.exit(1)
-    
-    # prepare training data
-    X_train, X_test, y_train, y_test = cm.prep_training_data(training_data, test_data)
+        if not bol:
+            logging.error("Data issues found in training data.")
+            sys.exit(1)
+
+        # prepare training data
+        with trace.stage("prep_training_data", rows_in=len(training_data)) as metrics:
+            X_train, X_test, y_train, y_test = cm.prep_training_data(training_data, test_data)
+            metrics.rows_out = len(X_train) + len(X_test)
 
-    model, model_id, y_pred = cm.train_random_forest(X_train, X_test, y_train, y_test, params, model_identifier)
+        with trace.stage("train_random_forest", rows_in=len(X_train)) as metrics:
+            model, model_id, y_pred = cm.train_random_forest(X_train, X_test, y_train, y_test, params, model_identifier)
+            metrics.rows_out = len(y_pred)
 
-    results = cm.evaluate_model(model, y_test, y_pred, X_test)
+        with trace.stage("evaluate_model", rows_in=len(X_test)):
+            results = cm.evaluate_model(model, y_test, y_pred, X_test)
 
-    cm.save_model(model, params, model_folder_name, model_id, X_test.columns)
+        with trace.stage("save_model", "io"):
+            cm.save_model(model, params, model_folder_name, model_id, X_test.columns)
 
-    cm.save_report(training_data, model_id, model_folder_name, results)
+            cm.save_report(training_data, model_id, model_folder_name, results,
+                           training_source=f"{file_path}//{training_data_file_name}")
+    finally:
+        trace.log_summary()
+        trace.write(trace_path or f"{model_folder_name}//{trace.name}_run_trace.json")
 
     return model, model_id, y_pred, results
 
+# rows per chunk of --mode predict, memory stays at a few chunks whatever the input size
+PREDICT_CHUNK_ROWS = 50_000
+
+def input_columns(path):
+    """column names of a CSV or Parquet (file or partitioned folder) training layout file, without reading rows"""
+    if path.endswith(".csv"):
+        return list(pd.read_csv(path, nrows=0).columns)
+    return ds.dataset(path, format="parquet", partitioning="hive").schema.names
+
+def iter_input_chunks(path, columns, chunk_rows=PREDICT_CHUNK_ROWS):
+    """yields DataFrames of at most chunk_rows rows holding only columns, streamed from a CSV or Parquet input"""
+    if path.endswith(".csv"):
+        # a header only file still yields one empty chunk
+        yield from (chunk for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows) if len(chunk))
+        return
+    for batch in ds.dataset(path, format="parquet", partitioning="hive").to_batches(columns=columns, batch_size=chunk_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def empty_input_chunk(path, columns):
+    """0 row DataFrame of columns with the input's dtypes (a CSV header has none, its columns come out object)"""
+    if path.endswith(".csv"):
+        return pd.read_csv(path, usecols=columns, nrows=0)
+    return ds.dataset(path, format="parquet", partitioning="hive").schema.empty_table().select(columns).to_pandas()
+
+# per process model of --mode predict, loaded once by _predict_worker_init
+_predict_model = None
+
+def _predict_worker_init(model_folder, engine):
+    global _predict_model
+    if engine == "compiled":
+        # every worker maps the same cached arrays, so the forest sits in memory once
+        loaded = ModelRegistry().load(model_folder)
+        _predict_model = (loaded.forest, loaded.feature_names, loaded.win_column)
+        return
+    model, meta = rp.load_model(model_folder)
+    # chunks already run in parallel across processes, each scores its chunk on one thread
+    model.n_jobs = 1
+    _predict_model = (model, meta['feature_names'], list(model.classes_).index('Y'))
+
+def _predict_chunk(chunk):
+    model, feature_names, win_column = _predict_model
+    return model.predict_proba(chunk[feature_names])[:, win_column]
+
+def predict_matches(input_path, model_folder, output_path, chunk_rows=PREDICT_CHUNK_ROWS, processes=1,
+                    engine="sklearn", trace_path=None):
+    """
+    Scores a training layout file (CSV, or Parquet file / folder as written by train_data) with a saved model,
+    streaming it in chunks of chunk_rows so memory stays flat however many matches it holds.
+
+    Args:
+        input_path - .csv or .parquet input holding the model's meta.json feature_names (other columns are ignored)
+        model_folder - folder with model.joblib and meta.json, e.g. 8.26.25_rf_std
+        output_path - .csv or .parquet output, one row per input row: match_id / team_0_win when the input has them, team_0_win_proba
+        chunk_rows - rows read, scored and written at a time
+        processes - chunks scored concurrently in worker processes, 1 scores in this process
+        engine - 'sklearn' predict_proba or the 'compiled' flat array forest (data.forest, faster on small chunks)
+        trace_path - stage metrics / Chrome trace json of the run, defaults to <output_path>_run_trace.json
+    """
+    if engine not in rp.ENGINES:
+        raise ValueError(f"Unknown engine {engine}, expected one of {rp.ENGINES}")
+    with open(os.path.join(model_folder, "meta.json")) as f:
+        feature_names = json.load(f)['feature_names']
+    available = input_columns(input_path)
+    missing = [c for c in feature_names if c not in available]
+    if missing:
+        raise ValueError(f"{input_path} is missing {len(missing)} of the model's features: {missing[:10]}")
+    keep = [c for c in ('match_id', 'team_0_win') if c in available]
+    columns = list(dict.fromkeys(feature_names + keep))
+
+    trace = RunTrace(f"predict_{os.path.basename(os.path.normpath(model_folder))}")
+    if processes <= 1 or engine == "compiled":
+        # a cold compiled cache is filled here once, before any worker starts, the workers only map it
+        _predict_worker_init(model_folder, engine)
+    context = multiprocessing.get_context("spawn")
+    pool = (ProcessPoolExecutor(processes, mp_context=context, initializer=_predict_worker_init,
+                                initargs=(model_folder, engine)) if processes > 1 else nullcontext())
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    parquet = output_path.endswith(".parquet")
+    writer = None
+    correct = 0
+    try:
+        with pool, trace.stage("predict") as metrics, (nullcontext() if parquet else open(output_path, "w", newline="")) as out:
+
+            def write(chunk, proba):
+                nonlocal writer, correct
+                scored = pd.DataFrame({c: chunk[c].to_numpy() for c in keep})
+                scored['team_0_win_proba'] = proba
+                if 'team_0_win' in keep:
+                    win = chunk['team_0_win'].to_numpy()
+                    win = win == 'Y' if win.dtype == object else win.astype(bool)
+                    correct += int(((proba >= 0.5) == win).sum())
+                if parquet:
+                    table = pa.Table.from_pandas(scored, preserve_index=False)
+                    writer = writer or pq.ParquetWriter(output_path, table.schema, compression=col.COMPRESSION)
+                    writer.write_table(table)
+                else:
+                    scored.to_csv(out, header=metrics.rows_out == 0, index=False)
+                metrics.rows_out += len(scored)
+
+            # chunks in flight, written in input order, at most two per worker so reading never runs far ahead
+            pending = deque()
+            for chunk in iter_input_chunks(input_path, columns, chunk_rows):
+                metrics.rows_in += len(chunk)
+                metrics.args['chunks'] = metrics.args.get('chunks', 0) + 1
+                if processes > 1:
+                    pending.append((chunk, pool.submit(_predict_chunk, chunk)))
+                    while len(pending) > 2 * processes:
+                        done, job = pending.popleft()
+                        write(done, job.result())
+                else:
+                    write(chunk, _predict_chunk(chunk))
+            while pending:
+                done, job = pending.popleft()
+                write(done, job.result())
+            if metrics.rows_in == 0:
+                # an empty input still gets an output, a CSV header / Parquet schema without rows
+                write(empty_input_chunk(input_path, columns), np.empty(0))
+        if writer is not None:
+            writer.close()
+            writer = None
+        metrics.bytes_written = os.path.getsize(output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        trace.log_summary()
+        trace.write(trace_path or f"{os.path.splitext(output_path)[0]}_run_trace.json")
+
+    summary = {'rows': metrics.rows_out, 'chunks': metrics.args.get('chunks', 0), 'wall_s': round(metrics.wall_s, 3),
+               'rows_per_s': round(metrics.rows_out / metrics.wall_s) if metrics.wall_s else 0,
+               'peak_rss_mb': round(metrics.peak_rss_mb, 1), 'output': output_path}
+    if 'team_0_win' in keep and metrics.rows_out:
+        summary['accuracy'] = round(correct / metrics.rows_out, 4)
+    logging.info(f"predict: {summary}")
+    return summary
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=["train_data", "ml_model"], required=True, help="Which function to run")
-    parser.add_argument("start_date", help="Start date (YYYY-MM-DD)")
-    parser.add_argument("end_date", help="End date (YYYY-MM-DD)")
+    parser.add_argument("--mode", choices=["train_data", "ml_model", "backfill", "predict"], required=True, help="Which function to run")
+    parser.add_argument("start_date", nargs="?", help="Start date (YYYY-MM-DD), not used by predict mode")
+    parser.add_argument("end_date", nargs="?", help="End date (YYYY-MM-DD), not used by predict mode")
     parser.add_argument("--name", default="test", help="Output folder name")
-    parser.add_argument("--team_stat_model", default="diff", help="Team stat model to use")
+    parser.add_argument("--team_stat_model", default="diff", choices=["std", "diff", "quantiles", "quantiles_diff", "basic"], help="Team stat layout written as training_data.parquet")
+    parser.add_argument("--fetch_workers", type=int, default=4, help="Days of matches fetched concurrently (for train_data mode)")
+    parser.add_argument("--api_base", help="Deadlock API base url, e.g. a local benchmarks.mock_api server (for train_data mode)")
+    parser.add_argument("--cache_path", default=DEFAULT_CACHE_PATH, help="Player hero stats cache file, pass '' to disable (for train_data mode)")
+    parser.add_argument("--incremental", action="store_true", help="Only build matches missing from the training store and append them (for train_data mode)")
+    parser.add_argument("--store_folder", help="Training store folder, defaults to v2_data//training_store//<name> (for train_data mode)")
+    parser.add_argument("--stage_root", default=DEFAULT_STAGE_ROOT, help="Stage output folder used to resume runs (for train_data mode)")
+    parser.add_argument("--force_stages", nargs="*", default=[], help="Stages to re-run even if stored, or 'all' (for train_data mode)")
+    parser.add_argument("--backend", default="pandas", choices=["pandas", "duckdb"], help="Where merge / features / team stats run (for train_data mode)")
+    parser.add_argument("--pipelined", action="store_true", help="Fetch player hero stats while match days are still downloading (for train_data mode)")
+    parser.add_argument("--warehouse_path", default=DEFAULT_WAREHOUSE_PATH, help="DuckDB warehouse file for the duckdb backend (for train_data mode)")
+    parser.add_argument("--trace_path", help="Stage metrics / Chrome trace json of the run, defaults to a run_trace.json in the output folder")
+    parser.add_argument("--profile_stages", nargs="*", default=[], help="Stages to profile, e.g. derive team_stats or train_random_forest")
+    parser.add_argument("--profiler", default="cprofile", choices=["cprofile", "sample"], help="cProfile (.prof) or stack sampling (.folded) for --profile_stages")
+    parser.add_argument("--day_cache_path", help=f"Match day cache folder shared between runs (for train_data mode, backfill defaults to {DEFAULT_MATCH_DAY_CACHE})")
+    # backfill: start_date - end_date is split into windows unless --windows lists them
+    parser.add_argument("--windows", nargs="*", default=[], help="Windows as START:END, e.g. 2025-08-01:2025-08-07 (for backfill mode)")
+    parser.add_argument("--window_days", type=int, default=7, help="Days per window when splitting start_date - end_date (for backfill mode)")
+    parser.add_argument("--stride_days", type=int, help="Days between window starts, defaults to --window_days (for backfill mode)")
+    parser.add_argument("--processes", type=int, help="Worker processes (for backfill mode, default 4, and predict mode, default 1 = in process)")
+    parser.add_argument("--api_concurrency", type=int, default=8, help="Requests in flight across all workers (for backfill mode)")
+    parser.add_argument("--rate_per_s", type=float, default=10, help="Total API requests per second across all workers (for backfill mode)")
+    parser.add_argument("--summary_path", help="Per window timing summary json (for backfill mode)")
     # Add additional args for create_ml_model as needed
     parser.add_argument("--model_identifier", help="Model identifier (for ml_model mode)")
-    parser.add_argument("--model_folder_name", help="Model folder name (for ml_model mode)")
+    parser.add_argument("--model_folder_name", help="Model folder name (for ml_model mode, and the model to score with in predict mode)")
     parser.add_argument("--config", help="Config file path (for ml_model mode)")
     parser.add_argument("--training_data_file_name", help="Training data file name (for ml_model mode)")
     parser.add_argument("--test_data", help="Test data file name (optional, for ml_model mode)")
     parser.add_argument("--training_data_folder_name", help="Training data folder name (for ml_model mode)")
+    # predict: scores --input_path with the model in --model_folder_name, see predict_matches
+    parser.add_argument("--input_path", help="Training layout .csv / .parquet file or folder to score (for predict mode)")
+    parser.add_argument("--output_path", help="Probabilities .csv / .parquet (for predict mode)")
+    parser.add_argument("--chunk_rows", type=int, default=PREDICT_CHUNK_ROWS, help="Rows read and scored at a time (for predict mode)")
+    parser.add_argument("--engine", choices=rp.ENGINES, default="sklearn", help="predict_proba or the compiled forest (for predict mode)")
     args = parser.parse_args()
+    if args.mode != "predict" and not (args.start_date and args.end_date):
+        parser.error(f"start_date and end_date are required for {args.mode} mode")
+    if args.mode == "predict":
+        missing = [f"--{name}" for name in ("input_path", "output_path", "model_folder_name") if not getattr(args, name)]
+        if missing:
+            parser.error(f"{', '.join(missing)} required for predict mode")
+
+    if args.api_base:
+        fd.set_api_base(args.api_base)
 
     if args.mode == "train_data":
-        create_training_data(args.start_date, args.end_date, args.name, args.team_stat_model)
+        create_training_data(
+            args.start_date, args.end_date, args.name, args.team_stat_model, args.fetch_workers, args.cache_path,
+            args.incremental, args.store_folder, args.stage_root, args.force_stages, args.backend, args.warehouse_path,
+            args.pipelined, args.trace_path, args.profile_stages, args.profiler, args.day_cache_path)
+    elif args.mode == "backfill":
+        windows = [tuple(w.split(":")) for w in args.windows] or backfill_windows(
+            args.start_date, args.end_date, args.window_days, args.stride_days)
+        backfill_training_data(
+            windows, args.name, args.team_stat_model, args.processes or 4, args.api_concurrency, args.rate_per_s,
+            fetch_workers=args.fetch_workers, cache_path=args.cache_path,
+            day_cache_path=args.day_cache_path or DEFAULT_MATCH_DAY_CACHE, stage_root=args.stage_root,
+            summary_path=args.summary_path)
     elif args.mode == "ml_model":
         create_ml_model(
             args.training_data_file_name,
@@ -200,5 +783,11 @@ if __name__ == "__main__":
             args.model_identifier,
             args.model_folder_name,
             args.config,
-            args.test_data
-        )
\ No newline at end of file
+            args.test_data,
+            args.trace_path,
+            args.profile_stages,
+            args.profiler
+        )
+    elif args.mode == "predict":
+        predict_matches(args.input_path, args.model_folder_name, args.output_path, args.chunk_rows, args.processes or 1,
+                        args.engine, args.trace_path)
\ No newline at end of file
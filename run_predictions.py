@@ -0,0 +1,429 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import create_team_stats as cts
+from data import columnar as col
+from data import fetch_data as fd
+from data import process_data as dp
+from data.cache import PlayerHeroStatsCache, DEFAULT_CACHE_PATH
+from data.feature_store import FeatureStore, PlayerFeatureIndex, TeamFeatures, fetch_player_features
+from data.model_registry import ModelRegistry, DEFAULT_MODEL_CACHE
+from data.schema import apply_schema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""Pre-match win predictions as a long lived local HTTP service.
+The model and its meta.json feature list are loaded once at startup. Concurrent requests are micro-batched:
+their players are looked up in the in-memory player feature index (data.feature_store), aggregated into team stats
+and scored in one call of the compiled forest (data.forest).
+Example launch command: python run_predictions.py --model_folder 8.26.25_rf_std --port 8765
+
+POST /predict {"match_id": 1, "players": [{"account_id": 123, "hero_id": 7, "team": "Team0"}, ... 12 entries]}
+    -> {"match_id": 1, "team_0_win": 0.57, "latency_ms": 12.3, "batch_size": 4}
+GET /stats -> p50 / p99 latency, throughput and batch sizes since startup
+"""
+
+PLAYERS_PER_MATCH = 2 * cts.TEAM_SIZE
+ENGINES = ("compiled", "sklearn")
+TEAMS = ("Team0", "Team1")
+
+def load_model(model_folder: str):
+    """returns (model, meta) from model.joblib and meta.json in model_folder"""
+    t0 = time.perf_counter()
+    model = joblib.load(os.path.join(model_folder, "model.joblib"))
+    with open(os.path.join(model_folder, "meta.json")) as f:
+        meta = json.load(f)
+    logging.info(f"Loaded model {meta.get('run_id')} from {model_folder} in {time.perf_counter() - t0:.2f}s, "
+                 f"{len(meta['feature_names'])} features")
+    return model, meta
+
+def load_hero_stats(fetch_till_date: str, hero_stats_path: str | None = None) -> pd.DataFrame:
+    """hero stats as the fetch_hero_stats stage makes them, from a hero_stats.parquet checkpoint if given"""
+    if hero_stats_path:
+        return col.read_table(hero_stats_path)
+    hero_stats = pd.json_normalize(fd.fetch_hero_stats(fetch_from_date='2020-01-01', fetch_till_date=fetch_till_date))
+    hero_stats = hero_stats.add_prefix('h_').rename(columns={'h_hero_id': 'hero_id'})
+    return apply_schema(hero_stats, "hero_stats", report=False)
+
+def feature_layout(feature_names: list[str]) -> str:
+    """the cts.create_team_stat_layouts layout a model's features come from"""
+    # every feature name ends in _<stat>_Team0 / _Team1 / _diff
+    family = 'quantiles' if any(f"_{q}_" in name for name in feature_names for q in cts.QUANTILES) else 'std'
+    return f"{family}_diff" if all(name.endswith('_diff') for name in feature_names) else family
+
+def parse_players(players) -> list[tuple[int, int, str]]:
+    """validates one match's players into (account_id, hero_id, team) tuples, team 0/1 or Team0/Team1"""
+    if not isinstance(players, list) or len(players) != PLAYERS_PER_MATCH:
+        raise ValueError(f"expected {PLAYERS_PER_MATCH} players, got {len(players) if isinstance(players, list) else players!r}")
+    parsed = []
+    for p in players:
+        team = p["team"] if isinstance(p, dict) else p[2]
+        team = TEAMS[team] if isinstance(team, int) and team in (0, 1) else team
+        if team not in TEAMS:
+            raise ValueError(f"unknown team {team!r}, expected one of {TEAMS} or 0 / 1")
+        account_id, hero_id = (p["account_id"], p["hero_id"]) if isinstance(p, dict) else p[:2]
+        parsed.append((int(account_id), int(hero_id), team))
+    per_team = [sum(1 for p in parsed if p[2] == team) for team in TEAMS]
+    if per_team != [cts.TEAM_SIZE, cts.TEAM_SIZE]:
+        raise ValueError(f"expected {cts.TEAM_SIZE} players per team, got {dict(zip(TEAMS, per_team))}")
+    return parsed
+
+class LiveFeatures:
+    """Builds model features for live matches from a PlayerFeatureIndex (data.feature_store):
+    each match's 12 player rows are gathered from the index and reduced to the model's team stats layout.
+    Accounts the index hasn't seen go once through the training stages' code path
+    (player hero stats through the sqlite cache -> merge with hero stats -> derived features) and are added to it.
+    prefetch runs those fetches on a thread pool outside the lock array builds under, so a cold account
+    never stalls the scoring of warm ones.
+    - feature_names: meta.json feature_names, the returned features have exactly these columns
+    - hero_stats: loaded once, see load_hero_stats
+    - as_of_date: player stats up to this date (YYYY-MM-DD), defaults to today (UTC) at each build
+    - store: FeatureStore whose newest snapshot on or before as_of_date seeds the index, its date is then the one
+      missing accounts are fetched as of
+    """
+
+    def __init__(self, feature_names: list[str], hero_stats: pd.DataFrame, as_of_date: str | None = None,
+                 cache: PlayerHeroStatsCache | None = None, fetch_workers: int = 4, store: FeatureStore | None = None):
+        self.feature_names = list(feature_names)
+        self.layout = feature_layout(self.feature_names)
+        family = self.layout.removesuffix('_diff')
+        suffixes = ['diff'] if self.layout.endswith('_diff') else list(TEAMS)
+        buildable = {f"{c}_{stat}_{s}" for c in cts.TEAM_STATS for stat in cts.LAYOUT_STATS[family] for s in suffixes}
+        unknown = [name for name in self.feature_names if name not in buildable]
+        if unknown:
+            raise ValueError(f"model features can't be built from live team stats ({self.layout} layout): {unknown}")
+        self.team = TeamFeatures(self.feature_names)
+        self.hero_stats = hero_stats
+        self.as_of_date = as_of_date
+        self.cache = cache
+        self.fetch_workers = fetch_workers
+        self.store = store
+        # (as_of_date, index) of the current day, swapped when the date rolls over
+        self.current = (None, None)
+        self.lock = threading.Lock()
+        # account -> fetch in flight, so concurrent requests for a cold account share one fetch
+        self.fetching: dict[int, Future] = {}
+        self.fetcher = ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="live_features")
+
+    def index(self) -> PlayerFeatureIndex:
+        as_of_date = self.as_of_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if self.current[0] != as_of_date:
+            snapshot = self.store.latest(as_of_date) if self.store is not None else None
+            index = self.store.load(snapshot) if snapshot else PlayerFeatureIndex(as_of_date)
+            logging.info(f"Live features as of {index.as_of_date}, {len(index)} indexed player hero rows")
+            self.current = (as_of_date, index)
+        return self.current[1]
+
+    def _fetch(self, index: PlayerFeatureIndex, account_ids: list[int]):
+        try:
+            all_stats, covered = fetch_player_features(account_ids, index.as_of_date, self.hero_stats, self.cache,
+                                                       self.fetch_workers)
+            with self.lock:
+                index.add(all_stats, covered)
+        finally:
+            with self.lock:
+                for account_id in account_ids:
+                    self.fetching.pop(account_id, None)
+
+    def prefetch(self, matches: list[list[tuple[int, int, str]]], timeout_s: float | None = None) -> bool:
+        """fetches the accounts of matches the index hasn't looked up yet and waits up to timeout_s for them.
+        Returns False when a fetch failed or is still running, those players count as without stats until it lands."""
+        with self.lock:
+            index = self.index()
+            missing = index.missing_accounts(matches)
+            new = [a for a in missing if a not in self.fetching]
+            if new:
+                job = self.fetcher.submit(self._fetch, index, new)
+                self.fetching.update((a, job) for a in new)
+            jobs = {self.fetching[a] for a in missing if a in self.fetching}
+        if not jobs:
+            return True
+        done, running = wait(jobs, timeout=timeout_s)
+        for job in done:
+            if job.exception() is not None:
+                logging.warning(f"player stats fetch failed: {job.exception()}")
+        with self.lock:
+            unfetched = index.missing_accounts(matches)
+        if unfetched:
+            logging.warning(f"player stats of {len(unfetched)} accounts not fetched"
+                            f"{f' after {timeout_s}s' if running else ''}, scoring them without stats")
+        return not unfetched
+
+    def array(self, matches: list[list[tuple[int, int, str]]], fetch: bool = True) -> np.ndarray:
+        """(n_matches, n_features) float64, one row per match in order.
+        fetch=False skips the prefetch, accounts not looked up yet count as without stats."""
+        if fetch:
+            self.prefetch(matches)
+        with self.lock:
+            return self.team.build(self.index(), matches)
+
+    def build(self, matches: list[list[tuple[int, int, str]]], fetch: bool = True) -> pd.DataFrame:
+        """array as a frame with the feature_names columns"""
+        return pd.DataFrame(self.array(matches, fetch), columns=self.feature_names)
+
+    def build_pipeline(self, matches: list[list[tuple[int, int, str]]]) -> pd.DataFrame:
+        """the same features through the DataFrame stages of create_training_data, the reference array is checked against"""
+        n = len(matches)
+        players = [p for match in matches for p in match]
+        raw_players = pd.DataFrame({
+            'account_id': [p[0] for p in players],
+            'match_id': np.repeat(np.arange(n, dtype=np.int64), PLAYERS_PER_MATCH),
+            'team': [p[2] for p in players],
+            'hero_id': [p[1] for p in players],
+        })
+        # no outcome yet, win comes out False for every team and isn't a feature
+        raw_matches = pd.DataFrame({'match_id': np.arange(n, dtype=np.int64), 'start_time': int(time.time()),
+                                    'winning_team': None})
+        raw_players = apply_schema(raw_players, report=False)
+
+        as_of_date = self.index().as_of_date
+        all_stats, _ = fetch_player_features(raw_players['account_id'].unique().tolist(), as_of_date, self.hero_stats,
+                                             self.cache, self.fetch_workers)
+        match_players = apply_schema(dp.prepare_match_stats(raw_players, raw_matches), report=False)
+        p_m_stats = apply_schema(cts.merge_match_player_stats(match_players, all_stats), report=False)
+        team = cts.create_team_stat_layouts(p_m_stats, layouts=(self.layout,))[self.layout]
+        # layouts come out in match_id order, which is the batch order
+        return team[self.feature_names].reset_index(drop=True)
+
+class MicroBatcher:
+    """Collects items submitted from many threads into batches for one call of fn(items) -> results.
+    A batch is closed once it holds max_batch items or max_wait_ms passed since its first item,
+    so a lone request waits at most max_wait_ms and a burst is served by a few large calls.
+    When fn raises, the batch's items are retried one by one so only the failing items get the exception.
+    """
+
+    def __init__(self, fn, max_batch: int = 32, max_wait_ms: float = 2.0):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.batch_sizes = deque(maxlen=10_000)
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self.pending.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            self.batch_sizes.append(len(batch))
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                for item, future in batch:
+                    try:
+                        future.set_result(self.fn([item])[0])
+                    except Exception as item_error:
+                        future.set_exception(item_error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+class LatencyStats:
+    """request latencies (last window) and counts since startup, summarized as p50 / p99 and requests per second"""
+
+    def __init__(self, window: int = 10_000):
+        self.latencies = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency_s: float, error: bool = False):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            if not error:
+                self.latencies.append(latency_s)
+
+    def summary(self) -> dict:
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            requests, errors = self.requests, self.errors
+        uptime = time.perf_counter() - self.started
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            "requests": requests, "errors": errors, "uptime_s": round(uptime, 1),
+            "throughput_rps": round(requests / uptime, 2) if uptime else 0.0,
+            "p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2) if len(latencies) else 0.0,
+        }
+
+class PredictionService:
+    """Model, features and micro batcher shared by every request of the HTTP server.
+    - model_folder: folder with model.joblib and meta.json (as written by cm.save_model)
+    - max_batch / max_wait_ms: micro batching, see MicroBatcher
+    - as_of_date / hero_stats_path / cache_path / fetch_workers: see LiveFeatures and load_hero_stats
+    - fetch_timeout_s: how long a request waits for its cold accounts' stats before it is scored without them
+    - feature_store: FeatureStore folder whose snapshots seed the live features, None starts from an empty index
+    - engine: 'compiled' scores with the model flattened into a CompiledForest, 'sklearn' with predict_proba
+    - model_cache: compiled forest cache of the ModelRegistry (data.model_registry), None compiles at every start
+    """
+
+    def __init__(self, model_folder: str, max_batch: int = 32, max_wait_ms: float = 2.0, as_of_date: str | None = None,
+                 hero_stats_path: str | None = None, cache_path: str | None = DEFAULT_CACHE_PATH, fetch_workers: int = 4,
+                 engine: str = "compiled", feature_store: str | None = None, model_cache: str | None = DEFAULT_MODEL_CACHE,
+                 fetch_timeout_s: float = 2.0):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}, expected one of {ENGINES}")
+        self.engine = engine
+        if engine == "compiled":
+            # memory mapped from the registry's compiled cache, model.joblib is only unpickled the first time
+            loaded = ModelRegistry(cache_root=model_cache).load(model_folder)
+            with open(os.path.join(loaded.entry.folder, "meta.json")) as f:
+                self.model, self.meta = loaded.forest, json.load(f)
+        else:
+            self.model, self.meta = load_model(model_folder)
+            # batches are small, fanning their trees out to joblib threads costs more than it saves
+            self.model.n_jobs = 1
+        # team_0_win is 'Y' / 'N', the probability served is the one of 'Y'
+        self.win_column = list(self.model.classes_).index('Y')
+        hero_stats = load_hero_stats(as_of_date or datetime.now(timezone.utc).strftime("%Y-%m-%d"), hero_stats_path)
+        cache = PlayerHeroStatsCache(cache_path) if cache_path else None
+        store = FeatureStore(feature_store) if feature_store else None
+        self.features = LiveFeatures(self.meta['feature_names'], hero_stats, as_of_date, cache, fetch_workers, store)
+        self.fetch_timeout_s = fetch_timeout_s
+        self.batcher = MicroBatcher(self._predict_batch, max_batch, max_wait_ms)
+        self.stats = LatencyStats()
+
+    def _predict_batch(self, matches: list) -> list[tuple[float, int]]:
+        # sklearn wants the feature names, the compiled forest takes the array as is.
+        # predict already fetched the batch's cold accounts, nothing is fetched on the batcher thread
+        X = self.features.build(matches, fetch=False) if self.engine == "sklearn" else self.features.array(matches, fetch=False)
+        proba = self.model.predict_proba(X)[:, self.win_column]
+        return [(float(p), len(matches)) for p in proba]
+
+    def predict(self, players, timeout_s: float = 30.0) -> dict:
+        """team 0 win probability of one match, blocks until its batch is scored"""
+        t0 = time.perf_counter()
+        try:
+            parsed = parse_players(players)
+            self.features.prefetch([parsed], self.fetch_timeout_s)
+            win, batch_size = self.batcher.submit(parsed).result(timeout_s)
+        except Exception:
+            self.stats.record(time.perf_counter() - t0, error=True)
+            raise
+        latency = time.perf_counter() - t0
+        self.stats.record(latency)
+        return {"team_0_win": win, "latency_ms": round(latency * 1000, 3), "batch_size": batch_size}
+
+    def summary(self) -> dict:
+        sizes = list(self.batcher.batch_sizes)
+        return {**self.stats.summary(), "model": self.meta.get("run_id"), "engine": self.engine, "layout": self.features.layout,
+                "batches": len(sizes), "avg_batch_size": round(float(np.mean(sizes)), 2) if sizes else 0.0}
+
+class PredictionHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json({"error": f"unknown path {self.path}"}, 404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            result = self.server.service.predict(body["players"])
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json({"error": f"bad request: {e}"}, 400)
+            return
+        except Exception as e:
+            logging.exception("prediction failed")
+            self._send_json({"error": str(e)}, 500)
+            return
+        self._send_json({"match_id": body.get("match_id"), **result})
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(self.server.service.summary())
+        elif self.path == "/health":
+            self._send_json({"status": "ok"})
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, 404)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # one log line per request would cost more than the prediction
+        pass
+
+def make_server(service: PredictionService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """ThreadingHTTPServer serving service, call serve_forever() (or run it on a thread)"""
+    httpd = ThreadingHTTPServer((host, port), PredictionHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+def log_stats_every(service: PredictionService, interval_s: float):
+    def run():
+        while True:
+            time.sleep(interval_s)
+            logging.info(f"prediction service: {service.summary()}")
+    threading.Thread(target=run, daemon=True).start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_folder", required=True, help="Folder with model.joblib and meta.json, e.g. 8.26.25_rf_std, or a registry key / run_id with the compiled engine")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--max_batch", type=int, default=32, help="Matches scored per model call at most")
+    parser.add_argument("--max_wait_ms", type=float, default=2.0, help="How long a batch waits for more requests")
+    parser.add_argument("--as_of_date", help="Player and hero stats up to this date (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--hero_stats_path", help="hero_stats.parquet checkpoint to use instead of fetching hero stats")
+    parser.add_argument("--cache_path", default=DEFAULT_CACHE_PATH, help="Player hero stats cache file, pass '' to disable")
+    parser.add_argument("--fetch_workers", type=int, default=4, help="Player hero stats batches fetched concurrently")
+    parser.add_argument("--fetch_timeout_s", type=float, default=2.0, help="Wait for a request's cold accounts at most this long, then score them without stats")
+    parser.add_argument("--api_base", help="Deadlock API base url, e.g. a local benchmarks.mock_api server")
+    parser.add_argument("--feature_store", help="Feature store folder (data.feature_store) to seed player features from")
+    parser.add_argument("--model_cache", default=DEFAULT_MODEL_CACHE, help="Compiled model cache folder, pass '' to compile at every start")
+    parser.add_argument("--engine", choices=ENGINES, default="compiled", help="Compiled flat array forest or sklearn predict_proba")
+    parser.add_argument("--stats_interval_s", type=float, default=60, help="Log latency / throughput every this many seconds, 0 disables")
+    args = parser.parse_args()
+
+    if args.api_base:
+        fd.set_api_base(args.api_base)
+
+    service = PredictionService(args.model_folder, args.max_batch, args.max_wait_ms, args.as_of_date,
+                                args.hero_stats_path, args.cache_path, args.fetch_workers, args.engine,
+                                args.feature_store, args.model_cache or None, args.fetch_timeout_s)
+    httpd = make_server(service, args.host, args.port)
+    if args.stats_interval_s > 0:
+        log_stats_every(service, args.stats_interval_s)
+    logging.info(f"Serving predictions on http://{args.host}:{httpd.server_address[1]}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        logging.info(f"prediction service: {service.summary()}")